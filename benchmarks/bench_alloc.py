@@ -0,0 +1,53 @@
+'''运行时值占用的内存(the memory taken by runtime values)
+
+给出单个数、字符串与表的大小，以及构造大的数字表时每个元素平均分配的字节数。
+(reports the size of a single number, string and table, and the bytes allocated per element when a big numeric table is built.)
+
+用法(usage): python benchmarks/bench_alloc.py [--chunks N]
+'''
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fun.fobject as obj
+from fun.interpreter import engines, repl_online
+
+CHUNK = 800
+
+def instance_size(value):
+	size = sys.getsizeof(value)
+	if hasattr(value, '__dict__'):
+		size += sys.getsizeof(value.__dict__)
+	return size
+
+def make_program(chunks):
+	'''表中有chunks * CHUNK个各不相同的数(the table holds chunks * CHUNK distinct numbers)'''
+	return 't = [..range << [0, {}]]; #t -> print;'.format(chunks * CHUNK - 1)
+
+def measure(code, engine):
+	'''返回(输出, 分配的峰值字节数)(return (output, peak bytes allocated))'''
+	tracemalloc.start()
+	try:
+		output = repl_online(code, engine, cache=None, timeout=None)
+		return output, tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--chunks', type=int, default=20)
+	argparser.add_argument('--engines', nargs='*', default=list(engines))
+	args = argparser.parse_args()
+	for name, value in [('Number', obj.Number(10 ** 6)), ('String', obj.String('word')), ('Table', obj.Table())]:
+		print('{:<10}{:>6} bytes'.format(name, instance_size(value)))
+	code = make_program(args.chunks)
+	for engine in args.engines:
+		output, peak = measure(code, engine)
+		elements = int(output)
+		print('{:<10}{:>8} elements{:>10.1f} bytes/element'.format(engine, elements, peak / elements))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,52 @@
+'''比较各执行引擎在range/filter/reduce程序上的速度(compare the engines on range/filter/reduce programs)
+
+用法(usage): python benchmarks/bench_engines.py [--repeat N]
+'''
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fun.lexer as lexer
+import fun.parser as parser
+from fun.interpreter import engines, make_env
+
+programs = {
+	'range': '[..range << [0, 800]] -> count;',
+	'map': '[..range << [0, 800] => @0 * 2 + 1] -> count;',
+	'filter': '[..range << [0, 800] | @0 % 3 == 0] -> count;',
+	'reduce': 'sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 800] >> sum -> count;',
+	'pipeline': 'sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 800] => @0 * @0 | @0 % 2 == 0 >> sum -> count;',
+	'chain': '[..range << [0, 800] => @0 + 1 | @0 % 2 == 0 => @0 * 3 | @0 % 4 == 0 => @0 - 1] -> count;',
+	'arith': 'f = {x = @0; y = x * x + 3 * x - 7; z = (y % 11 + x / 4) * (x - 2) ^ 2; <- z > 100;}; [..range << [0, 800] | f] -> count;',
+}
+
+def run(code, engine, repeat):
+	'''返回最好的一次用时(return the best time of all runs)'''
+	best = None
+	for _ in range(repeat):
+		stdout = []
+		env = make_env(stdout)
+		env.user_data._dict['count'] = env.user_data._dict['print']
+		executable = engines[engine](parser.program(lexer.Tokens.tokenize(code)))
+		start = time.perf_counter()
+		executable.eval(env)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--repeat', type=int, default=5)
+	argparser.add_argument('--engines', nargs='*', default=list(engines))
+	args = argparser.parse_args()
+	print('{:<10}'.format('program') + ''.join('{:>12}'.format(engine) for engine in args.engines) + '   speedup')
+	for name, code in programs.items():
+		times = [run(code, engine, args.repeat) for engine in args.engines]
+		row = '{:<10}'.format(name) + ''.join('{:>10.2f}ms'.format(t * 1000) for t in times)
+		print(row + ''.join('  x{:.2f}'.format(times[0] / t) for t in times[1:]))
+
+if __name__ == '__main__':
+	main()
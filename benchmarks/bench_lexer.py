@@ -0,0 +1,59 @@
+'''词法分析在恶意输入上的用时，每个字符的用时不随输入变长而增长即为线性
+(the time of lexing adversarial inputs, it is linear when the time per char does not grow with the input)
+
+用法(usage): python benchmarks/bench_lexer.py [--sizes N ...] [--chunk N]
+'''
+import os
+import io
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fun.lexer as lexer
+from fun.exception import LexerException
+
+inputs = {
+	'backslashes': lambda n: '"' + '\\' * n,
+	'escaped quotes': lambda n: '"' + '\\"' * n,
+	'single quotes': lambda n: "'" + "\\'a" * n,
+	'unclosed': lambda n: '"\\"' * n,
+	'long name': lambda n: 'a' * n,
+	'long number': lambda n: '1' * n + '.',
+	'script': lambda n: 'x = "a\\"b" + 1.5 <?= y;\n' * (n // 24),
+}
+
+def lex(tokens):
+	'''返回词法单元数，出错时返回错误(return the number of tokens, or the error)'''
+	try:
+		return sum(1 for _ in tokens)
+	except LexerException as e:
+		return e.info
+
+def run(code, chunk):
+	start = time.perf_counter()
+	if chunk is None:
+		lex(lexer._tokenize([code], 0))
+	else:
+		file = io.StringIO(code)
+		lex(lexer._tokenize(iter(lambda: file.read(chunk), ''), 0))
+	return time.perf_counter() - start
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--sizes', type=int, nargs='*', default=[10 ** 5, 4 * 10 ** 5, 16 * 10 ** 5])
+	argparser.add_argument('--chunk', type=int, default=4096)
+	args = argparser.parse_args()
+	print('{:<22}'.format('ns/char') + ''.join('{:>12}'.format(size) for size in args.sizes))
+	for name, make in inputs.items():
+		for chunk in [None, args.chunk]:
+			times = []
+			for size in args.sizes:
+				code = make(size)
+				times.append(run(code, chunk) / len(code) * 10 ** 9)
+			label = name if chunk is None else '  in {} chunks'.format(chunk)
+			print('{:<22}'.format(label) + ''.join('{:>12.1f}'.format(elapsed) for elapsed in times))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,97 @@
+'''大脚本的解析用时与语法树占用的内存，以及从字符串和文件做词法分析时的峰值内存
+(the parse time of large scripts and the memory taken by their syntax trees, and the peak memory of lexing from a string and from a file)
+
+用法(usage): python benchmarks/bench_parse.py [--statements N ...] [--repeat N]
+'''
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fun.lexer as lexer
+import fun.parser as parser
+from fun.utils import Context
+
+def make_script(statements):
+	'''模板生成的脚本：赋值、函数、表与管道轮流出现(a templated script: assignments, funs, tables and pipelines in turn)'''
+	templates = [
+		'x{i} = {i} * 2 + y - "s{i}";',
+		'f{i} = {{a = @0 + {i}; <- [a, "k": a * 2];}};',
+		't{i} = [1, 2, "n": {i}, always: x{i}];',
+		'p{i} = range << [0, {i}] => @0 + 1 | @0 % 3 == 0;',
+	]
+	return '\n'.join(templates[i % len(templates)].format(i=i) for i in range(statements))
+
+def count_nodes(program):
+	count = 0
+	nodes = [program]
+	while nodes:
+		node = nodes.pop()
+		count += 1
+		nodes += node.chilren
+	return count
+
+def parse(code):
+	with Context():
+		return parser.program(lexer.Tokens.tokenize(code))
+
+def measure(code, repeat):
+	'''返回(最好的解析用时, 节点数, 语法树占用的字节数, 解析时的峰值字节数，含词法单元)
+	(return (the best parse time, the number of nodes, the bytes taken by the tree, the peak bytes while parsing, tokens included))'''
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		parse(code)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	tracemalloc.start()
+	try:
+		program = parse(code)
+		size, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	return best, count_nodes(program), size, peak
+
+def drain(tokens):
+	while not tokens.is_end():
+		tokens.consume(tokens.current.name)
+
+def measure_lex(code):
+	'''返回(从字符串分析的峰值字节数, 从文件分析的峰值字节数)，字符串本身不计
+	(return (the peak bytes lexing from the string, the peak bytes lexing from a file), the string itself is not counted)'''
+	peaks = []
+	with tempfile.TemporaryFile('w+', encoding='utf-8') as file:
+		file.write(code)
+		for make in [lambda: lexer.Tokens.tokenize(code), lambda: lexer.Tokens.tokenize_file(file)]:
+			file.seek(0)
+			tracemalloc.start()
+			try:
+				drain(make())
+				peaks.append(tracemalloc.get_traced_memory()[1])
+			finally:
+				tracemalloc.stop()
+	return peaks
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--statements', type=int, nargs='*', default=[1000, 10000, 20000])
+	argparser.add_argument('--repeat', type=int, default=3)
+	args = argparser.parse_args()
+	print('{:>10}{:>12}{:>10}{:>12}{:>14}{:>14}'.format('statements', 'source', 'nodes', 'parse', 'bytes/node', 'peak/node'))
+	for statements in args.statements:
+		code = make_script(statements)
+		elapsed, nodes, size, peak = measure(code, args.repeat)
+		print('{:>10}{:>11}K{:>10}{:>10.0f}ms{:>14.1f}{:>14.1f}'.format(statements, len(code) // 1024, nodes, elapsed * 1000, size / nodes, peak / nodes))
+	print()
+	print('{:>10}{:>12}{:>16}{:>16}'.format('statements', 'source', 'lex string', 'lex file'))
+	for statements in args.statements:
+		code = make_script(statements)
+		from_string, from_file = measure_lex(code)
+		print('{:>10}{:>11}K{:>15}K{:>15}K'.format(statements, len(code) // 1024, from_string // 1024, from_file // 1024))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,52 @@
+'''一个长程序与许多短程序共用一个线程时，比较短程序在依次运行与分片调度下的平均完成时间
+(with one long program and many short ones sharing a thread, compare the mean finishing time of the short ones run in order and with the scheduler)
+
+用法(usage): python benchmarks/bench_scheduler.py [--short N] [--slice-steps N]
+'''
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fun.interpreter import repl_online
+from fun.scheduler import Scheduler
+
+long_program = 'g = {x = [..range << [0, 800]]; <- 1;}; sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 200] => {-> g; <- @0;} >> sum -> print;'
+short_program = 'a = 3; b = 4; a * a + b * b -> print;'
+
+def in_order(codes):
+	start = time.perf_counter()
+	finished = []
+	for code in codes:
+		repl_online(code, timeout=None)
+		finished.append(time.perf_counter() - start)
+	return finished
+
+def scheduled(codes, slice_steps):
+	scheduler = Scheduler(slice_steps)
+	runs = [scheduler.submit(code) for code in codes]
+	start = time.perf_counter()
+	finished = {}
+	while scheduler.ready:
+		scheduler.run_once()
+		while len(finished) < len(scheduler.finished):
+			finished[scheduler.finished[len(finished)]] = time.perf_counter() - start
+	return [finished[run] for run in runs], runs
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--short', type=int, default=100)
+	argparser.add_argument('--slice-steps', type=int, default=1000)
+	args = argparser.parse_args()
+	codes = [long_program] + [short_program] * args.short
+	ordered = in_order(codes)
+	sliced, runs = scheduled(codes, args.slice_steps)
+	print('{:<12}{:>14}{:>14}'.format('', 'short mean', 'long'))
+	print('{:<12}{:>12.2f}ms{:>12.2f}ms'.format('in order', sum(ordered[1:]) / args.short * 1000, ordered[0] * 1000))
+	print('{:<12}{:>12.2f}ms{:>12.2f}ms'.format('scheduled', sum(sliced[1:]) / args.short * 1000, sliced[0] * 1000))
+	print('steps: long {}, short {}'.format(runs[0].steps, runs[1].steps))
+
+if __name__ == '__main__':
+	main()
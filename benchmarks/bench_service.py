@@ -0,0 +1,36 @@
+'''比较不同进程数的执行服务每秒处理的请求数(compare requests per second of the execution service with different pool sizes)
+
+用法(usage): python benchmarks/bench_service.py [--sizes 1 2 4] [--requests N]
+'''
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fun.service import ExecutionService
+
+programs = [
+	'[..range << [0, 300] | @0 % 3 == 0] -> print;',
+	'sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 300] => @0 * @0 >> sum -> print;',
+	'a = 1; b = 2; a + b -> print;',
+]
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--sizes', type=int, nargs='*', default=[1, 2, 4])
+	argparser.add_argument('--requests', type=int, default=200)
+	argparser.add_argument('--engine', default='tree')
+	args = argparser.parse_args()
+	codes = [programs[i % len(programs)] for i in range(args.requests)]
+	print('{:<6}{:>12}{:>12}'.format('size', 'seconds', 'req/s'))
+	for size in args.sizes:
+		with ExecutionService(size, engine=args.engine) as service:
+			start = time.perf_counter()
+			service.map(codes)
+			elapsed = time.perf_counter() - start
+		print('{:<6}{:>12.2f}{:>12.1f}'.format(size, elapsed, len(codes) / elapsed))
+
+if __name__ == '__main__':
+	main()
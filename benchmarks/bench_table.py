@@ -0,0 +1,52 @@
+'''大表作为参数、重装与iter时的用时，表的复制是O(1)时用时不随表的大小增长
+(the time of passing, reloading and iterating big tables, it does not grow with the table size when copies are O(1))
+
+用法(usage): python benchmarks/bench_table.py [--repeat N] [--sizes N ...]
+'''
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fun.interpreter import engines, make_env, execute
+
+programs = {
+	'generator': 'g = {<- k;}; s = {i = g << t; n = n + 1; <- n;} << ["n": 0]; range << [0, 300] >> s -> print;',
+	'reload': 'g = {<- k;}; s = {n = n + (t -> g); <- n;} << ["n": 0]; range << [0, 300] >> s -> print;',
+	'iter': 's = {i = [t] -> iter; n = n + 1; <- n;} << ["n": 0]; range << [0, 300] >> s -> print;',
+}
+
+def make_table(size):
+	return 't = [..range << [0, {}], "k": 1]; '.format(size)
+
+def run(size, code, engine, repeat):
+	'''表在计时之外建好，只计复制与修改的语句；返回最好的一次用时
+	(the table is built outside the timer, only the copying and mutating statements are timed; return the best time of all runs)'''
+	stdout = []
+	env = make_env(stdout)
+	execute(make_table(size), env, stdout, engine)
+	best = None
+	for _ in range(repeat):
+		stdout.clear()
+		start = time.perf_counter()
+		execute(code, env, stdout, engine)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--repeat', type=int, default=3)
+	argparser.add_argument('--sizes', type=int, nargs='*', default=[10, 5000, 50000])
+	argparser.add_argument('--engines', nargs='*', default=list(engines))
+	args = argparser.parse_args()
+	print('{:<10}{:<10}'.format('program', 'engine') + ''.join('{:>12}'.format(size) for size in args.sizes))
+	for name, code in programs.items():
+		for engine in args.engines:
+			times = [run(size, code, engine, args.repeat) for size in args.sizes]
+			print('{:<10}{:<10}'.format(name, engine) + ''.join('{:>10.2f}ms'.format(elapsed * 1000) for elapsed in times))
+
+if __name__ == '__main__':
+	main()
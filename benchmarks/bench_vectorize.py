@@ -0,0 +1,43 @@
+'''比较数字管道在逐个求值与向量化求值时的速度(compare numeric pipelines evaluated one by one and vectorized)
+
+需要NumPy(needs numpy)。用法(usage): python benchmarks/bench_vectorize.py [--repeat N]
+'''
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fun.interpreter import engines, repl_online
+
+programs = {
+	'chain': '[..range << [0, 800] => @0 + 1 | @0 % 2 == 0 => @0 * 3 | @0 % 4 == 0 => @0 - 1] -> print;',
+	'sum': 'sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 800] => @0 * @0 | @0 % 2 == 0 >> sum -> print;',
+	'count': 'count = {n = n + 1; <- n;} << ["n": 0]; range << [0, 800] | @0 % 7 == 3 >> count -> print;',
+	'detect': 'range << [0, 800] => @0 * @0 | @0 % 11 == 5 <?= {<- @0 > 600000;} -> print;',
+}
+
+def run(code, engine, vectorized, repeat):
+	'''返回最好的一次用时(return the best time of all runs)'''
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		repl_online(code, engine, vectorized=vectorized, timeout=None)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+def main():
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument('--repeat', type=int, default=5)
+	argparser.add_argument('--engines', nargs='*', default=list(engines))
+	args = argparser.parse_args()
+	print('{:<10}{:<10}{:>12}{:>12}   speedup'.format('program', 'engine', 'scalar', 'vectorized'))
+	for name, code in programs.items():
+		for engine in args.engines:
+			scalar, vectorized = run(code, engine, False, args.repeat), run(code, engine, True, args.repeat)
+			print('{:<10}{:<10}{:>10.2f}ms{:>10.2f}ms  x{:.1f}'.format(name, engine, scalar * 1000, vectorized * 1000, scalar / vectorized))
+
+if __name__ == '__main__':
+	main()
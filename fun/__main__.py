@@ -1,2 +1,19 @@
-from fun.interpreter import repl
-repl()
\ No newline at end of file
+import sys
+from fun.interpreter import repl, make_env, execute
+from fun.output import FileSink
+from fun.profiler import Profiler
+
+# python -m fun [--profile] [engine] [file]
+args = sys.argv[1:]
+profile = '--profile' in args
+if profile:
+	args.remove('--profile')
+if len(args) > 1:
+	sink = FileSink(sys.stdout)
+	profiler = Profiler() if profile else None
+	with open(args[1], encoding='utf-8') as file:
+		execute(file, make_env(sink, profiler=profiler), sink, args[0])
+	if profiler is not None:
+		print(profiler.format(), file=sys.stderr)
+else:
+	repl(*args[:1], profile=profile)
@@ -0,0 +1,31 @@
+'''在asyncio中运行Fun程序(run fun programs from asyncio)
+
+程序按scheduler中的方式分片运行，事件循环的线程恢复一片后等它停下，每片之间把控制交还事件循环。
+一片最多执行slice_steps步，事件循环被占用的时间由它限定；不另把每一片交给线程池，否则程序与事件循环会争抢GIL。
+(programs run in slices as in scheduler, the thread of the event loop resumes a slice and waits until it stops,
+control goes back to the event loop between slices. a slice runs at most slice_steps steps, which bounds how long
+the event loop is held; the slices are not handed to a thread pool as well, or the programs and the event loop would fight for the GIL.)
+'''
+import asyncio
+from fun.interpreter import program_cache
+from fun.output import QueueSink
+from fun.scheduler import SlicedRun, SLICE_STEPS
+
+async def run_async(code, engine='tree', slice_steps=SLICE_STEPS, cache=program_cache, sink=None):
+	'''返回与repl_online相同的输出；可以用asyncio.wait_for或asyncio.timeout限制时间，取消后程序立即停止。
+	要边运行边取得输出，可传入QueueSink(asyncio.Queue())
+	(return the same output as repl_online; limit the time with asyncio.wait_for or asyncio.timeout, the program stops once it is cancelled.
+	pass a QueueSink(asyncio.Queue()) to get the output while it runs)'''
+	# 输出在程序的线程中写入(the output is written in the thread of the program)
+	if isinstance(sink, QueueSink) and sink.loop is None:
+		sink.loop = asyncio.get_running_loop()
+	run = SlicedRun(code, engine, slice_steps, cache, sink=sink)
+	try:
+		while not run.resume():
+			await asyncio.sleep(0)
+	except BaseException:
+		run.cancel()
+		raise
+	if run.error is not None:
+		raise run.error
+	return run.output
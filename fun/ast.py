@@ -1,45 +1,86 @@
 import abc
-from fun.utils import InterpreterScope, StackEvent, recursion_forbidden, MAX_LOOP_COUNT
+from fun.utils import InterpreterScope, StackEvent, recursion_forbidden, tick, get_context
 from fun.exception import ReturnMessage, StopMessage, RuntimeException
 import fun.fobject as obj
 
 intent = '    '
 class Unsolved: pass
 
-def is_unsolvable(*nodes):
-	for node in nodes:
-		if node.value == Unsolved:
-			return node
-	return None
-
-def clear(*nodes):
-	for node in nodes:
-		if not isinstance(node, obj.FinalValue):
-			node.value = Unsolved
-
-def unable_to_eval(env, *nodes):
-	clear(*nodes)
-	for node in nodes:
-		node.eval(env)
-	return is_unsolvable(*nodes)
-
 def innermost(node):
 	while node.type == 'Group':
 		node = node.inner
 	return node
 
+def may_be_undefined(node):
+	'''求值子树时是否可能遇到未定义变量(whether an undefined name may be met when evaluating the subtree)'''
+	nodes = [node]
+	while nodes:
+		node = nodes.pop()
+		if node.type in ('Identifier', 'Variable', 'Call', 'Detect', 'Reduce', 'Unfold'):
+			return True
+		nodes += node.chilren
+	return False
+
+def literal_key(node):
+	'''@0、@"name"这样键为字面量的变量的键，优化后键是Constant节点；其他节点返回None
+	(the key of a variable with a literal key such as @0 or @"name", after optimizing the key is a Constant node; None for other nodes)'''
+	if node.type != 'Variable':
+		return None
+	right = node.right
+	if right.type == 'Constant':
+		key = right.val
+	elif right.type in ('Number', 'String'):
+		key = right.eval(None)
+	else:
+		return None
+	return key if isinstance(key, (obj.Number, obj.String)) else None
+
 def auto_lambda(node):
-	return obj.Fun([Return(node.line_no, node)])
+	return obj.Fun([AutoReturn(node)])
 
-class Readonly: pass
+class Target:
+	'''自动lambda的目标，每次求值一个，结果不保存在节点上(an auto lambda target, one per evaluation, so no result is kept on the node)'''
+	def __init__(self, node):
+		self.value = Unsolved
+		self.node = node
+	def make_lambda(self):
+		return auto_lambda(self.node)
+
+def solve(node, env):
+	'''把node作为自动lambda的目标求值(evaluate node as an auto lambda target)'''
+	target = Target(node)
+	with InterpreterScope(StackEvent('auto_lambda', target)):
+		value = node.eval(env)
+	if value is Unsolved:
+		return target.value
+	return value
+
+def undefined(line_no, info):
+	'''变量未定义时，将最近的自动lambda目标变为lambda(turn the nearest auto lambda target into a lambda)'''
+	event = InterpreterScope.get_node_with('auto_lambda')
+	if not event:
+		raise RuntimeException(line_no, info)
+	if event.info.value == Unsolved:
+		event.info.value = event.info.make_lambda()
+	return Unsolved
+
+class Readonly:
+	__slots__ = ()
 
 class Node():
+	'''eval返回求得的值，不在节点上保存结果，所以一棵语法树可以同时被多次求值
+	(eval returns the value instead of keeping it on the node, so one tree can be evaluated many times at once)'''
+	__slots__ = ('line_no', 'parent', 'chilren')
+	# type由类名而来，不在每个节点上保存(type comes from the class name and is not kept on every node)
+	type = 'Node'
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		if 'type' not in cls.__dict__:
+			cls.type = cls.__name__
 	def __init__(self, line_no):
 		self.line_no = line_no
-		self.value = Unsolved
-		self.type = type(self).__name__
 		self.parent = None
-		self.chilren = []
+		self.chilren = ()
 	def _type(self):
 		return type(self).__name__
 	def _code(self, scope):
@@ -62,12 +103,12 @@ class Node():
 			return sum([child._currying(try_env) for child in self.children])
 
 class Nothing(Node):
+	__slots__ = ('val',)
 	def __init__(self, line_no):
 		super(Nothing, self).__init__(line_no)
 		self.val = Nothing
-		self.value = self
 	def eval(self, env):
-		self.value = obj.fobject_nothing
+		return obj.fobject_nothing
 	def _code(self,scope=0):
 		return 'nothing'
 	def _copy(self):
@@ -76,11 +117,12 @@ class Nothing(Node):
 		return Bool(self.line_no, False)
 
 class Bool(Node):
+	__slots__ = ('val',)
 	def __init__(self, line_no, val):
 		super(Bool, self).__init__(line_no)
 		self.val = val
 	def eval(self, env):
-		self.value = obj.Bool._py2fun(self.val)
+		return obj.Bool._py2fun(self.val)
 	def _code(self, scope=0):
 		if self.val:
 			return 'yes'
@@ -90,27 +132,58 @@ class Bool(Node):
 		return Bool(self.line_no, self.val)
 
 class Number(Node):
+	__slots__ = ('val',)
 	def __init__(self, line_no, val):
 		super(Number, self).__init__(line_no)
 		self.val = val
 	def eval(self, env):
-		self.value = obj.Number(self.val)
+		return obj.Number._py2fun(self.val)
 	def _code(self, scope=0):
 		return str(self.val)
 	def _copy(self):
 		return Number(self.line_no, self.val)
 
 class String(Node):
+	__slots__ = ('val',)
 	def __init__(self, line_no, val):
 		super(String, self).__init__(line_no)
 		self.val = val
 	def eval(self, env):
-		self.value = obj.String(self.val)
+		return obj.String._py2fun(self.val)
 	def _code(self, scope=0):
 		return '"{}"'.format(self.val)
 	def _copy(self):
 		return String(self.line_no, self.val)
 
+def copy_literal(value):
+	'''字面量表每次求值都要得到新表(a literal table gives a new table at each evaluation)'''
+	if not isinstance(value, obj.Table):
+		return value
+	new = value._copy()
+	new._list = [copy_literal(item) for item in value._list]
+	new._dict = {key: copy_literal(item) for key, item in value._dict.items()}
+	new.always = copy_literal(value.always)
+	return new
+
+class Constant(Node):
+	'''优化时预先求出的值，代码仍是原来的节点(a value worked out by the optimizer, its code is still the source node)'''
+	__slots__ = ('source', 'val', 'mutable')
+	def __init__(self, source, val):
+		super(Constant, self).__init__(source.line_no)
+		self.source = source
+		self.val = val
+		self.mutable = isinstance(val, obj.Table)
+	def eval(self, env):
+		return self.make()
+	def make(self):
+		if self.mutable:
+			return copy_literal(self.val)
+		return self.val
+	def _code(self, scope=0):
+		return self.source._code(scope)
+	def _copy(self):
+		return Constant(self.source, self.val)
+
 class OperatorValidator:
 	chinese_name = {
 		'_neg': '取负',
@@ -140,186 +213,261 @@ class OperatorValidator:
 	def __init__(self, opt_name, validator):
 		self.opt_name = opt_name
 		self.validator = validator
-	def validate(self, line_no, *operands):
-		def _validate(rule, operands):
-			for id, operand in enumerate(operands):
-				if not isinstance(operand.value, rule[id]):
+	def match(self, line_no, nodes, values):
+		'''找到与操作数的值匹配的规则，错误信息中使用节点的代码(find the rule matching the values, the error shows the code of the nodes)'''
+		def _validate(rule, values):
+			for id, value in enumerate(values):
+				if not isinstance(value, rule[id]):
 					return False
 			return True
 		for rule in self.validator:
-			if _validate(rule, operands):
+			if _validate(rule, values):
 				return self.opt_name, rule
-		operand_name = ', '.join(['{}: {}'.format(operand.value._type(), operand._code()) for operand in operands])
+		operand_name = ', '.join(['{}: {}'.format(value._type(), node._code()) for node, value in zip(nodes, values)])
 		raise RuntimeException(line_no, '不可对 ({}) 使用 {} 操作符'.format(operand_name, OperatorValidator.chinese_name[self.opt_name]))
+	def resolve(self, line_no, nodes, values):
+		'''返回(左值类型, 右值类型, 实现, 规则)，按类型记在dispatch_table中；没有匹配的规则时引发与match相同的错误
+		(return (left type, right type, implementation, rule), kept in dispatch_table by the types; with no matching rule the same error as match is raised)'''
+		left_type, right_type = type(values[0]), type(values[1])
+		key = (self.opt_name, left_type, right_type)
+		entry = dispatch_table.get(key)
+		if entry is None:
+			entry = False
+			for rule in self.validator:
+				if issubclass(left_type, rule[0]) and issubclass(right_type, rule[1]):
+					entry = (left_type, right_type, getattr(left_type, self.opt_name), rule)
+					break
+			dispatch_table[key] = entry
+		if not entry:
+			self.match(line_no, nodes, values)
+		return entry
+
+# (操作, 左值类型, 右值类型) -> resolve的结果，没有匹配的规则时为False
+# ((operation, left type, right type) -> the result of resolve, False with no matching rule)
+dispatch_table = {}
+# 节点上的内联缓存的初值，不与任何类型相同(the initial inline cache of a node, it matches no type)
+empty_cache = (None, None, None, None)
+
+binary_operator_validator = {
+	'+': OperatorValidator('_add', 
+		[
+			(obj.Number, obj.Number),
+			(obj.FinalValue, obj.String),
+			(obj.String, obj.FinalValue)
+		]),
+	'-': OperatorValidator('_sub', 
+		[(obj.Number, obj.Number)]),
+	'*': OperatorValidator('_mul', 
+		[
+			(obj.Number, obj.Number),
+			(obj.Number, obj.String),
+			(obj.String, obj.Number)
+		]),
+	'/': OperatorValidator('_div', 
+		[(obj.Number, obj.Number)]),
+	'%': OperatorValidator('_mod', 
+		[(obj.Number, obj.Number)]),
+	'^': OperatorValidator('_pow', 
+		[(obj.Number, obj.Number,)]),
+	'>': OperatorValidator('_gt', 
+		[(obj.Number, obj.Number)]),
+	'>=': OperatorValidator('_ge', 
+		[(obj.Number, obj.Number)]),
+	'<': OperatorValidator('_lt', 
+		[(obj.Number, obj.Number)]),
+	'<=': OperatorValidator('_le', 
+		[(obj.Number, obj.Number)]),
+	'==': OperatorValidator('_eq', 
+		[(obj.FinalValue, obj.FinalValue)]),
+	'!=': OperatorValidator('_ne', 
+		[(obj.FinalValue, obj.FinalValue)]),
+	'and': OperatorValidator('_and', 
+		[(obj.FinalValue, obj.FinalValue)]),
+	'or': OperatorValidator('_or', 
+		[(obj.FinalValue, obj.FinalValue)]),
+	'xor': OperatorValidator('_xor', 
+		[(obj.FinalValue, obj.FinalValue)]),
+}
+
+map_validator = OperatorValidator('_map', 
+	[
+		(obj.Generator, obj.Fun),
+		(obj.Generator, obj.Table),
+		# to do
+		#(obj.Table, obj.Fun),
+		#(obj.Table, obj.Table),
+	]
+)
+
+filter_validator = OperatorValidator('_filter', 
+	[
+		(obj.Generator, obj.Fun),
+		(obj.Generator, obj.Table),
+		# to do
+		#(obj.Table, obj.Fun),
+		#(obj.Table, obj.Table),
+	]
+)
+
+reduce_validator = OperatorValidator('_reduce', 
+	[
+		(obj.Generator, obj.Generator),
+	]
+)
+
+reload_validator = OperatorValidator('_reload', 
+	[
+		(obj.Fun, obj.Table),
+		(obj.Table, obj.Table),
+	]
+)
 
 class Index(Node, Readonly):
+	__slots__ = ()
 	def __init__(self, line_no):
 		super(Index, self).__init__(line_no)
 	def eval(self, env):
-		value = obj.Number(env.sys_get(Index))
+		value = obj.Number._py2fun(env.sys_get(Index))
 		if value == obj.Undefined:
 			raise RuntimeException(self.line_no, '不可在循环外使用index')
-		self.value = value
+		return value
 	def _code(self, scope=0):
 		return '#{right}'.format(right=self.right._code(scope))
 	def _copy(self):
 		return Index(self.line_no)
 
 class Variable(Node):
+	__slots__ = ('right',)
 	def __init__(self, line_no, right):
 		super(Variable, self).__init__(line_no)
 		self.set_parent_for_children(right)
 		self.right = right
 	def eval(self, env):
-		clear(self.right)
-		self.right.eval(env)
-		if not is_unsolvable(self.right):
-			if not isinstance(self.right.value, (obj.Number, obj.String)):
-				raise RuntimeException(self.right.line_no, '{} 不是整数或字符串'.format(self.right._code()))
-			value = env.get(self.line_no, self.right.value)
-			if value == obj.Undefined:
-				event = InterpreterScope.get_node_with('auto_lambda')
-				if event:
-					if event.info.value == Unsolved:
-						event.info.value = auto_lambda(event.info)
-				else:
-					raise RuntimeException(self.right.line_no, '未定义变量: @{}'.format(self.right._code()))
-			else:
-				self.value = value
+		key = self.right.eval(env)
+		if key is Unsolved:
+			return Unsolved
+		return self.lookup(env, key)
+	def lookup(self, env, key):
+		if not isinstance(key, (obj.Number, obj.String)):
+			raise RuntimeException(self.right.line_no, '{} 不是整数或字符串'.format(self.right._code()))
+		value = env.get(self.line_no, key)
+		if value == obj.Undefined:
+			return undefined(self.right.line_no, '未定义变量: @{}'.format(self.right._code()))
+		return value
 	def _code(self, scope=0):
 		return '@{right}'.format(right=self.right._code(scope))
 	def _copy(self):
 		return Variable(self.line_no, self.right._copy())
 
 class BinaryOperator(Node):
+	'''cache是上次求值时操作数的类型与对应的实现(cache holds the operand types of the last evaluation and their implementation)'''
+	__slots__ = ('opt', 'left', 'right', 'cache')
 	def __init__(self, line_no, opt, left, right):
 		super(BinaryOperator, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.opt = opt
 		self.left = left
 		self.right = right
+		self.cache = empty_cache
 	def eval(self, env):
-		binary_operator_validator = {
-			'+': OperatorValidator('_add', 
-				[
-					(obj.Number, obj.Number),
-					(obj.FinalValue, obj.String),
-					(obj.String, obj.FinalValue)
-				]),
-			'-': OperatorValidator('_sub', 
-				[(obj.Number, obj.Number)]),
-			'*': OperatorValidator('_mul', 
-				[
-					(obj.Number, obj.Number),
-					(obj.Number, obj.String),
-					(obj.String, obj.Number)
-				]),
-			'/': OperatorValidator('_div', 
-				[(obj.Number, obj.Number)]),
-			'%': OperatorValidator('_mod', 
-				[(obj.Number, obj.Number)]),
-			'^': OperatorValidator('_pow', 
-				[(obj.Number, obj.Number,)]),
-			'>': OperatorValidator('_gt', 
-				[(obj.Number, obj.Number)]),
-			'>=': OperatorValidator('_ge', 
-				[(obj.Number, obj.Number)]),
-			'<': OperatorValidator('_lt', 
-				[(obj.Number, obj.Number)]),
-			'<=': OperatorValidator('_le', 
-				[(obj.Number, obj.Number)]),
-			'==': OperatorValidator('_eq', 
-				[(obj.FinalValue, obj.FinalValue)]),
-			'!=': OperatorValidator('_ne', 
-				[(obj.FinalValue, obj.FinalValue)]),
-			'and': OperatorValidator('_and', 
-				[(obj.FinalValue, obj.FinalValue)]),
-			'or': OperatorValidator('_or', 
-				[(obj.FinalValue, obj.FinalValue)]),
-			'xor': OperatorValidator('_xor', 
-				[(obj.FinalValue, obj.FinalValue)]),
-		}
-		clear(self.left, self.right)
-		self.left.eval(env)
-		self.right.eval(env)
-		if not is_unsolvable(self.left, self.right):
-			validator = binary_operator_validator[self.opt]
-			method_name, pattern = validator.validate(self.line_no, self.left, self.right)
-			operator = getattr(self.left.value, method_name)
-			self.value = operator(self.right, pattern)
+		left = self.left.eval(env)
+		right = self.right.eval(env)
+		if left is Unsolved or right is Unsolved:
+			return Unsolved
+		return self.apply(left, right)
+	def apply(self, left, right):
+		cache = self.cache
+		if cache[0] is not type(left) or cache[1] is not type(right):
+			cache = self.cache = binary_operator_validator[self.opt].resolve(self.line_no, (self.left, self.right), (left, right))
+		return cache[2](left, right, cache[3])
 	def _code(self, scope=0):
 		return '{left} {opt} {right}'.format(left=self.left._code(scope), opt=self.opt, right=self.right._code(scope))
 	def _copy(self):
 		return BinaryOperator(self.line_no, self.opt, self.left._copy(), self.right._copy())
 
 class UnaryOperator(Node):
+	'''cache是上次操作数的类型与它的实现，没有实现时为None(cache holds the last operand type and its implementation, None if it has none)'''
+	__slots__ = ('opt', 'right', 'cache')
 	def __init__(self, line_no, opt, right):
 		super(UnaryOperator, self).__init__(line_no)
 		self.set_parent_for_children(right)
 		self.opt = opt
 		self.right = right
+		self.cache = (None, None)
+	method_name = {
+		'-': '_neg',
+		'!': '_not',
+		'?': '_bool',
+		'#': '_len',
+	}
 	def eval(self, env):
-		method_name = {
-			'-': '_neg',
-			'!': '_not',
-			'?': '_bool',
-			'#': '_len',
-		}
-		clear(self.right)
-		self.right.eval(env)
-		if not is_unsolvable(self.right):
-			try:
-				operation = getattr(self.right.value, method_name[self.opt])
-				self.value = operation()
-			except AttributeError:
-				raise RuntimeException(self.right.line_no, '{0} 无法进行 {1} 操作'.format(self.right._code(), OperatorValidator.chinese_name[method_name[self.opt]]))
+		value = self.right.eval(env)
+		if value is Unsolved:
+			return Unsolved
+		return self.apply(value)
+	def apply(self, value):
+		method_name = UnaryOperator.method_name[self.opt]
+		cache = self.cache
+		if cache[0] is not type(value):
+			cache = self.cache = (type(value), getattr(type(value), method_name, None))
+		try:
+			if cache[1] is not None:
+				return cache[1](value)
+		except AttributeError:
+			pass
+		raise RuntimeException(self.right.line_no, '{0} 无法进行 {1} 操作'.format(self.right._code(), OperatorValidator.chinese_name[method_name]))
 	def _code(self, scope=0):
 		return '({opt}{right})'.format(opt=self.opt, right=self.right._code(scope))
 	def _copy(self):
 		return UnaryOperator(self.line_no, self.opt, self.right._copy())		
 
 class Group(Node):
+	__slots__ = ('inner',)
 	def __init__(self, line_no, inner):
 		super(Group, self).__init__(line_no)
 		self.set_parent_for_children(inner)
 		self.inner = inner
 	def eval(self, env):
-		clear(self.inner)
-		self.inner.eval(env)
-		if not is_unsolvable(self.inner):
-			self.value = self.inner.value
+		return self.inner.eval(env)
 	def _code(self, scope=0):
 		return '({})'.format(self.inner._code(scope))
 	def _copy(self):
 		return Group(self.line_no, self.inner._copy())
 
 class Identifier(Node):
-	def __init__(self, line_no, id):
+	__slots__ = ('id', 'local')
+	def __init__(self, line_no, id, local=False):
 		super(Identifier, self).__init__(line_no)
 		self.id = id
+		# local由resolver设置：名字一定已在当前环境中赋值(set by the resolver: the name must have been assigned in the current environment)
+		self.local = local
 	def eval(self, env):
-		value = env.get(self.line_no, obj.String(self.id))
-		if value == obj.Undefined:
-			event = InterpreterScope.get_node_with('auto_lambda')
-			if event:
-				if event.info.value == Unsolved:
-					event.info.value = auto_lambda(event.info)
-			else:
-				raise RuntimeException(self.line_no, '未定义变量: {}'.format(self.id))
-		else:
-			self.value = value
+		value = env.user_data._dict.get(self.id) if self.local else None
+		if value is None:
+			value = env.get_name(self.id)
+		if value is obj.Undefined:
+			return undefined(self.line_no, '未定义变量: {}'.format(self.id))
+		return value
 	def _code(self, scope=0):
 		return str(self.id)
 	def _copy(self):
-		return Identifier(self.line_no, self.id)
+		return Identifier(self.line_no, self.id, self.local)
+
+# 性能报告中程序顶层的名字(the name of the top level of a program in a profile)
+PROGRAM_LABEL = '<program>'
 
 class Program(Node):
+	__slots__ = ('stmts',)
 	def __init__(self, line_no, stmts):
 		super(Program, self).__init__(line_no)
 		self.set_parent_for_children(*stmts)
 		self.stmts = stmts
 	def eval(self, env):
+		profiler = get_context().profiler
+		if profiler is not None:
+			return profiler.run(self.stmts, env, PROGRAM_LABEL)
 		for stmt in self.stmts:
+			tick(stmt.line_no)
 			stmt.eval(env)
 	def _copy(self):
 		new_body = [stmt._copy() for stmt in self.stmts]
@@ -327,21 +475,22 @@ class Program(Node):
 	def _code(self, scope=0):
 		return '\n'.join([stmt._code(scope) for stmt in self.stmts])
 
-class Trigger(Node): pass
+class Trigger(Node):
+	__slots__ = ()
 
 class CallBlock(Trigger):
+	__slots__ = ('right',)
 	def __init__(self, line_no, right):
 		super(CallBlock, self).__init__(line_no)
 		self.set_parent_for_children(right)
 		self.right = right
 	def eval(self, env):
-		clear(self.right)
-		self.right.eval(env)
-		if is_unsolvable(self.right):
-			return
-		if not isinstance(self.right.value, obj.Fun):
+		callable = self.right.eval(env)
+		if callable is not Unsolved:
+			self.apply(env, callable)
+	def apply(self, env, callable):
+		if not isinstance(callable, obj.Fun):
 			raise RuntimeException(self.line_no, '{} 不可被调用'.format(self.right._code()))
-		callable = self.right.value
 		call_env = obj.Environment(callable._init(), parent=env, temporary=True)
 		callable._call(self.line_no, call_env)
 	def _copy(self):
@@ -350,63 +499,58 @@ class CallBlock(Trigger):
 		return '-> {}'.format(self.right._code(scope))
 
 class Call(Trigger):
+	__slots__ = ('left', 'right')
 	def __init__(self, line_no, left, right):
 		super(Call, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.left = left
 		self.right = right
 	def eval(self, env):
-		clear(self.left, self.right)
-		self.left.eval(env)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if is_unsolvable(self.left, self.right):
-			return
-		args, callable = self.left.value, self.right.value
-		args = callable.make_args(args)
+		left = self.left.eval(env)
+		right = solve(self.right, env)
+		if left is Unsolved or right is Unsolved:
+			return Unsolved
+		return self.apply(env, left, right)
+	def apply(self, env, args, callable):
 		if not isinstance(callable, obj.Fun):
 			raise RuntimeException(self.line_no, '{} 不可被调用'.format(self.right._code()))
+		args = callable.make_args(args)
 		call_env = obj.Environment(callable._init(args), parent=env)
 		try:
 			callable._call(self.line_no, call_env)
 		except ReturnMessage as ret:
-			self.value = ret.value
-		else:
-			self.value = Nothing(self.line_no)
+			return ret.value
+		return obj.fobject_nothing
 	def _copy(self):
 		return Call(self.line_no, self.left._copy(), self.right._copy())
 	def _code(self, scope=0):
 		return '{} -> {}'.format(self.left._code(scope), self.right._code(scope))
 
 class Detect(Trigger):
+	__slots__ = ('left', 'right')
 	def __init__(self, line_no, left, right):
 		super(Detect, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.left = left
 		self.right = right
 	def eval(self, env):
-		clear(self, self.left, self.right)
-		self.left.eval(env)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if is_unsolvable(self.left, self.right):
-			return
-		generator, detector = self.left.value, self.right.value
+		left = self.left.eval(env)
+		right = solve(self.right, env)
+		if left is Unsolved or right is Unsolved:
+			return Unsolved
+		return self.apply(env, left, right)
+	def apply(self, env, generator, detector):
 		if not isinstance(generator, obj.Generator):
 			raise RuntimeException(self.line_no, '只有Generator才可以被检测，而 {} 不是Generator'.format(self.left._code()))
 		if not isinstance(detector, obj.Fun):
-			raise RuntimeException(self.line_no, '{} 不可作为检测器'.format(right._code()))
+			raise RuntimeException(self.line_no, '{} 不可作为检测器'.format(self.right._code()))
 		gen_env = obj.Environment(generator._init(None), parent=env)
 		count = 0
 		while True:
 			gen_env.sys_set(Index, count)
-			if count > MAX_LOOP_COUNT:
-				raise RuntimeException(self.line_no, '你可能陷入了死循环')
-			try:
-				generator._call(self.line_no, gen_env)
-			except ReturnMessage as ret:
-				value = ret.value
-			except StopMessage:
+			tick(self.line_no)
+			value = generator._next(self.line_no, gen_env)
+			if value is obj.Exhausted:
 				break
 			args = detector.make_args(value)
 			detector_env = obj.Environment(detector._init(args), parent=env)
@@ -414,146 +558,130 @@ class Detect(Trigger):
 			try:
 				detector._call(self.line_no, detector_env)
 			except ReturnMessage as ret:
-				if ret.value._bool().val:
-					self.value = ret.value
-					return
+				if ret.value._bool().py_val:
+					return ret.value
 			count += 1
-		self.value = Nothing(self.line_no)
+		return obj.fobject_nothing
 	def _copy(self):
 		return Detect(self.line_no, self.left._copy(), self.right._copy())
 	def _code(self, scope=0):
 		return '{} <?= {}'.format(self.left._code(scope), self.right._code(scope))
 
 class Transform(Node):
+	__slots__ = ('left', 'right', 'cache')
 	def __init__(self, line_no, left, right):
 		super(Transform, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.left = left
 		self.right = right
+		self.cache = empty_cache
 	def eval(self, env):
-		validator = OperatorValidator('_map', 
-			[
-				(obj.Generator, obj.Fun),
-				(obj.Generator, obj.Table),
-				# to do
-				#(obj.Table, obj.Fun),
-				#(obj.Table, obj.Table),
-			]
-		)
-		clear(self, self.left, self.right)
-		self.left.eval(env)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if is_unsolvable(self.left, self.right):
-			return
-		opt_name, pattern = validator.validate(self.line_no, self.left, self.right)
-		map_method = getattr(self.left.value, opt_name)
-		self.value = map_method(self.right, pattern)
+		left = self.left.eval(env)
+		right = solve(self.right, env)
+		if left is Unsolved or right is Unsolved:
+			return Unsolved
+		return self.apply(left, right)
+	def apply(self, generator, transformer):
+		cache = self.cache
+		if cache[0] is not type(generator) or cache[1] is not type(transformer):
+			cache = self.cache = map_validator.resolve(self.line_no, (self.left, self.right), (generator, transformer))
+		return cache[2](generator, transformer, cache[3])
 	def _copy(self):
 		return Transform(self.line_no, self.left._copy(), self.right._copy())
 	def _code(self, scope=0):
 		return '{} => {}'.format(self.left._code(scope), self.right._code(scope))
 
 class Filter(Node):
+	__slots__ = ('left', 'right', 'cache')
 	def __init__(self, line_no, left, right):
 		super(Filter, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.left = left
 		self.right = right
+		self.cache = empty_cache
 	def eval(self, env):
-		validator = OperatorValidator('_filter', 
-			[
-				(obj.Generator, obj.Fun),
-				(obj.Generator, obj.Table),
-				# to do
-				#(obj.Table, obj.Fun),
-				#(obj.Table, obj.Table),
-			]
-		)
-		clear(self, self.left, self.right)
-		self.left.eval(env)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if is_unsolvable(self.left, self.right):
-			return
-		opt_name, pattern = validator.validate(self.line_no, self.left, self.right)
-		filter_method = getattr(self.left.value, opt_name)
-		self.value = filter_method(self.right, pattern)
+		left = self.left.eval(env)
+		right = solve(self.right, env)
+		if left is Unsolved or right is Unsolved:
+			return Unsolved
+		return self.apply(left, right)
+	def apply(self, generator, checker):
+		cache = self.cache
+		if cache[0] is not type(generator) or cache[1] is not type(checker):
+			cache = self.cache = filter_validator.resolve(self.line_no, (self.left, self.right), (generator, checker))
+		return cache[2](generator, checker, cache[3])
 	def _copy(self):
 		return Filter(self.line_no, self.left._copy(), self.right._copy())
 	def _code(self, scope=0):
 		return '{} | {}'.format(self.left._code(scope), self.right._code(scope))
 
 class Reduce(Node):
+	__slots__ = ('left', 'right', 'cache')
 	def __init__(self, line_no, left, right):
 		super(Reduce, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.left = left
 		self.right = right
+		self.cache = empty_cache
 	def eval(self, env):
-		validator = OperatorValidator('_reduce', 
-			[
-				(obj.Generator, obj.Generator),
-			]
-		)
-		clear(self, self.left, self.right)
-		self.left.eval(env)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if is_unsolvable(self.left, self.right):
-			return
-		opt_name, pattern = validator.validate(self.line_no, self.left, self.right)
-		reduce_method = getattr(self.left.value, opt_name)
-		try:
-			self.value = reduce_method(self.line_no, self.right, env, pattern)
-		except ReturnMessage as ret:
-			self.value = ret.value
-		else:
-			self.value = Nothing(self.line_no)
+		left = self.left.eval(env)
+		right = solve(self.right, env)
+		if left is Unsolved or right is Unsolved:
+			return Unsolved
+		return self.apply(env, left, right)
+	def apply(self, env, generator, reducer):
+		cache = self.cache
+		if cache[0] is not type(generator) or cache[1] is not type(reducer):
+			cache = self.cache = reduce_validator.resolve(self.line_no, (self.left, self.right), (generator, reducer))
+		return cache[2](generator, self.line_no, reducer, env, cache[3])
 	def _copy(self):
 		return Filter(self.line_no, self.left._copy(), self.right._copy())
 	def _code(self, scope=0):
 		return '{} >>| {}'.format(self.left._code(scope), self.right._code(scope))
 
 class Unfold(Node):
+	__slots__ = ('right',)
 	def __init__(self, line_no, right):
 		super(Unfold, self).__init__(line_no)
 		self.set_parent_for_children(right)
 		self.right = right
 	def eval(self, env):
-		clear(self.right)
-		self.right.eval(env)
-		if is_unsolvable(self.right):
+		value = self.right.eval(env)
+		if value is Unsolved:
 			return
-		if isinstance(self.right.value, obj.Table):
+		if self.parent.type == 'TableStatementNode':
+			container = InterpreterScope.get_node_with('table_statement').info
+		elif self.parent.type == 'FunStatementNode':
+			container = InterpreterScope.get_node_with('fun_statement').info
+		else:
+			container = None
+		self.apply(env, value, container)
+	def apply(self, env, value, container):
+		'''container是正在声明的表或函数体(container is the table or the fun body being declared)'''
+		if isinstance(value, obj.Table):
 			if self.parent.type == 'TableStatementNode':
-				table = InterpreterScope.get_node_with('table_statement').info
-				table._list += self.right.value._list
-				table._dict = {**table._dict, **self.right.value._dict}
-				if self.right.value.always is not None:
-					table.always = self.right.value.always
+				table = container
+				table._list += value._list
+				table._dict = {**table._dict, **value._dict}
+				if value.always is not None:
+					table.always = value.always
 			else:
 				raise RuntimeException(self.line_no, '不可以在表声明之外展开表')
-		elif isinstance(self.right.value, obj.Fun):
+		elif isinstance(value, obj.Fun):
 			if self.parent.type == 'FunStatementNode':
-				outer_body = InterpreterScope.get_node_with('fun_statement').info
-				outer_body += self.right.value.body
+				container += value.body
 			elif self.parent.type == 'TableStatementNode':
-				if not isinstance(self.right.value, obj.Generator):
+				if not isinstance(value, obj.Generator):
 					raise RuntimeException(self.line_no, '只有生成器才可以在表声明内展开')
-				table = InterpreterScope.get_node_with('table_statement').info
-				generator = self.right.value
+				table = container
+				generator = value
 				gen_env = obj.Environment(generator._init(), parent=env)
 				count = 0
 				while True:
 					gen_env.sys_set(Index, count)
-					if count > MAX_LOOP_COUNT:
-						raise RuntimeException(self.line_no, '你可能陷入了死循环')
-					try:
-						generator._call(self.line_no, gen_env)
-					except ReturnMessage as ret:
-						value = ret.value
-					except StopMessage:
+					tick(self.line_no)
+					value = generator._next(self.line_no, gen_env)
+					if value is obj.Exhausted:
 						break
 					if isinstance(value, obj.Table):
 						table._list += value._list
@@ -572,32 +700,31 @@ class Unfold(Node):
 		return Unfold(self.line_no, self.right._copy())
 
 class Reload(Node):
+	__slots__ = ('left', 'initializer', 'cache')
 	def __init__(self, line_no, left, initializer):
 		super(Reload, self).__init__(line_no)
 		self.set_parent_for_children(left, initializer)
 		self.left = left
 		self.initializer = initializer
+		self.cache = empty_cache
 	def eval(self, env):
-		validator = OperatorValidator('_reload', 
-			[
-				(obj.Fun, obj.Table),
-				(obj.Table, obj.Table),
-			]
-		)
-		clear(self.left, self.initializer)
-		with InterpreterScope(StackEvent('auto_lambda', self.left)):
-			self.left.eval(env)
-		self.initializer.eval(env)
-		if not is_unsolvable(self.left, self.initializer):
-			opt_name, pattern = validator.validate(self.line_no, self.left, self.initializer)
-			reload_method = getattr(self.left.value, opt_name)
-			self.value = reload_method(self.initializer, pattern)
+		left = solve(self.left, env)
+		initializer = self.initializer.eval(env)
+		if left is Unsolved or initializer is Unsolved:
+			return Unsolved
+		return self.apply(left, initializer)
+	def apply(self, left, initializer):
+		cache = self.cache
+		if cache[0] is not type(left) or cache[1] is not type(initializer):
+			cache = self.cache = reload_validator.resolve(self.line_no, (self.left, self.initializer), (left, initializer))
+		return cache[2](left, initializer, cache[3])
 	def _copy(self):
 		return Reload(self.line_no, self.left._copy(), self.initializer._copy())
 	def _code(self, scope=0):
 		return '{} << {}'.format(self.left._code(scope), self.initializer._code(scope))
 
 class FunStatementNode(Node):
+	__slots__ = ('body',)
 	def __init__(self, line_no, body):
 		super(FunStatementNode, self).__init__(line_no)
 		self.set_parent_for_children(*body)
@@ -610,7 +737,7 @@ class FunStatementNode(Node):
 					stmt.eval(env)
 				else:
 					body.append(stmt)
-		self.value = obj.Fun(body)
+		return obj.Fun(body)
 	def _code(self, scope=0):
 		body = [stmt._code(scope + 1) for stmt in self.body]
 		inner_intent = intent * (scope + 1)
@@ -623,20 +750,26 @@ class FunStatementNode(Node):
 		return FunStatementNode(self.line_no, body)
 
 class Subscript(Node):
+	__slots__ = ('collection', 'key')
 	def __init__(self, line_no, collection, key):
 		super(Subscript, self).__init__(line_no)
 		self.set_parent_for_children(collection, key)
 		self.collection = collection
 		self.key = key
 	def eval(self, env):
-		clear(self.collection, self.key)
-		self.collection.eval(env)
-		self.key.eval(env)
-		if not is_unsolvable(self.collection, self.key):
-			try:
-				self.value = self.collection.value._getitem(self.line_no, self.key)
-			except AttributeError:
-				raise RuntimeException(self.collection.line_no, '{}不是容器'.format(self.collection._code()))
+		collection = self.collection.eval(env)
+		key = self.key.eval(env)
+		if collection is Unsolved or key is Unsolved:
+			return Unsolved
+		return self.apply(collection, key)
+	def apply(self, collection, key):
+		try:
+			value = collection._getitem(self.line_no, key, Unsolved)
+		except AttributeError:
+			raise RuntimeException(self.collection.line_no, '{}不是容器'.format(self.collection._code()))
+		if value == Unsolved:
+			raise RuntimeException(self.line_no, '不存在的key值 {}'.format(self.key._code()))
+		return value
 	def _code(self, scope=0):
 		return '{collection}[{key}]'.format(collection=self.collection._code(scope), key=self.key._code(scope))
 	def _copy(self):
@@ -645,6 +778,7 @@ class Subscript(Node):
 		return Subscript(self.line_no, collection, key)
 
 class Assignment(Node):
+	__slots__ = ('left', 'right')
 	def __init__(self, line_no, left, right):
 		super(Assignment, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
@@ -652,37 +786,23 @@ class Assignment(Node):
 		self.right = right
 	def eval(self, env):
 		node = innermost(self.left)
-		def setitem(left, right, env):
-			clear(left.collection, left.key, right)
-			left.collection.eval(env)
-			left.key.eval(env)
-			with InterpreterScope(StackEvent('auto_lambda', right)):
-				right.eval(env)
-			if not is_unsolvable(left.collection, left.key, right):
-				collection, key = left.collection.value, left.key
-				try:
-					collection._setitem(key, right.value)
-				except AttributeError:
-					raise RuntimeException(left.collection.line_no, '{}不是容器'.format(left.collection._code()))
-				self.value = right.value
-		
-		def assignment(left, right, env):
-			clear(left, right)
-			with InterpreterScope(StackEvent('auto_lambda', right)):
-				right.eval(env)
-			if not is_unsolvable(right):
-				env.set(obj.String(left.id), right.value)
-			self.value = right.value
-
-		evaluators = {
-			'Subscript': setitem,
-			'Identifier': assignment,
-		}
-		evaluate = evaluators.get(node.type, None)
-		if evaluate:
-			evaluate(node, self.right, env)
-		else:
-			raise RuntimeException(node.line_no, '不可以向{}赋值'.format(node._code()))
+		if node.type == 'Identifier':
+			value = solve(self.right, env)
+			if value is not Unsolved:
+				env.set_name(node.id, value)
+			return value
+		if node.type == 'Subscript':
+			collection = node.collection.eval(env)
+			key = node.key.eval(env)
+			value = solve(self.right, env)
+			if collection is Unsolved or key is Unsolved or value is Unsolved:
+				return Unsolved
+			try:
+				collection._setitem(key, value)
+			except AttributeError:
+				raise RuntimeException(node.collection.line_no, '{}不是容器'.format(node.collection._code()))
+			return value
+		raise RuntimeException(node.line_no, '不可以向{}赋值'.format(node._code()))
 	def _code(self, scope=0):
 		return '{left} = {right}'.format(left=self.left._code(scope), right=self.right._code(scope))
 	def _copy(self):
@@ -691,82 +811,88 @@ class Assignment(Node):
 		return Assignment(self.line_no, left, right)
 
 class Return(Node):
+	__slots__ = ('right',)
 	def __init__(self, line_no, right):
 		super(Return, self).__init__(line_no)
 		self.set_parent_for_children(right)
 		self.right = right if right else Nothing()
 	def eval(self, env):
-		clear(self.right)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if not is_unsolvable(self.right):
-			msg = ReturnMessage(self.right.value)
-			raise msg
+		value = solve(self.right, env)
+		if value is not Unsolved:
+			raise ReturnMessage(value)
 	def _code(self, scope=0):
 		return '<- {right}'.format(right=self.right._code(scope))
 	def _copy(self):
 		return Return(self.line_no, self.right._copy())
 
+class AutoReturn(Return):
+	'''自动lambda的函数体，同Return但不改动node的parent(the body of an auto lambda, like Return but leaves the parent of node alone)'''
+	__slots__ = ()
+	type = 'Return'
+	def __init__(self, node):
+		Node.__init__(self, node.line_no)
+		self.right = node
+		self.chilren = (node,)
+	def _copy(self):
+		return self
+
 class ListItem(Node):
+	__slots__ = ('item',)
 	def __init__(self, line_no, item):
 		super(ListItem, self).__init__(line_no)
 		self.set_parent_for_children(item)
 		self.item = item
 	def eval(self, env):
 		table = InterpreterScope.get_node_with('table_statement').info
-		clear(self.item)
-		with InterpreterScope(StackEvent('auto_lambda', self.item)):
-			self.item.eval(env)
-		if not is_unsolvable(self.item):
-			table._list.append(self.item.value)
+		value = solve(self.item, env)
+		if value is not Unsolved:
+			table._list.append(value)
 	def _code(self, scope=0):
 		return self.item._code(scope)
 	def _copy(self):
 		return ListItem(self.line_no, self.item)
 
 class DictItem(Node):
+	__slots__ = ('left', 'right')
 	def __init__(self, line_no, left, right):
 		super(DictItem, self).__init__(line_no)
 		self.set_parent_for_children(left, right)
 		self.left = left
 		self.right = right
 	def eval(self, env):
-		clear(self.left, self.right)
-		self.left.eval(env)
-		with InterpreterScope(StackEvent('auto_lambda', self.right)):
-			self.right.eval(env)
-		if not is_unsolvable(self.left, self.right):
+		key = self.left.eval(env)
+		value = solve(self.right, env)
+		if key is not Unsolved and value is not Unsolved:
 			table = InterpreterScope.get_node_with('table_statement').info
-			table._dict[self.left.value._id()] = self.right.value
+			table._dict[key._id()] = value
 	def _code(self, scope=0):
 		return '{}: {}'.format(self.left._code(scope), self.right._code(scope))
 	def _copy(self):
 		return DictItem(self.line_no, self.left, self.right)
 
 class AlwaysItem(Node):
+	__slots__ = ('item',)
 	def __init__(self, line_no, item):
 		super(AlwaysItem, self).__init__(line_no)
 		self.set_parent_for_children(item)
 		self.item = item
 	def eval(self, env):
-		clear(self.item)
-		with InterpreterScope(StackEvent('auto_lambda', self.item)):
-			self.item.eval(env)
-		if not is_unsolvable(self.item):
+		value = solve(self.item, env)
+		if value is not Unsolved:
 			table = InterpreterScope.get_node_with('table_statement').info
-			table.always = self.item.value
+			table.always = value
 	def _code(self, scope=0):
 		return 'always: {}'.format(self.item._code(scope))
 	def _copy(self):
 		return AlwaysItem(self.line_no, self.item)
 
 class Always(Node, Readonly):
+	__slots__ = ()
 	def __init__(self, line_no):
 		super(Always, self).__init__(line_no)
-		#self.value = self
 	def eval(self, env):
 		if self.parent.type == 'Subscript' and self.parent.key == self:
-			self.value = obj.Always()
+			return obj.Always()
 		else:
 			raise RuntimeException(self.line_no, 'always关键字除下标外不可用于他处')
 	def _code(self, scope=0):
@@ -775,6 +901,7 @@ class Always(Node, Readonly):
 		return Always(self.line_no)
 
 class TableStatementNode(Node):
+	__slots__ = ('items',)
 	def __init__(self, line_no, items):
 		super(TableStatementNode, self).__init__(line_no)
 		self.set_parent_for_children(*items)
@@ -784,7 +911,7 @@ class TableStatementNode(Node):
 		with InterpreterScope(StackEvent('table_statement', table)):
 			for item in self.items:
 				item.eval(env)
-		self.value = table
+		return table
 	def _copy(self):
 		return TableStatementNode(self.line_no, [item._copy() for item in self.items])
 	def _code(self, scope=0):
@@ -1,5 +1,6 @@
 import fun.ast as ast
 import fun.fobject as obj
+from fun.output import OUTPUT_LIMIT_INFO
 from fun.exception import ReturnMessage, StopMessage, RuntimeException
 
 class Builtin(obj.Fun):
@@ -21,7 +22,10 @@ class Print(Builtin):
 	def _code(self, scope=0):
 		return '{**builtin: print**}'
 	def _call(self, line_no, env):
-		self.out.append(' '.join([item._code() for item in env.user_data._list]))
+		line = ' '.join([item._code() for item in env.user_data._list])
+		if not self.out.accepts(line):
+			raise RuntimeException(line_no, OUTPUT_LIMIT_INFO)
+		self.out.append(line)
 	
 class Stop(Builtin):
 	def __init__(self):
@@ -31,7 +35,7 @@ class Stop(Builtin):
 	def _code(self, scope=0):
 		return '{**builtin: stop**}'
 	def _call(self, line_no, env):
-		arg = env.get(line_no, obj.Number(0))
+		arg = env.get(line_no, obj.Number._py2fun(0))
 		if arg != obj.Undefined and arg.value._bool().py_val:
 			raise StopMessage()
 
@@ -56,16 +60,15 @@ class NumberGenerator(obj.Generator):
 		return obj.Transform(self._copy(), right.value._copy())
 	def _filter(self, right, pattern=None):
 		return obj.Filter(self._copy(), right.value._copy())
-	def _call(self, line_no, env):
+	def _next(self, line_no, env):
 		if self.eof:
-			raise StopMessage()
-		start, end = self.initializer._getitem(line_no, obj.Number(0)), self.initializer._getitem(line_no, obj.Number(1))
+			return obj.Exhausted
+		start, end = self.initializer._getitem(line_no, obj.Number._py2fun(0)), self.initializer._getitem(line_no, obj.Number._py2fun(1))
 		if start.py_val > end.py_val:
 			self.eof = True
-			raise StopMessage()
-		ret = ReturnMessage(start._copy())
-		self.initializer._setitem(obj.Number(0), start._add(obj.Number(1), (obj.Number, obj.Number)))
-		raise ret
+			return obj.Exhausted
+		self.initializer._setitem(obj.Number._py2fun(0), start._add(obj.Number._py2fun(1), (obj.Number, obj.Number)))
+		return start._copy()
 
 class Range(Builtin):
 	def __init__(self):
@@ -83,7 +86,7 @@ class TableIter(obj.Generator):
 	def __init__(self, initializer):
 		self.initializer = initializer
 		self.cursor = 0
-		self._dict_to_visit = list(self.initializer._dict.keys())
+		self._dict_to_visit = None
 		self._dict_cursor = 0
 		self.eof = False
 		self.value = self
@@ -103,26 +106,26 @@ class TableIter(obj.Generator):
 		return obj.Transform(self._copy(), right.value._copy())
 	def _filter(self, right, pattern=None):
 		return obj.Filter(self._copy(), right.value._copy())
-	def _call(self, line_no, env):
+	def _next(self, line_no, env):
 		if self.eof:
-			raise StopMessage()
+			return obj.Exhausted
 		if self.cursor < len(self.initializer._list):
 			return_value = obj.Table()
-			return_value._list.append(obj.Number(self.cursor))
+			return_value._list.append(obj.Number._py2fun(self.cursor))
 			return_value._list.append(self.initializer._list[self.cursor])
-			ret = ReturnMessage(return_value)
 			self.cursor += 1
-			raise ret
-		elif self._dict_cursor < len(self._dict_to_visit):
+			return return_value
+		if self._dict_to_visit is None:
+			self._dict_to_visit = list(self.initializer._dict.keys())
+		if self._dict_cursor < len(self._dict_to_visit):
 			return_value = obj.Table()
 			return_value._list.append(obj.FinalValue._key2fun(self._dict_to_visit[self._dict_cursor]))
 			return_value._list.append(self.initializer._dict[self._dict_to_visit[self._dict_cursor]])
-			ret = ReturnMessage(return_value)
 			self._dict_cursor += 1
-			raise ret
+			return return_value
 		else:
 			self.eof = True
-			raise StopMessage()
+			return obj.Exhausted
 
 class Iter(Builtin):
 	def __init__(self):
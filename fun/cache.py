@@ -0,0 +1,72 @@
+'''已解析、编译的程序的LRU缓存(an LRU cache of parsed and compiled programs)
+
+语法树在求值时不会被改动，所以同一个程序可以在多次运行之间复用。
+'''
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+def estimate_size(program):
+	'''按语法树节点估算占用的内存，编译后的对象与语法树大小相近，不单独计算
+	(estimate the memory by the nodes of the syntax tree; compiled objects are about as large and are not counted apart)'''
+	size = 0
+	nodes = list(program.chilren)
+	while nodes:
+		node = nodes.pop()
+		size += sys.getsizeof(node)
+		nodes += node.chilren
+		if node.type == 'Constant':
+			nodes.append(node.source)
+	return size
+
+class ProgramCache:
+	def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.entries = OrderedDict()
+		self.bytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.lock = threading.Lock()
+	@staticmethod
+	def key(code, engine):
+		return hashlib.sha256('{}\0{}'.format(engine, code).encode()).hexdigest()
+	def get(self, code, engine, build):
+		'''命中时返回缓存的程序，否则用build(code)构造并放入缓存；build抛出的异常不缓存
+		(return the cached program on a hit, or build(code) and cache it; errors raised by build are not cached)'''
+		key = self.key(code, engine)
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is not None:
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return entry[0]
+			self.misses += 1
+		program = build(code)
+		# 编译后的程序在program属性中保留着语法树(compiled programs keep their syntax tree in .program)
+		self.put(key, program, estimate_size(getattr(program, 'program', program)))
+		return program
+	def put(self, key, program, size):
+		if size > self.max_bytes or self.max_entries <= 0:
+			return
+		with self.lock:
+			if key in self.entries:
+				self.bytes -= self.entries.pop(key)[1]
+			self.entries[key] = (program, size)
+			self.bytes += size
+			while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+				_, (_, evicted) = self.entries.popitem(last=False)
+				self.bytes -= evicted
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+			self.bytes = 0
+	def stats(self):
+		with self.lock:
+			return {
+				'entries': len(self.entries),
+				'bytes': self.bytes,
+				'hits': self.hits,
+				'misses': self.misses,
+			}
@@ -0,0 +1,428 @@
+'''将语法树一次性编译为嵌套的Python闭包(compile the syntax tree into nested python closures once)
+
+编译后的闭包与Node.eval语义相同，但按节点类型的分派与准备工作
+在编译时就完成了，求值时不再重复。
+'''
+from fun.utils import InterpreterScope, StackEvent, tick, get_context
+from fun.exception import ReturnMessage, RuntimeException
+from fun.ast import Unsolved, Index, AutoReturn, PROGRAM_LABEL, undefined, innermost, may_be_undefined, literal_key
+import fun.fobject as obj
+
+class Compiled:
+	'''编译后的语句，可作为obj.Fun的函数体(a compiled statement, it can be used in the body of obj.Fun)'''
+	def __init__(self, node, run):
+		self.node = node
+		self.line_no = node.line_no
+		self.type = node.type
+		self.eval = run
+	def _code(self, scope=0):
+		return self.node._code(scope)
+	def _copy(self):
+		return self
+
+class CompiledProgram:
+	def __init__(self, program, stmts):
+		self.program = program
+		self.stmts = stmts
+	def eval(self, env):
+		profiler = get_context().profiler
+		if profiler is not None:
+			return profiler.run(self.stmts, env, PROGRAM_LABEL)
+		for stmt in self.stmts:
+			tick(stmt.line_no)
+			stmt.eval(env)
+	def _code(self, scope=0):
+		return self.program._code(scope)
+
+class Target:
+	'''自动lambda的目标，每次求值一个(an auto lambda target, one per evaluation)'''
+	def __init__(self, body):
+		self.value = Unsolved
+		self.body = body
+	def make_lambda(self):
+		return obj.Fun(self.body[:])
+
+def compile_target(node):
+	'''编译自动lambda的目标；目标的事件直接压入auto_lambda的栈，不经过InterpreterScope
+	(compile an auto lambda target; its event is pushed onto the auto_lambda stack directly, not through InterpreterScope)'''
+	if not may_be_undefined(node):
+		return compile_node(node)
+	body = []
+	if node.type == 'Identifier' or literal_key(node) is not None:
+		# 叶子中未定义的变量只属于这个目标，不必压入事件(an undefined name in a leaf belongs to this target only, no event is pushed)
+		run = (compile_identifier if node.type == 'Identifier' else compile_literal_variable)(node, lambda: obj.Fun(body[:]))
+		def auto_return(env):
+			raise ReturnMessage(run(env))
+		body.append(Compiled(AutoReturn(node), auto_return))
+		return run
+	run = compile_node(node)
+	key = (InterpreterScope, 'auto_lambda')
+	def solved(env):
+		target = Target(body)
+		stack = get_context().stack
+		events = stack.get(key)
+		if events is None:
+			events = stack[key] = []
+		events.append(StackEvent('auto_lambda', target))
+		try:
+			value = run(env)
+		finally:
+			events.pop()
+		if value is Unsolved:
+			return target.value
+		return value
+	def auto_return(env):
+		value = solved(env)
+		if value is not Unsolved:
+			raise ReturnMessage(value)
+	body.append(Compiled(AutoReturn(node), auto_return))
+	return solved
+
+def const(value):
+	def run(env):
+		return value
+	return run
+
+def compile_nothing(node):
+	return const(obj.fobject_nothing)
+
+def compile_bool(node):
+	return const(obj.Bool._py2fun(node.val))
+
+def compile_number(node):
+	return const(obj.Number._py2fun(node.val))
+
+def compile_string(node):
+	return const(obj.String._py2fun(node.val))
+
+def compile_constant(node):
+	if not node.mutable:
+		return const(node.val)
+	make = node.make
+	def run(env):
+		return make()
+	return run
+
+def compile_index(node):
+	def run(env):
+		value = obj.Number._py2fun(env.sys_get(Index))
+		if value == obj.Undefined:
+			raise RuntimeException(node.line_no, '不可在循环外使用index')
+		return value
+	return run
+
+def compile_variable(node):
+	if literal_key(node) is not None:
+		return compile_literal_variable(node)
+	right = compile_node(node.right)
+	lookup = node.lookup
+	def run(env):
+		key = right(env)
+		if key is Unsolved:
+			return Unsolved
+		return lookup(env, key)
+	return run
+
+def compile_literal_variable(node, missing=None):
+	'''@0、@"name"这样键为字面量的变量，键在编译时算好，与env.get相同地沿环境链查找，省去每层的方法调用
+	(a variable with a literal key such as @0 or @"name", the key is worked out at compile time and it is looked up
+	along the environment chain as env.get does, without a method call per level)'''
+	key = literal_key(node)._id()
+	index = key if isinstance(key, int) else -1
+	line_no = node.right.line_no
+	info = '未定义变量: @{}'.format(node.right._code())
+	if missing is None:
+		missing = lambda: undefined(line_no, info)
+	def run(env):
+		while True:
+			table = env.user_data
+			if 0 <= index < len(table._list):
+				return table._list[index]
+			value = table._dict.get(key, table.always)
+			if value is not None:
+				return value
+			if env.parent is None:
+				return missing()
+			env = env.parent
+	return run
+
+def compile_binary_operator(node):
+	'''a + b + c这样的链沿左侧逐层展开，编译与求值都是循环而不是递归，长链不会超出递归深度
+	(a chain such as a + b + c is unrolled along its left side, so compiling and evaluating it loop instead of recursing
+	and long chains do not exceed the recursion limit)'''
+	chain = []
+	while node.type == 'BinaryOperator':
+		chain.append(node)
+		node = node.left
+	chain.reverse()
+	first = compile_node(node)
+	if len(chain) == 1:
+		return compile_operation(chain[0], first)
+	operations = [(node, compile_node(node.right), node.apply) for node in chain]
+	def run(env):
+		value = first(env)
+		for node, right, apply in operations:
+			right_value = right(env)
+			if value is Unsolved or right_value is Unsolved:
+				value = Unsolved
+				continue
+			cache = node.cache
+			if cache[0] is type(value) and cache[1] is type(right_value):
+				value = cache[2](value, right_value, cache[3])
+			else:
+				value = apply(value, right_value)
+		return value
+	return run
+
+def compile_operation(node, left):
+	right = compile_node(node.right)
+	apply = node.apply
+	def run(env):
+		left_value = left(env)
+		right_value = right(env)
+		if left_value is Unsolved or right_value is Unsolved:
+			return Unsolved
+		# 与node.apply相同，但命中内联缓存时不再调用方法(the same as node.apply, but no method is called when the inline cache hits)
+		cache = node.cache
+		if cache[0] is type(left_value) and cache[1] is type(right_value):
+			return cache[2](left_value, right_value, cache[3])
+		return apply(left_value, right_value)
+	return run
+
+def compile_unary_operator(node):
+	right = compile_node(node.right)
+	apply = node.apply
+	def run(env):
+		value = right(env)
+		if value is Unsolved:
+			return Unsolved
+		return apply(value)
+	return run
+
+def compile_group(node):
+	return compile_node(node.inner)
+
+def compile_identifier(node, missing=None):
+	'''missing在变量未定义时调用，默认交给最近的自动lambda目标(missing is called when the name is undefined, by default the nearest auto lambda target handles it)'''
+	name = node.id
+	line_no = node.line_no
+	info = '未定义变量: {}'.format(node.id)
+	if missing is None:
+		missing = lambda: undefined(line_no, info)
+	if node.local:
+		def run(env):
+			value = env.user_data._dict.get(name)
+			if value is None:
+				value = env.get_name(name)
+				if value is obj.Undefined:
+					return missing()
+			return value
+		return run
+	def run(env):
+		value = env.get_name(name)
+		if value is obj.Undefined:
+			return missing()
+		return value
+	return run
+
+def compile_call_block(node):
+	right = compile_node(node.right)
+	apply = node.apply
+	def run(env):
+		callable = right(env)
+		if callable is Unsolved:
+			return Unsolved
+		apply(env, callable)
+	return run
+
+def compile_trigger(node):
+	'''编译Call，Detect与Reduce(compile Call, Detect and Reduce)'''
+	left, right = compile_node(node.left), compile_target(node.right)
+	apply = node.apply
+	def run(env):
+		left_value = left(env)
+		right_value = right(env)
+		if left_value is Unsolved or right_value is Unsolved:
+			return Unsolved
+		return apply(env, left_value, right_value)
+	return run
+
+def compile_stream(node):
+	'''编译Transform与Filter(compile Transform and Filter)'''
+	left, right = compile_node(node.left), compile_target(node.right)
+	apply = node.apply
+	def run(env):
+		left_value = left(env)
+		right_value = right(env)
+		if left_value is Unsolved or right_value is Unsolved:
+			return Unsolved
+		return apply(left_value, right_value)
+	return run
+
+def compile_unfold(node):
+	'''返回的闭包还需要正在声明的表或函数体(the returned closure also needs the table or the fun body being declared)'''
+	right = compile_node(node.right)
+	apply = node.apply
+	def run(env, container):
+		value = right(env)
+		if value is not Unsolved:
+			apply(env, value, container)
+	return run
+
+def compile_reload(node):
+	left, initializer = compile_target(node.left), compile_node(node.initializer)
+	apply = node.apply
+	def run(env):
+		left_value = left(env)
+		initializer_value = initializer(env)
+		if left_value is Unsolved or initializer_value is Unsolved:
+			return Unsolved
+		return apply(left_value, initializer_value)
+	return run
+
+def compile_fun_statement(node):
+	parts = []
+	for stmt in node.body:
+		if stmt.type == 'Unfold':
+			parts.append((True, compile_unfold(stmt)))
+		else:
+			parts.append((False, Compiled(stmt, compile_node(stmt))))
+	if not any(unfold for unfold, _ in parts):
+		body = [part for _, part in parts]
+		def run(env):
+			return obj.Fun(body[:])
+		return run
+	def run(env):
+		body = []
+		for unfold, part in parts:
+			if unfold:
+				part(env, body)
+			else:
+				body.append(part)
+		return obj.Fun(body)
+	return run
+
+def compile_subscript(node):
+	collection, key = compile_node(node.collection), compile_node(node.key)
+	apply = node.apply
+	def run(env):
+		collection_value = collection(env)
+		key_value = key(env)
+		if collection_value is Unsolved or key_value is Unsolved:
+			return Unsolved
+		return apply(collection_value, key_value)
+	return run
+
+def compile_assignment(node):
+	left = innermost(node.left)
+	right = compile_target(node.right)
+	if left.type == 'Identifier':
+		name = left.id
+		def run(env):
+			value = right(env)
+			if value is not Unsolved:
+				env.set_name(name, value)
+			return value
+	elif left.type == 'Subscript':
+		collection, key = compile_node(left.collection), compile_node(left.key)
+		def run(env):
+			collection_value = collection(env)
+			key_value = key(env)
+			value = right(env)
+			if collection_value is Unsolved or key_value is Unsolved or value is Unsolved:
+				return Unsolved
+			try:
+				collection_value._setitem(key_value, value)
+			except AttributeError:
+				raise RuntimeException(left.collection.line_no, '{}不是容器'.format(left.collection._code()))
+			return value
+	else:
+		def run(env):
+			raise RuntimeException(left.line_no, '不可以向{}赋值'.format(left._code()))
+	return run
+
+def compile_return(node):
+	right = compile_target(node.right)
+	def run(env):
+		value = right(env)
+		if value is not Unsolved:
+			raise ReturnMessage(value)
+	return run
+
+def compile_list_item(node):
+	item = compile_target(node.item)
+	def run(env, table):
+		value = item(env)
+		if value is not Unsolved:
+			table._list.append(value)
+	return run
+
+def compile_dict_item(node):
+	left, right = compile_node(node.left), compile_target(node.right)
+	def run(env, table):
+		key = left(env)
+		value = right(env)
+		if key is not Unsolved and value is not Unsolved:
+			table._dict[key._id()] = value
+	return run
+
+def compile_always_item(node):
+	item = compile_target(node.item)
+	def run(env, table):
+		value = item(env)
+		if value is not Unsolved:
+			table.always = value
+	return run
+
+def compile_always(node):
+	if node.parent.type == 'Subscript' and node.parent.key == node:
+		return const(obj.Always())
+	def run(env):
+		raise RuntimeException(node.line_no, 'always关键字除下标外不可用于他处')
+	return run
+
+def compile_table_statement(node):
+	items = [compile_node(item) for item in node.items]
+	def run(env):
+		table = obj.Table()
+		for item in items:
+			item(env, table)
+		return table
+	return run
+
+compilers = {
+	'Nothing': compile_nothing,
+	'Bool': compile_bool,
+	'Number': compile_number,
+	'String': compile_string,
+	'Constant': compile_constant,
+	'Index': compile_index,
+	'Variable': compile_variable,
+	'BinaryOperator': compile_binary_operator,
+	'UnaryOperator': compile_unary_operator,
+	'Group': compile_group,
+	'Identifier': compile_identifier,
+	'CallBlock': compile_call_block,
+	'Call': compile_trigger,
+	'Detect': compile_trigger,
+	'Reduce': compile_trigger,
+	'Transform': compile_stream,
+	'Filter': compile_stream,
+	'Unfold': compile_unfold,
+	'Reload': compile_reload,
+	'FunStatementNode': compile_fun_statement,
+	'Subscript': compile_subscript,
+	'Assignment': compile_assignment,
+	'Return': compile_return,
+	'ListItem': compile_list_item,
+	'DictItem': compile_dict_item,
+	'AlwaysItem': compile_always_item,
+	'Always': compile_always,
+	'TableStatementNode': compile_table_statement,
+}
+
+def compile_node(node):
+	return compilers[node.type](node)
+
+def compile_program(program):
+	return CompiledProgram(program, [Compiled(stmt, compile_node(stmt)) for stmt in program.stmts])
@@ -1,9 +1,15 @@
-from fun.utils import InterpreterScope, StackEvent, recursion_forbidden, MAX_LOOP_COUNT
+from fun.utils import Active, recursion_forbidden, tick, get_context
 from fun.exception import ReturnMessage, StopMessage, RuntimeException
 
 intent = '    '
+SMALL_INTS = range(-5, 1025)
+
+# 数、字符串、布尔值与表的value就是它们自己，不必在每个实例中保存
+# (the value of a number, string, bool or table is itself, it need not be kept in every instance)
+itself = property(lambda self: self)
 
 class FinalValue:
+	__slots__ = ()
 	def _type(self):
 		return type(self).__name__
 	def eval(self, env):
@@ -16,7 +22,7 @@ class FinalValue:
 		}
 		fun_type = types.get(type(py_val))
 		if fun_type:
-			return fun_type(py_val)
+			return fun_type._py2fun(py_val)
 		else:
 			return py_val
 	def _str(self):
@@ -31,13 +37,17 @@ class FinalValue:
 	def _ne(self, right, pattern):
 		return Bool._py2fun(self._id() != right.value._id())
 	def _and(self, right, pattern):
-		return Bool._py2fun(self._bool().py_val and right._bool().py_val)
+		return Bool._py2fun(self._bool().py_val and right.value._bool().py_val)
 	def _or(self, right, pattern):
-		return Bool._py2fun(self._bool().py_val or right._bool().py_val)
+		return Bool._py2fun(self._bool().py_val or right.value._bool().py_val)
 	def _xor(self, right, pattern):
-		return Bool._py2fun(self._bool().py_val != right._bool().py_val)
+		return Bool._py2fun(self._bool().py_val != right.value._bool().py_val)
 
 class Const(FinalValue):
+	__slots__ = ('py_val',)
+	value = itself
+	def __init__(self, py_val):
+		self.py_val = py_val
 	def _id(self):
 		return self.py_val
 	@classmethod
@@ -45,15 +55,16 @@ class Const(FinalValue):
 		return cls(py_val)
 
 class Obj(FinalValue):
+	__slots__ = ()
 	def _id(self):
 		return self
 	def _copy(self):
 		raise Exception()
 
 class Nothing(Const):
+	__slots__ = ()
 	def __init__(self):
 		self.py_val = Nothing
-		self.value = self
 	def _code(self,scope=0):
 		return 'nothing'
 	def _copy(self):
@@ -62,9 +73,7 @@ class Nothing(Const):
 		return fobject_no
 
 class Bool(Const):
-	def __init__(self, py_val):
-		self.py_val = py_val
-		self.value = self
+	__slots__ = ()
 	def _code(self, scope=0):
 		return 'yes' if self.py_val else 'no'
 	def _id(self):
@@ -77,20 +86,24 @@ class Bool(Const):
 	def _not(self):
 		return Bool._py2fun(not self.py_val)
 	def _and(self, right, pattern):
-		return Bool._py2fun(self.py_val and right._bool().py_val)
+		return Bool._py2fun(self.py_val and right.value._bool().py_val)
 	def _or(self, right, pattern):
-		return Bool._py2fun(self.py_val or right._bool().py_val)
+		return Bool._py2fun(self.py_val or right.value._bool().py_val)
 	def _xor(self, right, pattern):
-		return Bool._py2fun(self.py_val != right._bool().py_val)
+		return Bool._py2fun(self.py_val != right.value._bool().py_val)
 
 fobject_yes = Bool(True)
 fobject_no = Bool(False)
 fobject_nothing = Nothing()
 
 class Number(Const):
-	def __init__(self, py_val):
-		self.py_val = py_val
-		self.value = self
+	'''SMALL_INTS中的整数只有一个实例(there is only one instance of every int in SMALL_INTS)'''
+	__slots__ = ()
+	@classmethod
+	def _py2fun(cls, py_val):
+		if type(py_val) is int and py_val in SMALL_INTS:
+			return small_numbers[py_val - SMALL_INTS.start]
+		return cls(py_val)
 	def _code(self, scope=0):
 		return str(self.py_val)
 	def _bool(self):
@@ -98,7 +111,7 @@ class Number(Const):
 	def _not(self):
 		return Bool._py2fun(not self.py_val)
 	def _neg(self):
-		return Number(-self.py_val)
+		return Number._py2fun(-self.py_val)
 	def _add(self, right, pattern):
 		if pattern == (Number, Number):
 			return Number._py2fun(self.py_val + right.value.py_val)
@@ -127,9 +140,15 @@ class Number(Const):
 		return Bool._py2fun(self.py_val <= right.value.py_val)
 
 class String(Const):
-	def __init__(self, py_val):
-		self.py_val = py_val
-		self.value = self
+	'''空字符串与单个ASCII字符只有一个实例(there is only one instance of the empty string and of every single ascii char)'''
+	__slots__ = ()
+	@classmethod
+	def _py2fun(cls, py_val):
+		if len(py_val) <= 1:
+			string = common_strings.get(py_val)
+			if string is not None:
+				return string
+		return cls(py_val)
 	def _str(self):
 		return self.py_val
 	def _code(self, scope=0):
@@ -141,6 +160,9 @@ class String(Const):
 	def _mul(self, right, pattern):
 		return String._py2fun(self.py_val * right.value.py_val)
 
+small_numbers = [Number(py_val) for py_val in SMALL_INTS]
+common_strings = {py_val: String(py_val) for py_val in [''] + [chr(code) for code in range(128)]}
+
 class Fun(Obj):
 	def __init__(self, body):
 		self.body = body
@@ -148,7 +170,7 @@ class Fun(Obj):
 	def _bool(self):
 		return Bool._py2fun(self.body)
 	def _len(self):
-		return Number(len(self.body))
+		return Number._py2fun(len(self.body))
 	def _code(self, scope=0):
 		body = [stmt._code(scope + 1) for stmt in self.body]
 		inner_intent = intent * (scope + 1)
@@ -156,16 +178,24 @@ class Fun(Obj):
 		body = ';\n'.join(['{intent}{stmt}'.format(intent=inner_intent, stmt=stmt) for stmt in body])
 		body = body + ';' if body else ''
 		return '{' + '\n{body}\n{intent}'.format(intent=outer_intent, body=body) + '}'
+	# 语句不保存求值结果，所以函数体可以共享，不必复制(statements keep no results, so bodies are shared rather than copied)
 	def _copy(self):
-		return Fun([stmt._copy() for stmt in self.body])
+		return Fun(self.body)
 	def _reload(self, initializer, pattern=None):
-		return Generator([stmt._copy() for stmt in self.body], initializer.value._copy())
+		return Generator(self.body, initializer.value._copy())
 	def _init(self, args=None):
 		if args is not None:
 			return Table()._reload(args)
 		return Table()
 	def _call(self, line_no, env):
+		profiler = get_context().profiler
+		if profiler is not None:
+			return profiler.run(self.body, env)
+		if type(self.body) is not list:
+			# fun.vm.Body，整个函数体在虚拟机中运行(fun.vm.Body, the whole body runs in the machine)
+			return self.body.run(env)
 		for stmt in self.body:
+			tick(stmt.line_no)
 			stmt.eval(env)
 	def make_args(self, args):
 		if isinstance(args, Table):
@@ -180,16 +210,17 @@ class Generator(Fun):
 		self.body = body
 		self.initializer = initializer
 		self.start_step = 0
+		self.frame = None
 		self.eof = False
 		self.value = self
 	def _copy(self):
-		return Generator([stmt._copy() for stmt in self.body], self.initializer._copy())
+		return Generator(self.body, self.initializer._copy())
 	def _init(self, args=None):
 		if args is not None:
 			self.initializer = self.initializer._reload(args)
 		return self.initializer
 	def _reload(self, initializer, pattern=None):
-		return Generator([stmt._copy() for stmt in self.body], initializer.value._copy())
+		return Generator(self.body, initializer.value._copy())
 	def _map(self, right, pattern=None):
 		return Transform(self._copy(), right.value._copy())
 	def _filter(self, right, pattern=None):
@@ -197,52 +228,157 @@ class Generator(Fun):
 	def _reduce(self, line_no, right, env, pattern=None):
 		if self.eof:
 			raise StopMessage()
-		count = 0
 		reducer = right.value
 		reduced = fobject_nothing
+		vectorizer = get_context().vectorizer
+		# 能向量化时，降维函数不逐个调用，而是先收集值(when vectorized, the reducer is not called one by one, the values are collected first)
+		accumulator = vectorizer.accumulator(self, reducer) if vectorizer is not None else None
+		try:
+			while True:
+				tick(line_no)
+				left_env = Environment(self._init(), parent=env)
+				value = self._next(line_no, left_env)
+				if value is Exhausted:
+					self.eof = True
+					break
+				if accumulator is not None:
+					if accumulator.add(line_no, value):
+						continue
+					reduced = accumulator.commit(reduced)
+					accumulator = None
+				args = self.make_args(value)
+				right_env = Environment(reducer._init(args), parent=env)
+				try:
+					reducer._call(line_no, right_env)
+				except ReturnMessage as reducer_ret:
+					reduced = reducer_ret.value
+				except StopMessage:
+					pass
+		finally:
+			if accumulator is not None:
+				reduced = accumulator.commit(reduced)
+		return reduced
+	def _call(self, line_no, env):
+		'''被当作函数调用时，仍以异常交出值与结束(called as a fun, it still hands out values and its end by raising)'''
+		value = self._next(line_no, env)
+		if value is Exhausted:
+			raise StopMessage()
+		raise ReturnMessage(value)
+	@recursion_forbidden('call_generator', '生成器不可以递归调用')
+	def _next(self, line_no, env):
+		'''返回下一个值，没有值时返回Exhausted(return the next value, or Exhausted when there is none)'''
+		if self.eof:
+			return Exhausted
+		# 函数体出错时帧也随之结束，下次从start_step重新开始(a frame ends with an error in the body, the next call starts again from start_step)
+		if self.frame is None or self.frame.gi_frame is None:
+			self.frame = self._frame()
+			next(self.frame)
+		try:
+			return self.frame.send(env)
+		except StopIteration:
+			self.eof = True
+			return Exhausted
+	def _frame(self):
+		'''挂起的函数体：每次send一个环境，从上次交出值的语句之后继续执行
+		(the suspended body: each time an env is sent, it goes on after the statement that handed out the last value)'''
+		body = self.body
+		env = yield
 		while True:
-			count += 1
-			if count > MAX_LOOP_COUNT:
-				raise RuntimeException(line_no, '你可能陷入了死循环')
-			left_env = Environment(self._init(), parent=env)
+			step = self.start_step
+			# 从中间恢复时，这一遍已经交出过值，所以执行到末尾后要从头再执行一遍
+			# (resumed in the middle, this pass has handed out a value, so it starts over after the end)
+			again = step > 0
+			profiler = get_context().profiler
+			stats = profiler.fun(body) if profiler is not None else None
 			try:
-				self._call(line_no, left_env)
-			except ReturnMessage as ret:
-				value = ret.value
-			except StopMessage:
-				self.eof = True
-				raise ReturnMessage(reduced)
-			args = self.make_args(value)
-			right_env = Environment(reducer._init(args), parent=env)
-			try:
-				reducer._call(line_no, right_env)
-			except ReturnMessage as reducer_ret:
-				reduced = reducer_ret.value
+				while True:
+					if step == len(body):
+						if not again:
+							return
+						step, again = 0, False
+						continue
+					tick(body[step].line_no)
+					if profiler is None:
+						body[step].eval(env)
+					else:
+						profiler.statement(body[step], stats, env)
+					step += 1
+			except ReturnMessage as msg:
+				self.start_step = step + 1
+				value = msg.value
 			except StopMessage:
-				pass
+				# 函数体中的stop只结束这一次，不设置eof(a stop in the body only ends this call, eof is not set)
+				value = Exhausted
+			env = yield value
+
+class Pipeline(Generator):
+	'''=>与|的链。被迭代时由最外层一次完成整条链：值在各段之间直接传递，
+	不再逐层调用_next，也不再为每一层的生产者建立环境
+	(a chain of => and |. when iterated the outermost one runs the whole chain at once: values are passed
+	from stage to stage directly, without calling _next layer by layer or making an env for every producer)'''
+	chain = None
+	# fun.vectorize中的Plan，不能向量化时为False(a Plan from fun.vectorize, False when it can not be vectorized)
+	vector = None
+	def _flatten(self):
+		'''返回(源头, 由内到外的各段, 过滤段的下标)；内层的initializer不为空时在那里断开，因为它们在环境链中可见
+		(return (source, stages from inner to outer, indexes of the filter stages); it stops at an inner stage with a non empty initializer, as that is visible in the env chain)'''
+		stages = [self]
+		while isinstance(stages[-1].producter, Pipeline) and not stages[-1].producter.initializer._bool().py_val:
+			stages.append(stages[-1].producter)
+		stages.reverse()
+		filters = [index for index, stage in enumerate(stages) if isinstance(stage, Filter)]
+		return stages[0].producter, stages, filters
 	@recursion_forbidden('call_generator', '生成器不可以递归调用')
-	def _call(self, line_no, env):
+	def _next(self, line_no, env):
 		if self.eof:
-			raise StopMessage()
-		count = 0
+			return Exhausted
+		if self.chain is None:
+			self.chain = self._flatten()
+		source, stages, filters = self.chain
+		if self.vector is None:
+			vectorizer = get_context().vectorizer
+			self.vector = (vectorizer.plan(self) if vectorizer is not None else None) or False
+		# 向下取值的最外一个过滤段，与逐层调用时一样，它与内层的每个过滤段各计一步
+		# (the outermost filter stage pulling a value, as when called layer by layer, it and every inner filter stage count a step each)
+		pulling = len(stages)
 		while True:
-			count += 1
-			if count > MAX_LOOP_COUNT:
-				raise RuntimeException(line_no, '你可能陷入了死循环')
-			try:
-				for step in range(self.start_step, len(self.body)):
-					self.body[step].eval(env)
-				# 如果不是从头执行，则可以多执行一次(restart if it is not the first time to be called)
-				if self.start_step > 0:
-					for step, stmt in enumerate(self.body):
-						stmt.eval(env)
+			for index in filters:
+				if index > pulling:
+					break
+				tick(line_no)
+			if self.vector:
+				fate = self.vector.pull()
+				if fate is Exhausted:
+					self.eof = True
+					return Exhausted
+				if fate is not None:
+					# 每一段的函数体是一条语句(the body of every stage is one statement)
+					tick(line_no, min(fate + 1, len(stages)))
+					if fate < len(stages):
+						pulling = fate
+						continue
+					return self.vector.value()
+			value = source._next(line_no, Environment(source._init(), parent=env))
+			if value is Exhausted:
 				self.eof = True
-				raise StopMessage()
-			except ReturnMessage as msg:
-				self.start_step = step + 1
-				raise msg
+				return Exhausted
+			for index, stage in enumerate(stages):
+				value = stage._apply(line_no, value, env)
+				if value is Exhausted:
+					pulling = index
+					break
+			else:
+				return value
+	def _stage_env(self, fun, value, env):
+		if type(fun) is Fun and not isinstance(value, Table):
+			# 与fun._init(self.make_args(value))相同，但只构造一个表(the same as fun._init(self.make_args(value)), but only one table is built)
+			args = Table()
+			args._list.append(value)
+		else:
+			args = fun._init(self.make_args(value))
+		return Environment(args, parent=env)
 
-class Transform(Generator):
+class Transform(Pipeline):
 	def __init__(self, producter, transformer, initializer=None):
 		self.producter = producter
 		self.transformer = transformer
@@ -251,43 +387,31 @@ class Transform(Generator):
 	def _bool(self):
 		return fobject_yes
 	def _len(self):
-		return Number(self.producter._len().py_val + self.transformer._len().py_val)
+		return Number._py2fun(self.producter._len().py_val + self.transformer._len().py_val)
 	def _reload(self, initializer, pattern=None):
 		return Transform(self.producter._copy(), self.transformer._copy(), initializer.value._copy())
 	def _init(self, args=None):
 		if args is not None:
 			self.initializer = self.initializer._reload(args)
 		return self.initializer
-	@recursion_forbidden('call_generator', '生成器不可以递归调用')
-	def _call(self, line_no, env):
-		if self.eof:
-			raise StopMessage()
-		left_env = Environment(self.producter._init(), parent=env)
-		try:
-			self.producter._call(line_no, left_env)
-		except ReturnMessage as ret:
-			value = ret.value
-		except StopMessage:
-			self.eof = True
-			raise StopMessage()
+	def _apply(self, line_no, value, env):
+		'''这一段对value的变换(the transformation of value by this stage)'''
 		if isinstance(self.transformer, Fun):
-			args = self.make_args(value)
-			right_env = Environment(self.transformer._init(args), parent=env)
 			try:
-				self.transformer._call(line_no, right_env)
+				self.transformer._call(line_no, self._stage_env(self.transformer, value, env))
 			except ReturnMessage as ret:
-				raise ret
+				return ret.value
 			except StopMessage:
 				pass
 			raise RuntimeException(line_no, '变换函数没有返回值')
 		elif isinstance(self.transformer, Table):
-			raise ReturnMessage(self.transformer._getitem(line_no, value))
+			return self.transformer._getitem(line_no, value)
 	def _copy(self):
 		return Transform(self.producter._copy(), self.transformer._copy(), self.initializer._copy())
 	def _code(self, scope=0):
 		return '{} => {}'.format(self.producter._code(scope), self.transformer._code(scope))
 
-class Filter(Generator):
+class Filter(Pipeline):
 	def __init__(self, producter, checker, initializer=None):
 		self.producter = producter
 		self.checker = checker
@@ -296,70 +420,86 @@ class Filter(Generator):
 	def _bool(self):
 		return fobject_yes
 	def _len(self):
-		return Number(self.producter._len().py_val + self.checker._len().py_val)
+		return Number._py2fun(self.producter._len().py_val + self.checker._len().py_val)
 	def _reload(self, initializer, pattern=None):
 		return Filter(self.producter._copy(), self.checker._copy(), initializer.value._copy())
 	def _init(self, args=None):
 		if args is not None:
 			self.initializer = self.initializer._reload(args)
 		return self.initializer
-	@recursion_forbidden('call_generator', '生成器不可以递归调用')
-	def _call(self, line_no, env):
-		if self.eof:
-			raise StopMessage()
-		count = 0
-		while True:
-			count += 1
-			if count > MAX_LOOP_COUNT:
-				raise RuntimeException(line_no, '你可能陷入了死循环')
-			left_env = Environment(self.producter._init(), parent=env)
+	def _apply(self, line_no, value, env):
+		'''通过检查时返回value，否则返回Exhausted(return value if it passes the check, or Exhausted)'''
+		if isinstance(self.checker, Fun):
 			try:
-				self.producter._call(line_no, left_env)
-			except ReturnMessage as ret:
-				value = ret.value
+				self.checker._call(line_no, self._stage_env(self.checker, value, env))
+			except ReturnMessage as checker_ret:
+				if checker_ret.value._bool().py_val:
+					return value
 			except StopMessage:
-				self.eof = True
-				raise StopMessage()
-			if isinstance(self.checker, Fun):
-				args = self.make_args(value)
-				right_env = Environment(self.checker._init(args), parent=env)
-				try:
-					self.checker._call(line_no, right_env)
-				except ReturnMessage as checker_ret:
-					if checker_ret.value._bool().py_val:
-						raise ReturnMessage(value)
-				except StopMessage:
-					pass
-			elif isinstance(self.checker, Table):
-				if self.checker._getitem(line_no, value)._bool().py_val:
-					raise ReturnMessage(value)
+				pass
+		elif isinstance(self.checker, Table):
+			if self.checker._getitem(line_no, value)._bool().py_val:
+				return value
+		return Exhausted
 	def _copy(self):
 		return Filter(self.producter._copy(), self.checker._copy(), self.initializer._copy())
 	def _code(self, scope=0):
 		return '{} | {}'.format(self.producter._code(scope), self.checker._code(scope))
 
-class Always(Obj): pass
+class Always(Obj):
+	def __init__(self):
+		self.value = self
 
 class Table(Obj):
+	'''复制与重装时_list与_dict和原来的表共享，改动前才复制，所以复制是O(1)的；
+	改动已有的表要通过_setitem、_owned_list或_owned_dict，新建的表在交出之前可以直接改动
+	(on copy and reload _list and _dict are shared with the original table and only copied before a change, so a copy is O(1);
+	change an existing table through _setitem, _owned_list or _owned_dict, a new table may be changed directly before it is handed out)'''
+	__slots__ = ('_list', '_dict', '_list_shared', '_dict_shared', 'always')
+	type = 'Table'
+	value = itself
 	def __init__(self):
-		self.type = 'Table'
 		self._list = []
 		self._dict = {}
+		self._list_shared = False
+		self._dict_shared = False
 		self.always = None
-		self.value = self
+	def _owned_list(self):
+		'''要改动的_list，与其他表共享时先复制一份(the _list to change, copied first when shared with other tables)'''
+		if self._list_shared:
+			self._list = self._list[:]
+			self._list_shared = False
+		return self._list
+	def _owned_dict(self):
+		'''要改动的_dict，与其他表共享时先复制一份(the _dict to change, copied first when shared with other tables)'''
+		if self._dict_shared:
+			self._dict = {**self._dict}
+			self._dict_shared = False
+		return self._dict
+	def _share_list(self, other):
+		self._list = other._list
+		self._list_shared = other._list_shared = True
+	def _share_dict(self, other):
+		self._dict = other._dict
+		self._dict_shared = other._dict_shared = True
 	def eval(self, env):
 		pass
 	def _bool(self):
 		return Bool._py2fun(self._list or self._dict or self.always is not None)
 	def _len(self):
-		return Number(len(self._list) + len(self._dict))
+		return Number._py2fun(len(self._list) + len(self._dict))
 	def _reload(self, right, pattern=None):
 		new = Table()
 		if len(self._list) <= len(right.value._list):
-			new._list = right.value._list[:]
+			new._share_list(right.value)
 		else:
 			new._list = right.value._list + self._list[len(right.value._list):]
-		new._dict = {**self._dict, **right.value._dict}
+		if not right.value._dict:
+			new._share_dict(self)
+		elif not self._dict:
+			new._share_dict(right.value)
+		else:
+			new._dict = {**self._dict, **right.value._dict}
 		if right.value.always is not None:
 			new.always = right.value.always
 		else:
@@ -370,9 +510,9 @@ class Table(Obj):
 		if not isinstance(key.value, Always):
 			_key = key.value._id()
 			if isinstance(_key, int) and 0 <= _key < len(self._list):
-				self._list[_key] = value
+				self._owned_list()[_key] = value
 			else:
-				self._dict[_key] = value
+				self._owned_dict()[_key] = value
 		else:
 			self.always = value
 	def _getitem(self, line_no, key, default=None):
@@ -395,11 +535,10 @@ class Table(Obj):
 				raise RuntimeException(line_no, 'always未定义')
 			return self.always
 	def _code(self, scope=0):
-		events = InterpreterScope.get_stack()
 		# 防止循环引用时，无限生成代码
-		if [event for event in events if event.name == 'table_code' and event.info == self]:
+		if Active.has('table_code', self):
 			return '[...]'
-		with InterpreterScope(StackEvent('table_code', self)):
+		with Active('table_code', self):
 			def key_code(key, scope):
 				if isinstance(key, FinalValue):
 					return key._code(scope)
@@ -415,11 +554,14 @@ class Table(Obj):
 			return '[\n{items}\n{intent}]'.format(intent=outer_intent, items=items)
 	def _copy(self):
 		new = Table()
-		new._list = [*self._list]
-		new._dict = {**self._dict}
+		new._share_list(self)
+		new._share_dict(self)
 		new.always = self.always
 		return new
 
+class Exhausted:
+	'''生成器已经没有值(a generator has no more values)'''
+
 class Undefined:
 	@classmethod
 	def _code(cls):
@@ -431,20 +573,41 @@ class Environment:
 		self.system_data = {}
 		self.parent = parent
 		self.temporary = temporary
+	# 环境链可能和调用一样深，所以不用递归(the chain may be as deep as the calls, so no recursion here)
 	def set(self, key, val):
-		if self.temporary and self.parent is not None:
-			self.parent.set(key, val)
-		else:
-			self.user_data._setitem(key, val)
+		env = self
+		while env.temporary and env.parent is not None:
+			env = env.parent
+		env.user_data._setitem(key, val)
 	def get(self, line_no, key):
-		val = self.user_data._getitem(line_no, key, Undefined)
-		if val == Undefined and self.parent is not None:
-			val = self.parent.get(line_no, key)
-		return val
+		env = self
+		while True:
+			val = env.user_data._getitem(line_no, key, Undefined)
+			if val != Undefined or env.parent is None:
+				return val
+			env = env.parent
+	# 以下两个方法同set与get，但key是标识符的名字，省去构造String(same as set and get, but the key is the name of an identifier, so no String is built)
+	def set_name(self, name, val):
+		env = self
+		while env.temporary and env.parent is not None:
+			env = env.parent
+		env.user_data._owned_dict()[name] = val
+	def get_name(self, name):
+		env = self
+		while True:
+			table = env.user_data
+			val = table._dict.get(name, table.always)
+			if val is not None:
+				return val
+			if env.parent is None:
+				return Undefined
+			env = env.parent
 	def sys_set(self, key, val):
 		self.system_data[key] = val
 	def sys_get(self, key):
-		val = self.system_data.get(key, Undefined)
-		if val == Undefined and self.parent is not None:
-			val = self.parent.sys_get(key)
-		return val
+		env = self
+		while True:
+			val = env.system_data.get(key, Undefined)
+			if val != Undefined or env.parent is None:
+				return val
+			env = env.parent
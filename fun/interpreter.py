@@ -1,25 +1,84 @@
 import fun.lexer as lexer
 import fun.parser as parser
 import fun.ast as ast
+import fun.optimizer as optimizer
+import fun.resolver as resolver
 import fun.fobject as obj
+import fun.compiler as compiler
+import fun.vm as vm
+import fun.vectorize as vectorize
 from fun.builtin import Print, Stop, Range, Iter
+from fun.utils import Context, MAX_STEPS, TIMEOUT
+from fun.cache import ProgramCache
+from fun.profiler import Profiler
+from fun.output import Sink, ListSink
 from fun.exception import CodeControlMessage, LexerException, ParserException, RuntimeException
 
-def make_env(stdout):
+def make_env(stdout, context=None, vectorized=False, max_steps=MAX_STEPS, timeout=None, profiler=None):
+	'''stdout是列表或Sink；context是这个环境所属解释器的状态，求值时要先激活；
+	vectorized为真且安装了NumPy时，数字管道按块向量化求值；
+	每次运行最多执行max_steps步、最长timeout秒，超出时报错，为None时不限；
+	给出Profiler时按行与函数体记录次数与用时
+	(stdout is a list or a sink; context is the state of the interpreter the env belongs to, activate it before evaluating;
+	with vectorized true and numpy installed, numeric pipelines are evaluated vectorized in chunks;
+	every run takes at most max_steps steps and timeout seconds or it fails, None for no limit;
+	with a profiler the counts and times are recorded by line and by fun body)'''
 	env = obj.Environment(obj.Table())
-	env.user_data._dict['print'] = Print(stdout)
+	env.context = context if context is not None else Context()
+	env.context.max_steps = max_steps
+	env.context.timeout = timeout
+	env.context.profiler = profiler
+	if vectorized and vectorize.numpy is not None:
+		env.context.vectorizer = vectorize.Vectorizer()
+	env.user_data._dict['print'] = Print(stdout if isinstance(stdout, Sink) else ListSink(stdout))
 	env.user_data._dict['stop'] = Stop()
 	env.user_data._dict['range'] = Range()
 	env.user_data._dict['iter'] = Iter()
 	return env
 
-def repl():
+# 执行引擎：把语法树变为可执行对象(engines turn the syntax tree into an executable)
+engines = {
+	'tree': lambda program: program,
+	'closure': compiler.compile_program,
+	'vm': vm.compile_program,
+}
+
+# 求值前依次作用于语法树的变换(passes applied to the syntax tree before evaluation, in order)
+passes = [
+	optimizer.optimize,
+	resolver.resolve,
+]
+
+def analyse(program):
+	for apply in passes:
+		program = apply(program)
+	return program
+
+def load(code, engine='tree', start_line=1):
+	'''词法分析、语法分析并编译，须在激活的Context中调用(lex, parse and compile, call it with a context active)'''
+	tokens = lexer.Tokens.tokenize(code, start_line=start_line)
+	return engines[engine](analyse(parser.program(tokens)))
+
+def load_file(file, engine='tree', start_line=1):
+	'''同load，但从文本文件对象中按块读入代码，不必先读入整个文件(like load, but the code is read in chunks from a text file object instead of all at once)'''
+	tokens = lexer.Tokens.tokenize_file(file, start_line=start_line)
+	return engines[engine](analyse(parser.program(tokens)))
+
+# repl_online默认使用的缓存(the cache used by repl_online by default)
+program_cache = ProgramCache()
+
+def repl(engine='tree', profile=False):
+	'''profile为真时每次输入运行后打印性能报告(with profile true a profile is printed after every input)'''
 	stdout = []
 	env = make_env(stdout)
 	while True:
+		if profile:
+			env.context.profiler = Profiler()
 		try:
-			tokens = lexer.Tokens.tokenize(input('>>> '))
-			parser.program(tokens).eval(env)
+			code = input('>>> ')
+			with env.context:
+				env.context.start()
+				load(code, engine, start_line=0).eval(env)
 		except LexerException as e:
 			stdout.append('line: {}, error: {}'.format(e.line_no, e.info))
 		except ParserException as e:
@@ -31,14 +90,25 @@ def repl():
 		output = '\n'.join(stdout)
 		if output:
 			print(output)
+		if profile:
+			print(env.context.profiler.format())
 		stdout.clear()
 
-def repl_online(code):
-	stdout = []
-	env = make_env(stdout)
+def execute(code, env, stdout, engine='tree', cache=program_cache):
+	'''在env中运行code，返回输出；错误与输出的格式同repl_online。stdout是Sink时输出已写入其中，返回None。
+	code也可以是文本文件对象，这时按块读入且不缓存
+	(run code in env and return the output, errors are formatted as in repl_online. when stdout is a sink the output is already written to it and None is returned.
+	code may also be a text file object, which is read in chunks and not cached)'''
 	try:
-		tokens = lexer.Tokens.tokenize(code, start_line=1)
-		parser.program(tokens).eval(env)
+		with env.context:
+			env.context.start()
+			if not isinstance(code, str):
+				program = load_file(code, engine)
+			elif cache is None:
+				program = load(code, engine)
+			else:
+				program = cache.get(code, engine, lambda code: load(code, engine))
+			program.eval(env)
 	except LexerException as e:
 		stdout.append('line: {}, error: {}'.format(e.line_no, e.info))
 	except ParserException as e:
@@ -47,5 +117,18 @@ def repl_online(code):
 		stdout.append('line: {}, error: {}'.format(e.line_no, e.info))
 	except CodeControlMessage as e:
 		stdout.append('不可在函数外使用返回或引发生成器终止')
+	if isinstance(stdout, Sink):
+		stdout.finish()
+		return None
 	return '\n'.join(stdout)
 
+def repl_online(code, engine='tree', context=None, cache=program_cache, sink=None, vectorized=False, max_steps=MAX_STEPS, timeout=TIMEOUT, profiler=None):
+	'''每次调用默认使用新的Context，因此可以在多个线程中同时调用；cache为None时不缓存；
+	给出sink时输出边运行边写入sink，返回None；max_steps、timeout与profiler见make_env，
+	默认最长运行TIMEOUT秒，处理大量数据时可以调大；运行后可用profiler.report()或profiler.format()取得报告
+	(a new context is used by default, so it can be called in many threads at once; nothing is cached when cache is None;
+	with a sink the output is written to it while running and None is returned; see make_env for max_steps, timeout and profiler,
+	a run takes at most TIMEOUT seconds by default, raise it for big data; get the report with profiler.report() or profiler.format() after the run)'''
+	stdout = [] if sink is None else sink
+	env = make_env(stdout, context, vectorized, max_steps, timeout, profiler)
+	return execute(code, env, stdout, engine, cache)
@@ -13,8 +13,7 @@ rules = [
 	('RELOAD', ['<<']),
 	('UNFOLD', ['\.\.']),
 	('OPERATOR', [r'[\+\*\-\/\^%!\?]', r'<=|>=|==|!=|<|>', r'(or)|(and)|(xor)', '#']),
-	('STRING', [r'"(\\"|[^"])*"', r"'(\\'|[^'])*'"]),
-	('NUMBER', [r'\d+\.\d+', r'\d+']),
+	('NUMBER', [r'\d+(\.\d+)?']),
 	('NAME', [r'[a-zA-Z_]\w*']),
 	('LPAREN', [r'\(']),
 	('RPAREN', [r'\)']),
@@ -32,6 +31,7 @@ rules = [
 rules = [(name, '|'.join(['({})'.format(p) for p in patterns])) for name, patterns in rules]
 _regex = re.compile('|'.join(['(?P<{}>{})'.format(name, patterns) for name, patterns in rules]))
 keywords = ['index', 'yes', 'no', 'nothing', 'always']
+quotes = ('"', "'")
 
 escape_regex = re.compile(r'\\(r|n|t|\\|\'|\")')
 chars = {
@@ -50,53 +50,112 @@ def replace(matches):
 decode = lambda s: escape_regex.sub(replace, s[1:-1])
 
 class Token:
+	__slots__ = ('name', 'value', 'line_no')
 	def __init__(self, name, value, line_no):
 		self.name = name
 		self.value = value
 		self.line_no = line_no
 
-def _tokenize(code, line_no):
+# 从文件读入时每次读的字符数(the number of chars read at a time from a file)
+CHUNK_SIZE = 64 * 1024
+# 单词法单元在其末尾之后最多还要看的字符数，例如<之后的?=(the most chars a token looks at past its end, e.g. ?= after <)
+LOOKAHEAD = 4
+
+def _string_end(code, pos):
+	'''从pos处的引号开始的字符串在code中的结尾，找不到时返回None。前面是反斜杠的引号被转义；
+	没有未转义的引号时，字符串在最后一个被转义的引号处结束。只用str.find，所以是线性的
+	(the end in code of the string starting at the quote at pos, None when it is not found. a quote after a backslash is escaped;
+	with no unescaped quote, the string ends at the last escaped quote. only str.find is used, so it is linear)'''
+	quote = code[pos]
+	escaped = None
+	end = code.find(quote, pos + 1)
+	while end != -1:
+		if code[end - 1] != '\\':
+			return end + 1
+		escaped = end
+		end = code.find(quote, end + 1)
+	return escaped + 1 if escaped is not None else None
+
+def _tokenize(chunks, line_no):
+	'''chunks是依次给出的各段源代码，词法单元可以跨段；已读的部分在读入更多代码时丢弃。
+	字符串不用正则分析，其余规则没有会回溯的重复，所以用时与代码长度成线性
+	(chunks are pieces of the source in order, a token may span pieces; what has been read is dropped when more code comes in.
+	strings are not lexed by a regex and the other rules have no backtracking repetition, so the time is linear in the length of the code)'''
+	chunks = iter(chunks)
+	code = ''
 	pos = 0
-	while pos < len(code):
-		matches = _regex.match(code, pos)
-		if matches is not None:
-			name = matches.lastgroup
-			pos = matches.end(name)
-			value = matches.group(name)
-			if name in ('IGNORE', 'STRING'):
-				line_no += value.count('\n')
-			if name == 'IGNORE':
-				continue
-			if name == 'NAME' and value in keywords:
-				yield Token(value.upper(), None, line_no)
-			elif name == 'STRING':
-				try:
-					yield Token(name, decode(value), line_no)
-				except DecodeException as e:
-					raise LexerException('未知字符 {}'.format(e.info), line_no)
-			else:
-				yield Token(name, value, line_no)
+	more = True
+	while True:
+		if pos < len(code) and code[pos] in quotes:
+			name = 'STRING'
+			# 没有未转义的引号时，结尾取决于之后的全部代码(with no unescaped quote, the end depends on all the code after it)
+			end = _string_end(code, pos)
+			complete = end is not None and code[end - 2] != '\\'
 		else:
+			matches = _regex.match(code, pos)
+			name = matches.lastgroup if matches is not None else None
+			end = matches.end() if matches is not None else None
+			complete = end is not None and end + LOOKAHEAD <= len(code)
+		if more and not complete:
+			# 至少读入与剩余代码等长的新代码，同一个词法单元被重新分析的总长度是线性的
+			# (read at least as much new code as is left, so a token is scanned again in linear total length)
+			pieces = [code[pos:]]
+			wanted = max(len(pieces[0]), 1)
+			while wanted > 0:
+				chunk = next(chunks, None)
+				if chunk is None:
+					more = False
+					break
+				pieces.append(chunk)
+				wanted -= len(chunk)
+			code = ''.join(pieces)
+			pos = 0
+			continue
+		if pos == len(code):
+			return
+		if end is None:
 			raise LexerException('非法字符 {}'.format(code[pos]), line_no)
+		value = code[pos:end]
+		pos = end
+		if name in ('IGNORE', 'STRING'):
+			line_no += value.count('\n')
+		if name == 'IGNORE':
+			continue
+		if name == 'NAME' and value in keywords:
+			yield Token(value.upper(), None, line_no)
+		elif name == 'STRING':
+			try:
+				yield Token(name, decode(value), line_no)
+			except DecodeException as e:
+				raise LexerException('未知字符 {}'.format(e.info), line_no)
+		else:
+			yield Token(name, value, line_no)
+
+def _with_eof(tokens):
+	line_no = 0
+	for token in tokens:
+		line_no = token.line_no
+		yield token
+	yield Token('EOF', None, line_no)
 
 class Tokens:
+	'''语法分析时逐个取出词法单元，只保留当前的一个(tokens are pulled one by one while parsing, only the current one is kept)'''
 	def __init__(self, tokens):
-		last_line = tokens[-1].line_no if tokens else 0
-		self.tokens = tokens + [Token('EOF', None, last_line)]
-		self._pos = 0
-	@property
-	def current(self):
-		return self.tokens[self._pos]
+		self._tokens = _with_eof(tokens)
+		self.current = next(self._tokens)
 	def consume(self, *name):
 		current = self.current
-		self._pos += 1
-		if current.name in name:
-			return current
-		else:
+		if current.name not in name:
 			expected_name = ' 或 '.join(name)
 			raise LexerException('希望得到一个{0} token，却得到{1} token。'.format(expected_name, current.name), current.line_no)
+		self.current = next(self._tokens, None)
+		return current
 	def is_end(self):
-		return self._pos == len(self.tokens)
+		return self.current is None
 	@classmethod
 	def tokenize(cls, code, start_line=0):
-		return cls(list(_tokenize(code, start_line)))
+		return cls(_tokenize([code], start_line))
+	@classmethod
+	def tokenize_file(cls, file, start_line=0, chunk_size=CHUNK_SIZE):
+		'''从文本文件对象中按块读入并分析(read and lex a text file object in chunks)'''
+		return cls(_tokenize(iter(lambda: file.read(chunk_size), ''), start_line))
@@ -0,0 +1,157 @@
+'''在求值前化简语法树(simplify the syntax tree before it is evaluated)
+
+字面量被换成预先构造好的值，只含字面量的算术、比较与字符串拼接被折叠，
+不含变量的字面量表被预先构造，Group被去掉。
+新节点保留原来的行号与代码，出错时的信息不变。
+'''
+from fun.exception import RuntimeException
+from fun.ast import Constant, binary_operator_validator
+import fun.fobject as obj
+
+# 折叠出的字符串长度上限，避免在声明时就构造巨大的值(folded strings are limited, or huge values would be built ahead of time)
+MAX_FOLDED_LENGTH = 4096
+MAX_FOLDED_EXPONENT = 64
+
+fields = {
+	'Variable': ('right',),
+	'BinaryOperator': ('left', 'right'),
+	'UnaryOperator': ('right',),
+	'Group': ('inner',),
+	'CallBlock': ('right',),
+	'Call': ('left', 'right'),
+	'Detect': ('left', 'right'),
+	'Transform': ('left', 'right'),
+	'Filter': ('left', 'right'),
+	'Reduce': ('left', 'right'),
+	'Unfold': ('right',),
+	'Reload': ('left', 'initializer'),
+	'Subscript': ('collection', 'key'),
+	'Assignment': ('left', 'right'),
+	'Return': ('right',),
+	'ListItem': ('item',),
+	'DictItem': ('left', 'right'),
+	'AlwaysItem': ('item',),
+}
+
+sequences = {
+	'Program': 'stmts',
+	'FunStatementNode': 'body',
+	'TableStatementNode': 'items',
+}
+
+def is_const(node):
+	return node.type == 'Constant' and isinstance(node.val, obj.Const)
+
+# 节点没有__dict__，所以带括号的节点换成同名子类的实例(nodes have no __dict__, so a parenthesized node becomes an instance of a subclass of the same name)
+parenthesized = {}
+
+def parenthesize(node):
+	'''去掉Group后，node仍带括号输出代码(after its Group is removed, node still prints its code in parentheses)'''
+	cls = type(node)
+	if cls not in parenthesized:
+		parenthesized[cls] = type(cls.__name__, (cls,), {
+			'__slots__': (),
+			'_code': lambda self, scope=0: '({})'.format(cls._code(self, scope)),
+			'_copy': lambda self: parenthesize(cls._copy(self)),
+		})
+	node.__class__ = parenthesized[cls]
+	return node
+
+def too_large(opt, left, right):
+	if opt == '*' and isinstance(left, obj.String) != isinstance(right, obj.String):
+		string, count = (left, right) if isinstance(left, obj.String) else (right, left)
+		return not isinstance(count.py_val, int) or len(string.py_val) * count.py_val > MAX_FOLDED_LENGTH
+	if opt == '+':
+		return len(left._str()) + len(right._str()) > MAX_FOLDED_LENGTH
+	if opt == '^':
+		return isinstance(right, obj.Number) and abs(right.py_val) > MAX_FOLDED_EXPONENT
+	return False
+
+def fold_binary_operator(node):
+	if not (is_const(node.left) and is_const(node.right)):
+		return node
+	left, right = node.left.val, node.right.val
+	if too_large(node.opt, left, right):
+		return node
+	validator = binary_operator_validator[node.opt]
+	try:
+		_, _, implementation, pattern = validator.resolve(node.line_no, (node.left, node.right), (left, right))
+		value = implementation(left, right, pattern)
+	except (RuntimeException, ArithmeticError, TypeError, ValueError):
+		# 留到运行时再报同样的错(the same error is left to be raised at runtime)
+		return node
+	if not isinstance(value, obj.Const):
+		return node
+	return Constant(node, value)
+
+def fold_unary_operator(node):
+	if not is_const(node.right):
+		return node
+	try:
+		value = node.apply(node.right.val)
+	except (RuntimeException, ArithmeticError, TypeError, ValueError):
+		return node
+	if not isinstance(value, obj.Const):
+		return node
+	return Constant(node, value)
+
+def fold_group(node):
+	if node.inner.type == 'Constant':
+		return Constant(node, node.inner.val)
+	return parenthesize(node.inner)
+
+def fold_table(node):
+	table = obj.Table()
+	for item in node.items:
+		if item.type == 'ListItem' and item.item.type == 'Constant':
+			table._list.append(item.item.val)
+		elif item.type == 'DictItem' and is_const(item.left) and item.right.type == 'Constant':
+			table._dict[item.left.val._id()] = item.right.val
+		elif item.type == 'AlwaysItem' and item.item.type == 'Constant':
+			table.always = item.item.val
+		else:
+			return node
+	return Constant(node, table)
+
+folders = {
+	'Nothing': lambda node: Constant(node, obj.fobject_nothing),
+	'Bool': lambda node: Constant(node, obj.Bool._py2fun(node.val)),
+	'Number': lambda node: Constant(node, obj.Number._py2fun(node.val)),
+	'String': lambda node: Constant(node, obj.String._py2fun(node.val)),
+	'BinaryOperator': fold_binary_operator,
+	'UnaryOperator': fold_unary_operator,
+	'Group': fold_group,
+	'TableStatementNode': fold_table,
+}
+
+def fold(node):
+	folder = folders.get(node.type)
+	if folder:
+		return folder(node)
+	return node
+
+def replace_children(node):
+	if node.type in sequences:
+		name = sequences[node.type]
+		children = [fold(child) for child in getattr(node, name)]
+		setattr(node, name, children)
+	else:
+		children = []
+		for name in fields.get(node.type, ()):
+			child = fold(getattr(node, name))
+			setattr(node, name, child)
+			children.append(child)
+	if children:
+		node.set_parent_for_children(*children)
+
+def optimize(program):
+	'''子节点先于父节点化简；不递归，很深的表达式也可以处理(children are simplified before their parents; no recursion, so very deep expressions are fine)'''
+	pending = [(program, False)]
+	while pending:
+		node, visited = pending.pop()
+		if visited:
+			replace_children(node)
+		else:
+			pending.append((node, True))
+			pending += [(child, False) for child in node.chilren]
+	return program
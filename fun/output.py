@@ -0,0 +1,89 @@
+'''print的输出目标(where print writes to)
+
+输出按行缓冲，缓冲的行数或字节数达到阈值时一起写出；设置了max_bytes时，
+超出的print会以运行时错误结束程序。
+(output is buffered by lines and written out together when the buffered lines or bytes reach a threshold;
+with max_bytes set, a print beyond it ends the program with a runtime error.)
+'''
+
+OUTPUT_LIMIT_INFO = '输出超出限制'
+
+class Sink:
+	def __init__(self, flush_lines=None, flush_bytes=64 * 1024, max_bytes=None):
+		self.flush_lines = flush_lines
+		self.flush_bytes = flush_bytes
+		self.max_bytes = max_bytes
+		self.buffer = []
+		self.buffered = 0
+		self.written = 0
+	@staticmethod
+	def size(line):
+		return len(line.encode()) + 1
+	def accepts(self, line):
+		return self.max_bytes is None or self.written + self.size(line) <= self.max_bytes
+	def append(self, line):
+		'''不检查max_bytes，错误信息也由此写出(max_bytes is not checked here, error messages are written this way too)'''
+		size = self.size(line)
+		self.buffer.append(line)
+		self.buffered += size
+		self.written += size
+		if self.buffered >= self.flush_bytes or (self.flush_lines is not None and len(self.buffer) >= self.flush_lines):
+			self.flush()
+	def flush(self):
+		if self.buffer:
+			text = '\n'.join(self.buffer) + '\n'
+			self.buffer.clear()
+			self.buffered = 0
+			self.emit(text)
+	def finish(self):
+		'''程序结束时调用(called when the program ends)'''
+		self.flush()
+	def emit(self, text):
+		raise NotImplementedError()
+
+class ListSink(Sink):
+	'''把每行放入列表，不缓冲(put every line into a list, without buffering)'''
+	def __init__(self, lines, max_bytes=None):
+		super(ListSink, self).__init__(max_bytes=max_bytes)
+		self.lines = lines
+	def append(self, line):
+		if self.max_bytes is not None:
+			self.written += self.size(line)
+		self.lines.append(line)
+	def flush(self):
+		pass
+
+class FileSink(Sink):
+	def __init__(self, file, **options):
+		super(FileSink, self).__init__(**options)
+		self.file = file
+	def emit(self, text):
+		self.file.write(text)
+	def finish(self):
+		self.flush()
+		self.file.flush()
+
+class CallbackSink(Sink):
+	def __init__(self, callback, **options):
+		super(CallbackSink, self).__init__(**options)
+		self.callback = callback
+	def emit(self, text):
+		self.callback(text)
+
+class QueueSink(Sink):
+	'''写入queue.Queue或asyncio.Queue，结束时放入None；程序不在事件循环的线程中运行时须给出loop
+	(write to a queue.Queue or an asyncio.Queue, None is put at the end; give the loop when the program does not run in its thread)'''
+	def __init__(self, queue, loop=None, **options):
+		super(QueueSink, self).__init__(**options)
+		self.queue = queue
+		self.loop = loop
+	def emit(self, text):
+		self.put(text)
+	def finish(self):
+		self.flush()
+		self.put(None)
+	def put(self, item):
+		if self.loop is None:
+			self.queue.put_nowait(item)
+		else:
+			self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
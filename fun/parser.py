@@ -290,7 +290,7 @@ def assignment_statement(tokens, left):
 	tokens.consume('SEMICOLON')
 	if right is not None:
 		return ast.Assignment(line_no, left, right)
-	raise ParserException('赋值语句右侧表达式缺失', token.line_no)
+	raise ParserException('赋值语句右侧表达式缺失', line_no)
 
 def swap_statement(tokens, left):
 	'''交换语句'''
@@ -0,0 +1,103 @@
+'''按源代码行与函数体统计求值次数与用时(count evaluations and time by source line and by fun body)
+
+开启时每条语句都经过Profiler.statement求值，记下次数、累计用时(含其中调用的函数)
+与自身用时(不含其中求值的其他语句)；关闭时各引擎每次调用函数体只多一次判断。
+(when on, every statement is evaluated through Profiler.statement, which records the count, the cumulative time
+(including the funs it calls) and the self time (excluding the other statements evaluated inside it);
+when off the engines only make one more check per call of a fun body.)
+'''
+import time
+from fun.utils import tick
+
+class Stats:
+	'''depth是正在求值的层数，递归时累计用时只在最外层计入
+	(depth is how many evaluations are in progress, with recursion the cumulative time is only added at the outermost one)'''
+	__slots__ = ('label', 'line_no', 'count', 'cumulative', 'self_time', 'depth')
+	def __init__(self, label, line_no):
+		self.label = label
+		self.line_no = line_no
+		self.count = 0
+		self.cumulative = 0.0
+		self.self_time = 0.0
+		self.depth = 0
+	def as_dict(self):
+		return {
+			'label': self.label,
+			'line_no': self.line_no,
+			'count': self.count,
+			'cumulative': self.cumulative,
+			'self': self.self_time,
+		}
+
+# 报告中函数体的代码最多显示的字符数(the most chars of the code of a fun body shown in a report)
+LABEL_WIDTH = 40
+
+def describe(body):
+	# 代码中的换行与缩进会打乱报告的列(line breaks and indents in the code would break the columns of a report)
+	code = ' '.join(('{' + ' '.join(stmt._code() + ';' for stmt in body) + '}').split())
+	return code if len(code) <= LABEL_WIDTH else code[:LABEL_WIDTH - 4] + ' ...'
+
+class Profiler:
+	'''一个Profiler记录一次运行；用make_env或repl_online的profiler参数开启
+	(a profiler records one run; turn it on with the profiler argument of make_env or repl_online)'''
+	def __init__(self, clock=time.perf_counter):
+		self.clock = clock
+		# 行号 -> Stats(line number -> stats)
+		self.lines = {}
+		# 函数体的第一条语句 -> Stats，同一处声明的函数共用(the first statement of a body -> stats, shared by the funs of one declaration)
+		self.funs = {}
+		# 正在求值的语句的[开始时间, 其中其他语句的用时]([start time, time of the statements inside] of the statements in progress)
+		self.stack = []
+	def fun(self, body, label=None):
+		'''函数体被调用一次或生成器走一步，返回它的Stats(a fun body is called once or a generator takes a step, return its stats)'''
+		key = body[0] if body else None
+		stats = self.funs.get(key)
+		if stats is None:
+			stats = self.funs[key] = Stats(label or describe(body), body[0].line_no if body else None)
+		stats.count += 1
+		return stats
+	def statement(self, stmt, fun, env):
+		'''求值fun中的语句stmt(evaluate the statement stmt in fun)'''
+		line = self.lines.get(stmt.line_no)
+		if line is None:
+			line = self.lines[stmt.line_no] = Stats('line {}'.format(stmt.line_no), stmt.line_no)
+		line.count += 1
+		line.depth += 1
+		fun.depth += 1
+		entry = [self.clock(), 0.0]
+		self.stack.append(entry)
+		try:
+			stmt.eval(env)
+		finally:
+			elapsed = self.clock() - entry[0]
+			self.stack.pop()
+			if self.stack:
+				self.stack[-1][1] += elapsed
+			for stats in (line, fun):
+				stats.self_time += elapsed - entry[1]
+				stats.depth -= 1
+				if stats.depth == 0:
+					stats.cumulative += elapsed
+	def run(self, body, env, label=None):
+		'''与Fun._call相同地依次求值body中的语句(evaluate the statements in body in order, as Fun._call does)'''
+		fun = self.fun(body, label)
+		for stmt in body:
+			tick(stmt.line_no)
+			self.statement(stmt, fun, env)
+	def report(self):
+		'''按自身用时从高到低排列的行与函数体，时间以秒计(lines and fun bodies sorted by self time, highest first, in seconds)'''
+		order = lambda item: (-item['self'], item['line_no'] if item['line_no'] is not None else -1)
+		return {
+			'lines': sorted((stats.as_dict() for stats in self.lines.values()), key=order),
+			'funs': sorted((stats.as_dict() for stats in self.funs.values()), key=order),
+		}
+	def format(self, limit=10):
+		'''report的文本形式，每部分最多limit项(report as text, at most limit items in each part)'''
+		report = self.report()
+		rows = ['{:<44}{:>10}{:>14}{:>14}'.format('', 'count', 'cumulative', 'self')]
+		for title in ('lines', 'funs'):
+			rows.append(title)
+			for item in report[title][:limit]:
+				label = item['label'] if title == 'lines' else '{:<5}{}'.format(item['line_no'] if item['line_no'] is not None else '', item['label'])
+				rows.append('  {:<42}{:>10}{:>12.3f}ms{:>12.3f}ms'.format(label, item['count'], item['cumulative'] * 1000, item['self'] * 1000))
+		return '\n'.join(rows)
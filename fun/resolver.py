@@ -0,0 +1,39 @@
+'''静态地确定标识符所在的环境(statically work out which environment an identifier lives in)
+
+作用域是动态的，被调用者的环境以调用者的环境为父，所以只有在同一函数体中
+已被赋值过的名字，才能确定就在当前环境里；这样的Identifier被标为local，
+求值时直接查当前环境的字典，查不到再沿环境链查找。
+其余的名字以及@expr仍然动态查找。
+'''
+from fun.ast import innermost
+
+def assigned_name(stmt):
+	if stmt.type == 'Assignment':
+		left = innermost(stmt.left)
+		if left.type == 'Identifier':
+			return left.id
+	return None
+
+def mark(stmt, assigned, bodies):
+	'''标记一条语句中的标识符，遇到的函数体留待之后处理(mark the identifiers in a statement, fun bodies met are left for later)'''
+	nodes = [stmt]
+	while nodes:
+		node = nodes.pop()
+		if node.type == 'Identifier':
+			node.local = node.id in assigned
+		elif node.type == 'FunStatementNode':
+			bodies.append(node.body)
+			continue
+		nodes += node.chilren
+
+def resolve(program):
+	bodies = [program.stmts]
+	while bodies:
+		body = bodies.pop()
+		assigned = set()
+		for stmt in body:
+			mark(stmt, assigned, bodies)
+			name = assigned_name(stmt)
+			if name is not None:
+				assigned.add(name)
+	return program
@@ -0,0 +1,153 @@
+'''按固定间隔对Fun的调用栈采样，以火焰图工具使用的折叠栈格式输出
+(sample the fun call stack at a fixed interval and write it in the collapsed stack format of flame graph tools)
+
+采样在另一个线程中进行：它读取运行程序的线程的Python栈，从中认出正在求值的语句、
+调用点、生成器与管道段，所以运行程序的线程不做任何额外的工作，开销只是采样线程每次占用的GIL。
+(sampling happens in another thread: it reads the python stack of the thread running the program and picks out
+the statements being evaluated, the call sites, the generators and the pipeline stages from it, so the thread running
+the program does no extra work and the cost is only the GIL held by the sampling thread each time.)
+
+用法(usage):
+	with Sampler() as sampler:
+		repl_online(code)
+	sampler.write(file)
+'''
+import sys
+import threading
+from collections import Counter
+import fun.ast as ast
+import fun.fobject as obj
+import fun.compiler as compiler
+import fun.vm as vm
+import fun.profiler as profiler
+
+# 默认的采样间隔，单位为秒(the default interval between samples, in seconds)
+INTERVAL = 0.005
+# 栈帧名中代码的最大长度(the most chars of code in the name of a frame)
+LABEL_WIDTH = 30
+
+def code_label(node):
+	'''栈帧名中不能有分号与换行(there can be no semicolon or line break in the name of a frame)'''
+	code = ' '.join(node._code().replace(';', ',').split())
+	return code if len(code) <= LABEL_WIDTH else code[:LABEL_WIDTH - 4] + ' ...'
+
+def fun_line(fun):
+	'''fun的函数体开始的行，用来区分不同的函数(the line the body of fun starts on, it tells funs apart)'''
+	return 'line {}'.format(fun.body[0].line_no) if isinstance(fun, obj.Fun) and fun.body else 'table'
+
+class Labels:
+	'''由Python栈帧的局部变量得出Fun栈帧的名字，调用点的名字按节点缓存
+	(names of fun frames from the locals of python frames, the names of call sites are cached by node)'''
+	def __init__(self):
+		self.sites = {}
+	def site(self, node):
+		label = self.sites.get(node)
+		if label is None:
+			label = self.sites[node] = '-> ' + code_label(node.right)
+		return label
+	def program(self, frame, stack):
+		stack.append(ast.PROGRAM_LABEL)
+		self.statement(frame, stack)
+	def statement(self, frame, stack):
+		stmt = frame.f_locals.get('stmt')
+		if stmt is not None:
+			stack.append('line {}'.format(stmt.line_no))
+	def call(self, frame, stack):
+		stack.append(self.site(frame.f_locals['self']))
+	def generator(self, frame, stack):
+		local = frame.f_locals
+		stack.append('generator ' + fun_line(local['self']))
+		body, step = local.get('body'), local.get('step')
+		if step is not None and step < len(body):
+			stack.append('line {}'.format(body[step].line_no))
+	def transform(self, frame, stack):
+		stack.append('=> ' + fun_line(frame.f_locals['self'].transformer))
+	def filter(self, frame, stack):
+		stack.append('| ' + fun_line(frame.f_locals['self'].checker))
+	def machine(self, frame, stack):
+		'''虚拟机内部调用的函数不在Python栈中：调用者保存在它的frames中，从base开始到下一个BASE帧之前为止，正在运行的帧在局部变量中
+		(funs called inside the machine are not in the python stack: their callers are kept in its frames from base up to the next BASE frame,
+		and the running frame is in the locals)'''
+		local = frame.f_locals
+		frames = []
+		if local['kind'] != vm.BASE:
+			for index, saved in enumerate(local['self'].frames[local['base']:]):
+				if index > 0 and saved[3] == vm.BASE:
+					break
+				frames.append(saved)
+		frames.append((local['stmts'], local['index'], None, local['kind'], local['counted'], local['site']))
+		for stmts, index, _, _, counted, site in (saved[:6] for saved in frames):
+			if site is not None:
+				stack.append(self.site(site))
+			# 不计步的BASE帧只有一条语句，调用者已经给出了它的行(a BASE frame not counted has one statement, its caller has given its line)
+			if counted and index > 0:
+				stack.append('line {}'.format(stmts[index - 1].line_no))
+	def handlers(self):
+		'''Python函数的代码对象 -> 处理它的栈帧的方法(the code object of a python function -> the method handling its frames)'''
+		return {
+			ast.Program.eval.__code__: self.program,
+			compiler.CompiledProgram.eval.__code__: self.program,
+			vm.Program.eval.__code__: self.program,
+			profiler.Profiler.run.__code__: self.statement,
+			obj.Fun._call.__code__: self.statement,
+			obj.Generator._frame.__code__: self.generator,
+			obj.Transform._apply.__code__: self.transform,
+			obj.Filter._apply.__code__: self.filter,
+			ast.Call.apply.__code__: self.call,
+			ast.CallBlock.apply.__code__: self.call,
+			vm.Machine.run.__code__: self.machine,
+		}
+
+class Sampler:
+	'''在with中每隔interval秒对进入with的线程采样一次；也可以用start与stop对别的线程采样
+	(inside with, the thread that entered it is sampled every interval seconds; start and stop can also sample another thread)'''
+	def __init__(self, interval=INTERVAL):
+		self.interval = interval
+		# 折叠栈 -> 采到的次数(collapsed stack -> the number of samples)
+		self.stacks = Counter()
+		self.labels = Labels()
+		self.handlers = self.labels.handlers()
+		self.thread_id = None
+		self.thread = None
+		self.stopped = threading.Event()
+	def __enter__(self):
+		self.start()
+		return self
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.stop()
+	def start(self, thread_id=None):
+		'''thread_id默认是当前线程(thread_id is the current thread by default)'''
+		self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+		self.stopped.clear()
+		self.thread = threading.Thread(target=self.main, daemon=True)
+		self.thread.start()
+	def stop(self):
+		self.stopped.set()
+		self.thread.join()
+		self.thread = None
+	def main(self):
+		while not self.stopped.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame is not None:
+				self.sample(frame)
+			frame = None
+	def sample(self, frame):
+		stack = self.stack(frame)
+		if stack:
+			self.stacks[';'.join(stack)] += 1
+	def stack(self, frame):
+		'''frame所在的Python栈中的Fun栈，由外到内(the fun stack in the python stack of frame, outermost first)'''
+		frames = []
+		while frame is not None:
+			if frame.f_code in self.handlers:
+				frames.append(frame)
+			frame = frame.f_back
+		stack = []
+		for frame in reversed(frames):
+			self.handlers[frame.f_code](frame, stack)
+		return stack
+	def collapsed(self):
+		'''每行一个栈及其采到的次数，可直接交给flamegraph.pl等工具(a stack and its number of samples per line, ready for tools such as flamegraph.pl)'''
+		return ''.join('{} {}\n'.format(stack, count) for stack, count in sorted(self.stacks.items()))
+	def write(self, file):
+		file.write(self.collapsed())
@@ -0,0 +1,194 @@
+'''在预热好的子进程池中运行不受信任的代码(run untrusted code in a pool of pre-warmed worker processes)
+
+每个子进程只导入一次fun并只调用一次make_env，每个请求在以它为父的新环境中运行。
+运行时间由子进程中解释器的期限限制，内存由子进程的地址空间上限(RLIMIT_AS)限制，
+超出时都像其他运行时错误一样报告；程序不再计步时，父进程在期限过后KILL_GRACE秒杀掉子进程并换一个新的。
+print的输出逐行传回父进程，所以出错或被杀时已有的输出也会返回，格式与repl_online相同。
+(every worker imports fun and calls make_env only once, every request runs in a new env whose parent is that one.
+the time is limited by the deadline of the interpreter in the worker and the memory by the address space limit (RLIMIT_AS)
+of the worker, both are reported like other runtime errors; when the program stops counting steps, the parent kills the
+worker KILL_GRACE seconds after the deadline and starts a new one. printed lines are sent back to the parent one by one,
+so the output so far is returned on an error or a kill too, in the same format as repl_online.)
+'''
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from fun.utils import TIMEOUT_INFO
+
+MEMORY_INFO = '内存超出限制'
+POLL_INTERVAL = 0.01
+# 解释器的期限过后，父进程再等这么多秒才杀掉子进程(the parent waits this many seconds after the deadline of the interpreter before it kills the worker)
+KILL_GRACE = 1.0
+
+class WorkerCrashed(Exception):
+	'''子进程中发生了解释器本身的错误，或者子进程意外退出(the interpreter itself failed in the worker, or the worker exited unexpectedly)'''
+
+def error_line(traceback):
+	'''异常经过的最内层的语句或节点所在的行，找不到时为0(the line of the innermost statement or node the exception passed through, 0 if there is none)'''
+	line_no = 0
+	while traceback is not None:
+		local = traceback.tb_frame.f_locals
+		for name in ('self', 'node', 'stmt'):
+			value = getattr(local.get(name), 'line_no', None)
+			if type(value) is int:
+				line_no = value
+				break
+		traceback = traceback.tb_next
+	return line_no
+
+def format_error(line_no, info):
+	return 'line: {}, error: {}'.format(line_no, info)
+
+def address_space():
+	'''本进程的虚拟内存大小，拿不到时返回0(the virtual memory size of this process, 0 when it is not available)'''
+	try:
+		with open('/proc/self/statm') as statm:
+			return int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+	except (OSError, ValueError, IndexError):
+		return 0
+
+def serve(conn):
+	'''子进程的入口(the entry of a worker process)'''
+	import resource
+	import fun.fobject as obj
+	from fun.utils import Context
+	from fun.builtin import Print
+	from fun.output import CallbackSink
+	from fun.interpreter import make_env, execute
+	base = make_env([])
+	no_limit = resource.getrlimit(resource.RLIMIT_AS)
+	conn.send('ready')
+	while True:
+		try:
+			request = conn.recv()
+		except EOFError:
+			break
+		if request is None:
+			break
+		code, engine, timeout, memory_limit = request
+		sink = CallbackSink(lambda text: conn.send(('out', text)), flush_lines=1)
+		env = obj.Environment(obj.Table(), parent=base)
+		env.context = Context()
+		env.context.timeout = timeout
+		env.user_data._dict['print'] = Print(sink)
+		try:
+			# 上限是请求开始时的地址空间加上memory_limit(the limit is the address space at the start of the request plus memory_limit)
+			if memory_limit is not None:
+				resource.setrlimit(resource.RLIMIT_AS, (address_space() + memory_limit, no_limit[1]))
+			try:
+				execute(code, env, sink, engine)
+			finally:
+				resource.setrlimit(resource.RLIMIT_AS, no_limit)
+		except MemoryError as e:
+			sink.append(format_error(error_line(e.__traceback__), MEMORY_INFO))
+			sink.finish()
+		except Exception as e:
+			conn.send(('crash', '{}: {}'.format(type(e).__name__, e)))
+			continue
+		conn.send(('done', None))
+
+class Worker:
+	def __init__(self, context):
+		self.conn, child = context.Pipe()
+		self.process = context.Process(target=serve, args=(child,), daemon=True)
+		self.process.start()
+		child.close()
+	def wait_ready(self):
+		return self.conn.recv() == 'ready'
+	def run(self, code, engine, timeout, memory_limit):
+		'''返回(输出, 子进程是否仍可用)；被杀时行号未知，报告为0
+		(return (output, whether the worker can still be used); the line is unknown on a kill and reported as 0)'''
+		self.conn.send((code, engine, timeout, memory_limit))
+		kill_at = time.monotonic() + timeout + KILL_GRACE if timeout is not None else None
+		chunks = []
+		while True:
+			if not self.conn.poll(POLL_INTERVAL):
+				if kill_at is not None and time.monotonic() >= kill_at:
+					chunks.append(format_error(0, TIMEOUT_INFO) + '\n')
+					return ''.join(chunks)[:-1], False
+				if not self.process.is_alive() and not self.conn.poll():
+					raise self.died()
+				continue
+			try:
+				status, data = self.conn.recv()
+			except EOFError:
+				raise self.died()
+			if status == 'out':
+				chunks.append(data)
+			elif status == 'crash':
+				raise WorkerCrashed(data)
+			else:
+				# 每行都以换行结束，与repl_online一样去掉最后一个(every line ends with a line break, the last one is dropped as repl_online does)
+				return ''.join(chunks)[:-1], True
+	def died(self):
+		'''子进程意外退出时，等它结束并返回要引发的异常(when the worker exits unexpectedly, wait for it to end and return the exception to raise)'''
+		self.process.join(1)
+		return WorkerCrashed('子进程意外退出，退出码为{}'.format(self.process.exitcode))
+	def kill(self):
+		self.process.kill()
+		self.process.join()
+		self.conn.close()
+	def close(self):
+		try:
+			self.conn.send(None)
+		except (OSError, ValueError):
+			pass
+		self.process.join(1)
+		if self.process.is_alive():
+			self.kill()
+
+class ExecutionService:
+	'''可在多个线程中同时调用run；并发数超过进程数时排队等待空闲的子进程
+	(run may be called from many threads at once; requests wait for an idle worker when all are busy)'''
+	def __init__(self, size=None, engine='tree', timeout=5.0, memory_limit=256 * 1024 * 1024):
+		self.size = size or os.cpu_count() or 1
+		self.engine = engine
+		self.timeout = timeout
+		self.memory_limit = memory_limit
+		self.context = multiprocessing.get_context('spawn')
+		self.idle = queue.Queue()
+		self.workers = []
+		self.lock = threading.Lock()
+		workers = [Worker(self.context) for _ in range(self.size)]
+		for worker in workers:
+			worker.wait_ready()
+			self.workers.append(worker)
+			self.idle.put(worker)
+	def run(self, code, engine=None, timeout=None, memory_limit=None):
+		engine = engine or self.engine
+		timeout = timeout if timeout is not None else self.timeout
+		memory_limit = memory_limit if memory_limit is not None else self.memory_limit
+		worker = self.idle.get()
+		healthy = False
+		try:
+			output, healthy = worker.run(code, engine, timeout, memory_limit)
+			return output
+		except WorkerCrashed:
+			healthy = worker.process.is_alive()
+			raise
+		finally:
+			if not healthy:
+				worker = self.replace(worker)
+			self.idle.put(worker)
+	def map(self, codes, **options):
+		with ThreadPoolExecutor(self.size) as executor:
+			return list(executor.map(lambda code: self.run(code, **options), codes))
+	def replace(self, worker):
+		worker.kill()
+		new = Worker(self.context)
+		new.wait_ready()
+		with self.lock:
+			self.workers[self.workers.index(worker)] = new
+		return new
+	def close(self):
+		with self.lock:
+			workers, self.workers = self.workers, []
+		for worker in workers:
+			worker.close()
+	def __enter__(self):
+		return self
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
@@ -1,33 +1,129 @@
+import math
+import time
+import contextvars
 from fun.exception import RuntimeException
 
+# 一次运行默认最多执行的步数(the most steps a run takes by default)
+MAX_STEPS = 10 ** 7
+# repl_online默认的运行时间上限，单位为秒(the default time limit of repl_online, in seconds)
+TIMEOUT = 1.0
+# 设了timeout时，每隔这么多步看一次时钟(with a timeout, the clock is read every this many steps)
+DEADLINE_INTERVAL = 1000
+STEP_LIMIT_INFO = '执行步数超出限制'
+TIMEOUT_INFO = '运行超时'
+
+class Context:
+	'''一个解释器独有的状态，即各种Scope的栈(the state owned by one interpreter, i.e. the stacks of the scopes)
+
+	用with激活；线程与asyncio任务各自有当前的Context，互不影响。
+	同一个Context不要同时在多个线程中使用。
+	(activate it with `with`; threads and asyncio tasks each have their own current context.
+	do not use one context in several threads at once.)
+	'''
+	def __init__(self):
+		# (Scope的子类, 事件名) -> 事件的栈((a subclass of Scope, event name) -> the stack of events)
+		self.stack = {}
+		# 正在进行的(事件名, id(对象))，见Active(the (event name, id(object)) in progress, see Active)
+		self.active = set()
+		self.tokens = []
+		# 已执行的语句与生成器步数；达到pause_at时调用on_pause(context)
+		# (statements and generator steps done so far; on_pause(context) is called when it reaches pause_at)
+		self.steps = 0
+		self._pause_at = None
+		self.on_pause = None
+		# 每次运行的预算：最多max_steps步，最长timeout秒，为None时不限；start时开始计算
+		# (the budget of every run: at most max_steps steps and timeout seconds, None for no limit; it is counted from start)
+		self.max_steps = MAX_STEPS
+		self.timeout = None
+		self.step_limit = math.inf
+		self.deadline = None
+		# tick只在steps达到check_at时才调用check(tick only calls check when steps reaches check_at)
+		self.check_at = math.inf
+		# 不为None时用来向量化求值数字管道，见fun.vectorize(when not None it evaluates numeric pipelines vectorized, see fun.vectorize)
+		self.vectorizer = None
+		# 不为None时每条语句经由它求值并计时，见fun.profiler(when not None every statement is evaluated and timed through it, see fun.profiler)
+		self.profiler = None
+		# 虚拟机引擎在这个Context中共用的Machine，见fun.vm(the machine shared by the vm engine in this context, see fun.vm)
+		self.machine = None
+	def __enter__(self):
+		self.tokens.append(current_context.set(self))
+		return self
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		current_context.reset(self.tokens.pop())
+	@property
+	def pause_at(self):
+		return self._pause_at
+	@pause_at.setter
+	def pause_at(self, value):
+		self._pause_at = value
+		self.update()
+	def start(self):
+		'''从现在开始计算一次运行的预算(count the budget of a run from now)'''
+		self.step_limit = self.steps + self.max_steps if self.max_steps is not None else math.inf
+		self.deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+		self.update()
+	def update(self):
+		check_at = self.step_limit + 1
+		if self._pause_at is not None:
+			check_at = min(check_at, self._pause_at)
+		if self.deadline is not None:
+			# 每DEADLINE_INTERVAL步才看一次时钟(the clock is read only every DEADLINE_INTERVAL steps)
+			check_at = min(check_at, self.steps + DEADLINE_INTERVAL)
+		self.check_at = check_at
+	def check(self, line_no):
+		'''超出预算时引发RuntimeException，到了pause_at时调用on_pause(raise RuntimeException when over budget, call on_pause at pause_at)'''
+		if self.steps > self.step_limit:
+			raise RuntimeException(line_no, STEP_LIMIT_INFO)
+		if self.deadline is not None and time.monotonic() > self.deadline:
+			raise RuntimeException(line_no, TIMEOUT_INFO)
+		if self._pause_at is not None and self.steps >= self._pause_at:
+			self.on_pause(self)
+		self.update()
+
+current_context = contextvars.ContextVar('current_context', default=None)
+
+def get_context():
+	'''没有激活的Context时，为当前线程或任务新建一个(when none is active, a new one is made for the current thread or task)'''
+	context = current_context.get()
+	if context is None:
+		context = Context()
+		current_context.set(context)
+	return context
+
+def tick(line_no, count=1):
+	'''每执行一条语句或生成器的一步计一步，line_no是超出预算时报告的行号
+	(a step is counted for every statement evaluated and every generator step, line_no is the line reported when over budget)'''
+	context = get_context()
+	context.steps += count
+	if context.steps >= context.check_at:
+		context.check(line_no)
+
 class Scope:
-	stack = {}
-	@classmethod
-	def get_stack(cls):
-		return Scope.stack.get(cls, [])
+	'''info是StackEvent，同名的事件在同一个栈中(info is a StackEvent, events of the same name share a stack)'''
 	@classmethod
 	def get_node_with(cls, target):
-		stack = Scope.stack.get(cls, [])
+		stack = get_context().stack.get((cls, target))
 		if stack:
-			stack = [event for event in stack if target == event.name]
-			if stack:
-				return stack[-1]
+			return stack[-1]
 		return None
 	@classmethod
 	def clear_all(cls):
-		Scope.stack.clear()
+		get_context().stack.clear()
 	@classmethod
 	def clear(cls):
-		if cls in Scope.stack:
-			Scope.stack[cls].clear()
+		for key, stack in get_context().stack.items():
+			if key[0] is cls:
+				stack.clear()
 	def __init__(self, info=None):
 		self.info = info
 	def __enter__(self):
-		if type(self) not in Scope.stack:
-			Scope.stack[type(self)] = []
-		Scope.stack[type(self)].append(self.info)
+		stack = get_context().stack
+		key = (type(self), self.info.name)
+		if key not in stack:
+			stack[key] = []
+		stack[key].append(self.info)
 	def __exit__(self, exc_type, exc_val, exc_tb):
-		Scope.stack[type(self)].pop()
+		get_context().stack[(type(self), self.info.name)].pop()
 
 class LexerScope(Scope): pass
 class ParserScope(Scope): pass
@@ -38,15 +134,25 @@ class StackEvent:
 		self.name = name
 		self.info = info
 
+class Active:
+	'''在with中把info标为正在进行name，用Active.has在O(1)时间内检查(inside with, info is marked as doing name, Active.has checks it in O(1))'''
+	def __init__(self, name, info):
+		self.key = (name, id(info))
+		self.active = get_context().active
+	@staticmethod
+	def has(name, info):
+		return (name, id(info)) in get_context().active
+	def __enter__(self):
+		self.active.add(self.key)
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.active.discard(self.key)
+
 def recursion_forbidden(event_name, err_msg):
 	def wrapper(func):
 		def inner(self, line_no, env):
-			event_stack = InterpreterScope.get_stack()
-			if [event for event in event_stack if event.name == event_name and event.info == self]:
+			if Active.has(event_name, self):
 				raise RuntimeException(line_no, err_msg)
-			with InterpreterScope(StackEvent(event_name, self)):
-				func(self, line_no, env)
+			with Active(event_name, self):
+				return func(self, line_no, env)
 		return inner
 	return wrapper
-
-MAX_LOOP_COUNT = 900
@@ -0,0 +1,376 @@
+'''用NumPy按块求值数字range上的管道(evaluate pipelines over numeric ranges in chunks with numpy)
+
+只处理源头是range，各段都是只含@0、数字与布尔字面量以及算术、比较、逻辑运算的单条返回语句的管道，
+以及求和、计数、求积形式的>>。某一块中会出错、溢出或与Python的数值结果不同时，从这一块起交回解释器，
+所以结果、错误与计步都与解释器相同。没有安装NumPy时不启用。
+(only pipelines from a range whose stages are single return statements of @0, number and bool literals and
+arithmetic, comparison and logic operators are handled, and >> in the form of a sum, a count or a product.
+from a chunk that would fail, overflow or differ from python numbers on, the interpreter takes over, so the
+results, the errors and the steps are the same. it is off when numpy is not installed.)
+'''
+import math
+import operator
+import functools
+import fun.ast as ast
+import fun.fobject as obj
+from fun.builtin import NumberGenerator
+from fun.utils import tick
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+CHUNK_SIZE = 1024
+MAX_EXPONENT = 64
+# int64的运算结果不超过SAFE_INT时与Python的整数相同；与浮点数混合时，整数不超过EXACT_INT才能精确转换
+# (int64 results agree with python ints up to SAFE_INT; mixed with floats, ints must not exceed EXACT_INT to convert exactly)
+SAFE_INT = 2 ** 62
+EXACT_INT = 2 ** 53
+
+class Fallback(Exception):
+	'''不能向量化求值，交回解释器(it can not be evaluated vectorized, the interpreter takes over)'''
+
+def literal(node):
+	'''字面量节点的值，不是数字或布尔字面量时返回None(the value of a literal node, None when it is not a number or a bool)'''
+	if node.type == 'Constant':
+		value = node.val
+	elif node.type in ('Number', 'Bool'):
+		value = node.eval(None)
+	else:
+		return None
+	return value if type(value) in (obj.Number, obj.Bool) else None
+
+def is_argument(node):
+	'''是否为@0(whether it is @0)'''
+	if node.type != 'Variable':
+		return False
+	key = literal(ast.innermost(node.right))
+	return key is not None and type(key) is obj.Number and key.py_val == 0
+
+def max_abs(array):
+	if numpy.ndim(array) == 0:
+		return abs(array.item())
+	return abs(array).max().item() if len(array) else 0
+
+def truth(array, kind):
+	return array if kind == 'bool' else array != 0
+
+def check_ints(bound, *operands):
+	for array, kind in operands:
+		if kind == 'int' and max_abs(array) > bound:
+			raise Fallback()
+
+arithmetic = {
+	'+': operator.add,
+	'-': operator.sub,
+	'*': operator.mul,
+}
+comparison = {
+	'>': operator.gt,
+	'>=': operator.ge,
+	'<': operator.lt,
+	'<=': operator.le,
+	'==': operator.eq,
+	'!=': operator.ne,
+}
+logic = {
+	'and': operator.and_,
+	'or': operator.or_,
+	'xor': operator.ne,
+}
+
+def compile_expression(node, kind):
+	'''返回(run, 结果的种类)，run对参数数组求值；kind是@0的种类：int，float或bool
+	(return (run, the kind of the result), run evaluates on the array of arguments; kind is the kind of @0: int, float or bool)'''
+	node = ast.innermost(node)
+	value = literal(node)
+	if value is not None:
+		if type(value) is obj.Bool:
+			return (lambda x: numpy.bool_(value.py_val)), 'bool'
+		if type(value.py_val) is int:
+			if abs(value.py_val) > SAFE_INT:
+				raise Fallback()
+			return (lambda x: numpy.int64(value.py_val)), 'int'
+		return (lambda x: numpy.float64(value.py_val)), 'float'
+	if is_argument(node):
+		return (lambda x: x), kind
+	if node.type == 'UnaryOperator':
+		run, right_kind = compile_expression(node.right, kind)
+		if node.opt == '-' and right_kind != 'bool':
+			return (lambda x: -run(x)), right_kind
+		if node.opt == '!':
+			return (lambda x: numpy.logical_not(truth(run(x), right_kind))), 'bool'
+		if node.opt == '?':
+			return (lambda x: truth(run(x), right_kind)), 'bool'
+		raise Fallback()
+	if node.type == 'BinaryOperator':
+		return compile_binary(node, kind)
+	raise Fallback()
+
+def compile_binary(node, kind):
+	left, left_kind = compile_expression(node.left, kind)
+	right, right_kind = compile_expression(node.right, kind)
+	opt = node.opt
+	if opt in logic:
+		apply = logic[opt]
+		return (lambda x: apply(truth(left(x), left_kind), truth(right(x), right_kind))), 'bool'
+	if left_kind == 'bool' or right_kind == 'bool':
+		raise Fallback()
+	mixed = left_kind != right_kind
+	if opt in comparison:
+		apply = comparison[opt]
+		def run(x):
+			a, b = left(x), right(x)
+			if mixed:
+				check_ints(EXACT_INT, (a, left_kind), (b, right_kind))
+			return apply(a, b)
+		return run, 'bool'
+	result_kind = 'float' if 'float' in (left_kind, right_kind) else 'int'
+	if opt in arithmetic:
+		apply = arithmetic[opt]
+		def run(x):
+			a, b = left(x), right(x)
+			if mixed:
+				check_ints(EXACT_INT, (a, left_kind), (b, right_kind))
+			elif result_kind == 'int':
+				bound = max_abs(a) * max_abs(b) if opt == '*' else max_abs(a) + max_abs(b)
+				if bound > SAFE_INT:
+					raise Fallback()
+			return apply(a, b)
+		return run, result_kind
+	if opt in ('/', '%'):
+		apply = numpy.true_divide if opt == '/' else numpy.remainder
+		def run(x):
+			a, b = left(x), right(x)
+			# 除数为0时Python会出错，交给解释器引发(python fails on a zero divisor, the interpreter raises it)
+			if numpy.any(b == 0):
+				raise Fallback()
+			if opt == '/' or mixed:
+				check_ints(EXACT_INT, (a, left_kind), (b, right_kind))
+			return apply(a, b)
+		return run, 'float' if opt == '/' else result_kind
+	if opt == '^':
+		exponent = literal(ast.innermost(node.right))
+		if left_kind != 'int' or exponent is None or type(exponent.py_val) is not int or not 0 <= exponent.py_val <= MAX_EXPONENT:
+			raise Fallback()
+		power = exponent.py_val
+		def run(x):
+			a = left(x)
+			if max_abs(a) ** power > SAFE_INT:
+				raise Fallback()
+			return numpy.power(a, power)
+		return run, 'int'
+	raise Fallback()
+
+def stage_expression(fun):
+	'''只有一条返回语句的函数返回的表达式，否则返回None(the expression returned by a fun of one return statement, or None)'''
+	if type(fun) is not obj.Fun or len(fun.body) != 1:
+		return None
+	stmt = fun.body[0]
+	# 闭包与虚拟机引擎的语句在node属性中保留语法树(statements of the closure and vm engines keep the syntax tree in node)
+	node = stmt if isinstance(stmt, ast.Node) else getattr(stmt, 'node', None)
+	if not isinstance(node, ast.Return):
+		return None
+	return node.right
+
+class Plan:
+	'''一条可以向量化求值的管道，每次从源头取一块，按块求出各段的结果
+	(a pipeline that can be evaluated vectorized, it takes a chunk from the source at a time and works out all stages for it)'''
+	def __init__(self, source, stages, kind):
+		self.source = source
+		self.stages = stages
+		self.kind = kind
+		# 当前这一块的第一个值(the first value of the current chunk)
+		self.start = None
+		self.fates = []
+		self.outputs = []
+		self.cursor = 0
+		self.output_cursor = 0
+		self.stopped = False
+	def pull(self):
+		'''从源头取一个值，返回拒绝它的段的下标，通过了全部各段时返回段数；
+		源头耗尽时返回obj.Exhausted；不能继续向量化时返回None，此后一直返回None
+		(take a value from the source and return the index of the stage rejecting it, or the number of stages when it passes all;
+		return obj.Exhausted when the source is exhausted; return None when it can not go on vectorized, and always None after that)'''
+		if self.cursor == len(self.fates):
+			if self.stopped:
+				return None
+			filled = self.fill()
+			if filled is None:
+				self.stopped = True
+			if filled is not True:
+				return filled
+		fate = self.fates[self.cursor]
+		self.cursor += 1
+		return fate
+	def value(self):
+		'''最近一个通过了全部各段的值(the latest value passing all stages)'''
+		value = self.outputs[self.output_cursor]
+		self.output_cursor += 1
+		self.sync()
+		if self.kind == 'bool':
+			return obj.Bool._py2fun(value)
+		return obj.Number._py2fun(value)
+	def sync(self):
+		'''把源头的下一个值写回range：复制管道或交回解释器时从那里继续，而不是从这一块之后
+		(write the next value of the source back to the range: a copy of the pipeline or the interpreter taking over goes on from there, not from after this chunk)'''
+		if self.start is not None:
+			self.source.initializer._setitem(obj.Number._py2fun(0), obj.Number._py2fun(self.start + self.cursor))
+	def fill(self):
+		self.sync()
+		source = self.source
+		if source.eof:
+			return obj.Exhausted
+		items = source.initializer._list
+		if len(items) < 2 or type(items[0]) is not obj.Number or type(items[1]) is not obj.Number:
+			return None
+		start, end = items[0].py_val, items[1].py_val
+		if type(start) is not int or end != end:
+			return None
+		if start > end:
+			source.eof = True
+			return obj.Exhausted
+		count = CHUNK_SIZE if end == math.inf else min(CHUNK_SIZE, math.floor(end) - start + 1)
+		if max(abs(start), abs(start + count)) > SAFE_INT:
+			return None
+		try:
+			fates, outputs = self.evaluate(numpy.arange(start, start + count, dtype=numpy.int64))
+		except Fallback:
+			return None
+		self.start = start
+		self.fates = fates.tolist()
+		self.outputs = outputs.tolist()
+		self.cursor = self.output_cursor = 0
+		return True
+	def evaluate(self, values):
+		fates = numpy.full(len(values), len(self.stages))
+		alive = numpy.arange(len(values))
+		for index, (is_filter, run, kind) in enumerate(self.stages):
+			if not len(alive):
+				break
+			result = run(values)
+			if numpy.ndim(result) == 0:
+				result = numpy.full(len(values), result)
+			if is_filter:
+				keep = truth(result, kind)
+				fates[alive[~keep]] = index
+				alive = alive[keep]
+				values = values[keep]
+			else:
+				values = result
+		return fates, values
+
+class Accumulator:
+	'''以acc = acc + E或acc = acc * E与<- acc为函数体的降维生成器，E是@0或数字字面量；
+	值先收集起来，提交时一次算出结果并写回生成器
+	(a reducer whose body is acc = acc + E or acc = acc * E and <- acc, E is @0 or a number literal;
+	values are collected first and the result is worked out at once and written back to the reducer on commit)'''
+	def __init__(self, reducer, name, opt, operand):
+		self.reducer = reducer
+		self.name = name
+		self.opt = opt
+		self.operand = operand
+		self.values = []
+		self.last = None
+	def add(self, line_no, value):
+		if type(value) is not obj.Number:
+			return False
+		self.values.append(value.py_val)
+		self.last = value
+		tick(line_no, len(self.reducer.body))
+		return True
+	def commit(self, reduced):
+		'''把收集的值写回生成器，返回最后一次降维的结果(write the values collected back to the reducer, return the latest result)'''
+		if not self.values:
+			return reduced
+		reducer = self.reducer
+		operands = self.values if self.operand is None else [self.operand] * len(self.values)
+		start = reducer.initializer._dict[self.name].py_val
+		value = obj.Number._py2fun(combine(self.opt, start, operands))
+		args = obj.Table()
+		args._list.append(self.last)
+		reducer.initializer = reducer.initializer._reload(args)
+		reducer.initializer._owned_dict()[self.name] = value
+		# 与执行完<- acc之后的状态相同(the same state as after <- acc is run)
+		reducer.start_step = len(reducer.body)
+		reducer.frame = None
+		self.values = []
+		return value
+
+def combine(opt, start, operands):
+	'''按顺序计算start opt operands[0] opt operands[1] ...，结果与Python逐个计算相同
+	(work out start opt operands[0] opt operands[1] ... in order, the result is the same as python one by one)'''
+	if type(start) is int and all(type(item) is int for item in operands):
+		return start + sum(operands) if opt == '+' else math.prod(operands, start=start)
+	if all(type(item) is float for item in operands) and (type(start) is float or abs(start) <= EXACT_INT):
+		accumulate = numpy.add.accumulate if opt == '+' else numpy.multiply.accumulate
+		# 溢出得到inf或nan，与Python的浮点运算相同，不要向用户报警告(overflow gives inf or nan as python floats do, no warning for the user)
+		with numpy.errstate(over='ignore', invalid='ignore'):
+			return accumulate(numpy.array([start] + operands, dtype=numpy.float64))[-1].item()
+	return functools.reduce(operator.add if opt == '+' else operator.mul, operands, start)
+
+class Vectorizer:
+	def plan(self, pipeline):
+		'''管道可以向量化时返回Plan，否则返回None(return a Plan when the pipeline can be vectorized, or None)'''
+		if pipeline.chain is None:
+			pipeline.chain = pipeline._flatten()
+		source, pipeline_stages, _ = pipeline.chain
+		if type(source) is not NumberGenerator:
+			return None
+		kind = 'int'
+		stages = []
+		for stage in pipeline_stages:
+			is_filter = isinstance(stage, obj.Filter)
+			expression = stage_expression(stage.checker if is_filter else stage.transformer)
+			if expression is None:
+				return None
+			try:
+				run, result_kind = compile_expression(expression, kind)
+			except Fallback:
+				return None
+			stages.append((is_filter, run, result_kind))
+			if not is_filter:
+				kind = result_kind
+		return Plan(source, stages, kind)
+	def pure(self, generator):
+		'''取值时是否只求纯的表达式，因而不会读写降维生成器；退回解释器后各段仍是同样的表达式
+		(whether taking values evaluates nothing but pure expressions, so the reducer is not read or written meanwhile;
+		after falling back to the interpreter the stages are still the same expressions)'''
+		if type(generator) is NumberGenerator:
+			return True
+		if isinstance(generator, obj.Pipeline):
+			if generator.vector is None:
+				generator.vector = self.plan(generator) or False
+			return generator.vector is not False
+		return False
+	def accumulator(self, generator, reducer):
+		'''能够向量化这次降维时返回Accumulator，否则返回None(return an Accumulator when this reduce can be vectorized, or None)'''
+		if type(reducer) is not obj.Generator or reducer.eof or len(reducer.body) != 2 or not self.pure(generator):
+			return None
+		nodes = [stmt if isinstance(stmt, ast.Node) else getattr(stmt, 'node', None) for stmt in reducer.body]
+		assignment, ret = nodes
+		if not isinstance(assignment, ast.Assignment) or not isinstance(ret, ast.Return):
+			return None
+		target = ast.innermost(assignment.left)
+		result = ast.innermost(ret.right)
+		expression = ast.innermost(assignment.right)
+		if target.type != 'Identifier' or result.type != 'Identifier' or result.id != target.id:
+			return None
+		if expression.type != 'BinaryOperator' or expression.opt not in ('+', '*'):
+			return None
+		left, right = ast.innermost(expression.left), ast.innermost(expression.right)
+		if right.type == 'Identifier' and right.id == target.id:
+			left, right = right, left
+		if left.type != 'Identifier' or left.id != target.id:
+			return None
+		if type(reducer.initializer._dict.get(target.id)) is not obj.Number:
+			return None
+		value = literal(right)
+		if value is not None and type(value) is obj.Number:
+			operand = value.py_val
+		elif is_argument(right):
+			operand = None
+		else:
+			return None
+		return Accumulator(reducer, target.id, expression.opt, operand)
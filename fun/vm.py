@@ -0,0 +1,625 @@
+'''字节码与栈式虚拟机(bytecode and a stack based virtual machine)
+
+每条语句被编译为一个扁平的指令数组：[操作码, 参数, 操作码, 参数, ...]，
+参数是常量表中的下标。普通函数的调用在虚拟机内部压入新的帧，
+不再占用Python的调用栈。一个Context中只有一个Machine，从Python代码中调用函数体
+(如管道调用函数时)也在它的帧栈上进行，不另建虚拟机。
+(each statement is compiled into a flat array of instructions: [opcode, arg, opcode, arg, ...],
+an arg is an index into the constant table. calls of ordinary funs push a new frame inside the machine
+and take no room on the python call stack. a context has one machine, and fun bodies called from python code
+(as when a pipeline calls a fun) run on its frame stack too, without making another machine.)
+'''
+from fun.utils import tick, get_context
+from fun.exception import ReturnMessage, RuntimeException
+from fun.ast import Unsolved, Index, AutoReturn, PROGRAM_LABEL, innermost, may_be_undefined, literal_key
+import fun.fobject as obj
+
+MAX_CALL_DEPTH = 5000
+
+opnames = [
+	'CONST',
+	'LITERAL',
+	'LOAD_NAME',
+	'LOAD_LOCAL',
+	'LOAD_VARIABLE',
+	'VARIABLE',
+	'INDEX',
+	'BINARY',
+	'UNARY',
+	'POP',
+	'STORE_NAME',
+	'STORE_ITEM',
+	'SUBSCRIPT',
+	'TARGET_BEGIN',
+	'TARGET_END',
+	'CALL',
+	'CALL_BLOCK',
+	'RETURN',
+	'DETECT',
+	'MAP',
+	'FILTER',
+	'REDUCE',
+	'RELOAD',
+	'UNFOLD',
+	'BUILD_TABLE',
+	'LIST_ITEM',
+	'DICT_ITEM',
+	'ALWAYS_ITEM',
+	'MAKE_FUN',
+	'BUILD_FUN',
+	'FUN_STMT',
+	'FINISH_FUN',
+	'RAISE',
+	'END',
+]
+globals().update({name: code for code, name in enumerate(opnames)})
+
+class Code:
+	'''一条语句的字节码，以END结束(the bytecode of one statement, it ends with END)'''
+	def __init__(self, ops, lines, consts):
+		self.ops = ops
+		self.lines = lines
+		self.consts = consts
+
+# 只有END的指令，帧从它开始进入第一条语句(only END, a frame starts from it to go to its first statement)
+NEXT = (END, 0)
+
+class Statement:
+	'''编译后的语句，可作为obj.Fun的函数体(a compiled statement, it can be used in the body of obj.Fun)'''
+	def __init__(self, node, code):
+		self.node = node
+		self.line_no = node.line_no
+		self.type = node.type
+		self.code = code
+		self.stmts = (self,)
+	def eval(self, env):
+		# 调用者已经为这条语句计过步(the caller has counted the step for this statement)
+		value = get_machine().run(self.stmts, env, False)
+		if value is not None:
+			raise ReturnMessage(value)
+	def _code(self, scope=0):
+		return self.node._code(scope)
+	def _copy(self):
+		return self
+
+class Body(list):
+	'''虚拟机建立的函数体：Fun._call把整个函数体交给虚拟机一次运行，不再逐条语句进出虚拟机
+	(a fun body made by the machine: Fun._call hands the whole body to the machine in one run instead of entering it statement by statement)'''
+	def run(self, env):
+		value = get_machine().run(self, env)
+		if value is not None:
+			raise ReturnMessage(value)
+
+class Program:
+	def __init__(self, program, stmts):
+		self.program = program
+		self.stmts = stmts
+	def eval(self, env):
+		profiler = get_context().profiler
+		machine = get_machine()
+		# 计时时每条语句都要经过Profiler，所以不在虚拟机内部调用函数(when profiling every statement goes through the profiler, so funs are not called inside the machine)
+		machine.inline = profiler is None
+		if profiler is not None:
+			return profiler.run(self.stmts, env, PROGRAM_LABEL)
+		value = machine.run(self.stmts, env)
+		if value is not None:
+			raise ReturnMessage(value)
+	def _code(self, scope=0):
+		return self.program._code(scope)
+
+class TargetInfo:
+	'''自动lambda目标的静态信息(static information of an auto lambda target)'''
+	def __init__(self, node):
+		self.node = node
+		self.statement = None
+	def make_lambda(self):
+		# 用到时才编译，避免嵌套的目标被重复编译(compiled lazily, or nested targets would be compiled again and again)
+		if self.statement is None:
+			builder = Builder()
+			builder.statement(AutoReturn(self.node))
+			self.statement = Statement(AutoReturn(self.node), builder.build())
+		return obj.Fun(Body((self.statement,)))
+
+class Builder:
+	def __init__(self):
+		self.ops = []
+		self.lines = []
+		self.consts = []
+	def build(self):
+		line_no = self.lines[-1] if self.lines else 0
+		return Code(tuple(self.ops) + (END, 0), tuple(self.lines) + (line_no,), tuple(self.consts))
+	def emit(self, op, arg, line_no):
+		self.ops += (op, arg)
+		self.lines.append(line_no)
+	def const(self, value):
+		self.consts.append(value)
+		return len(self.consts) - 1
+	def emit_const(self, op, value, line_no):
+		self.emit(op, self.const(value), line_no)
+	# 编译不递归：有子表达式的emit_方法是生成器，
+	# 每yield一个子节点，就先编译它再继续(compiling does not recurse: emit_ methods
+	# with children are generators, each yielded child is compiled before they go on)
+	def expression(self, node):
+		emitter = self.emit_node(node)
+		pending = [emitter] if emitter is not None else []
+		while pending:
+			try:
+				child = next(pending[-1])
+			except StopIteration:
+				pending.pop()
+				continue
+			emitter = self.emit_node(child)
+			if emitter is not None:
+				pending.append(emitter)
+	def emit_node(self, node):
+		return getattr(self, 'emit_' + node.type)(node)
+	def target(self, node):
+		if node.type == 'Identifier' or literal_key(node) is not None:
+			# 叶子中未定义的变量只属于这个目标，找不到时直接得到lambda，不必开始目标
+			# (an undefined name in a leaf belongs to this target only, a miss gives the lambda directly and no target is begun)
+			self.emit_leaf(node, TargetInfo(node))
+		elif may_be_undefined(node):
+			self.emit_const(TARGET_BEGIN, TargetInfo(node), node.line_no)
+			yield node
+			self.emit(TARGET_END, 0, node.line_no)
+		else:
+			yield node
+	def statement(self, node):
+		self.expression(node)
+		if node.type not in ('Assignment', 'Return', 'CallBlock'):
+			self.emit(POP, 0, node.line_no)
+
+	def emit_Nothing(self, node):
+		self.emit_const(CONST, obj.fobject_nothing, node.line_no)
+	def emit_Bool(self, node):
+		self.emit_const(CONST, obj.Bool._py2fun(node.val), node.line_no)
+	def emit_Number(self, node):
+		self.emit_const(CONST, obj.Number._py2fun(node.val), node.line_no)
+	def emit_String(self, node):
+		self.emit_const(CONST, obj.String._py2fun(node.val), node.line_no)
+	def emit_Constant(self, node):
+		if node.mutable:
+			self.emit_const(LITERAL, node, node.line_no)
+		else:
+			self.emit_const(CONST, node.val, node.line_no)
+	def emit_Index(self, node):
+		self.emit_const(INDEX, node, node.line_no)
+	def emit_leaf(self, node, target=None):
+		'''target不为None时，变量未定义则得到它的lambda(when target is not None, an undefined name gives its lambda)'''
+		if node.type == 'Identifier':
+			op = LOAD_LOCAL if node.local else LOAD_NAME
+			self.emit_const(op, (node.id, node.line_no, '未定义变量: {}'.format(node.id), target), node.line_no)
+		else:
+			key = literal_key(node)._id()
+			position = key if isinstance(key, int) else -1
+			info = '未定义变量: @{}'.format(node.right._code())
+			self.emit_const(LOAD_VARIABLE, (key, position, node.right.line_no, info, target), node.line_no)
+	def emit_Variable(self, node):
+		if literal_key(node) is not None:
+			self.emit_leaf(node)
+			return
+		yield node.right
+		self.emit_const(VARIABLE, node, node.line_no)
+	def emit_BinaryOperator(self, node):
+		yield node.left
+		yield node.right
+		self.emit_const(BINARY, node, node.line_no)
+	def emit_UnaryOperator(self, node):
+		yield node.right
+		self.emit_const(UNARY, node, node.line_no)
+	def emit_Group(self, node):
+		yield node.inner
+	def emit_Identifier(self, node):
+		self.emit_leaf(node)
+	def emit_CallBlock(self, node):
+		yield node.right
+		self.emit_const(CALL_BLOCK, node, node.line_no)
+	def emit_Call(self, node):
+		yield node.left
+		yield from self.target(node.right)
+		self.emit_const(CALL, node, node.line_no)
+	def emit_Detect(self, node):
+		yield node.left
+		yield from self.target(node.right)
+		self.emit_const(DETECT, node, node.line_no)
+	def emit_Transform(self, node):
+		yield node.left
+		yield from self.target(node.right)
+		self.emit_const(MAP, node, node.line_no)
+	def emit_Filter(self, node):
+		yield node.left
+		yield from self.target(node.right)
+		self.emit_const(FILTER, node, node.line_no)
+	def emit_Reduce(self, node):
+		yield node.left
+		yield from self.target(node.right)
+		self.emit_const(REDUCE, node, node.line_no)
+	def emit_Reload(self, node):
+		yield from self.target(node.left)
+		yield node.initializer
+		self.emit_const(RELOAD, node, node.line_no)
+	def emit_Unfold(self, node):
+		# 栈顶之下是正在声明的表或函数体(the table or the fun body being declared is under the top)
+		yield node.right
+		self.emit_const(UNFOLD, node, node.line_no)
+	def emit_FunStatementNode(self, node):
+		if not any(stmt.type == 'Unfold' for stmt in node.body):
+			self.emit_const(MAKE_FUN, tuple(compile_statement(stmt) for stmt in node.body), node.line_no)
+			return
+		self.emit(BUILD_FUN, 0, node.line_no)
+		for stmt in node.body:
+			if stmt.type == 'Unfold':
+				yield stmt
+			else:
+				self.emit_const(FUN_STMT, compile_statement(stmt), stmt.line_no)
+		self.emit(FINISH_FUN, 0, node.line_no)
+	def emit_Subscript(self, node):
+		yield node.collection
+		yield node.key
+		self.emit_const(SUBSCRIPT, node, node.line_no)
+	def emit_Assignment(self, node):
+		left = innermost(node.left)
+		if left.type == 'Identifier':
+			yield from self.target(node.right)
+			self.emit_const(STORE_NAME, left.id, node.line_no)
+		elif left.type == 'Subscript':
+			yield left.collection
+			yield left.key
+			yield from self.target(node.right)
+			self.emit_const(STORE_ITEM, left, node.line_no)
+		else:
+			self.emit_const(RAISE, (left.line_no, '不可以向{}赋值'.format(left._code())), node.line_no)
+	def emit_Return(self, node):
+		yield from self.target(node.right)
+		self.emit(RETURN, 0, node.line_no)
+	def emit_ListItem(self, node):
+		yield from self.target(node.item)
+		self.emit(LIST_ITEM, 0, node.line_no)
+	def emit_DictItem(self, node):
+		yield node.left
+		yield from self.target(node.right)
+		self.emit(DICT_ITEM, 0, node.line_no)
+	def emit_AlwaysItem(self, node):
+		yield from self.target(node.item)
+		self.emit(ALWAYS_ITEM, 0, node.line_no)
+	def emit_Always(self, node):
+		if node.parent.type == 'Subscript' and node.parent.key == node:
+			self.emit_const(CONST, obj.Always(), node.line_no)
+		else:
+			self.emit_const(RAISE, (node.line_no, 'always关键字除下标外不可用于他处'), node.line_no)
+	def emit_TableStatementNode(self, node):
+		self.emit(BUILD_TABLE, 0, node.line_no)
+		for item in node.items:
+			yield item
+
+def compile_statement(node):
+	builder = Builder()
+	builder.statement(node)
+	return Statement(node, builder.build())
+
+def compile_program(program):
+	return Program(program, [compile_statement(stmt) for stmt in program.stmts])
+
+BASE, CALL_FRAME, BLOCK_FRAME = range(3)
+
+class Machine:
+	'''正在运行的帧的状态都在run的局部变量中：stmts与index是函数体与下一条语句，kind为BASE的帧结束时回到Python，
+	BLOCK_FRAME中的返回会继续从外层帧返回，site是调用这一帧的Call或CallBlock节点(BASE帧为None)，
+	stack_base与target_depth是帧开始时stack与targets的长度。
+	调用函数时调用者的状态作为元组压入frames，被调用的函数结束后弹出恢复：
+	(stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth)
+	可重入：Python代码在运行中再次调用run时，新的run只使用frames等的末尾，结束时恢复原样。
+	(the state of the running frame is all in the locals of run: stmts and index are the body and its next statement,
+	a BASE frame goes back to python when it ends, a return in a BLOCK_FRAME also returns from the outer frame,
+	site is the Call or CallBlock node that called the frame (None for a BASE frame),
+	stack_base and target_depth are the lengths of stack and targets when the frame began.
+	when a fun is called the state of the caller is pushed onto frames as the tuple above and popped back when the fun ends.
+	reentrant: when python code calls run again during a run, the new run only uses the ends of frames and the others and leaves them as they were.)'''
+	def __init__(self):
+		self.frames = []
+		self.stack = []
+		# 正在求值的自动lambda目标的TargetInfo，已遇到未定义变量的换成了它的lambda，最后一个最近；
+		# 虚拟机中未定义的变量都由它处理，不经过InterpreterScope
+		# (the TargetInfo of the auto lambda targets being evaluated, replaced by its lambda once an undefined name is met, the last is the nearest;
+		# undefined names in the machine are all handled here, not through InterpreterScope)
+		self.targets = []
+		self.inline = True
+	def undefined(self, line_no, info):
+		'''与fun.ast.undefined相同，但最近的目标在self.targets中(the same as fun.ast.undefined, but the nearest target is in self.targets)'''
+		if not self.targets:
+			raise RuntimeException(line_no, info)
+		# 第一次遇到未定义的变量时把目标换成它的lambda(the target is replaced by its lambda at the first undefined name)
+		if type(self.targets[-1]) is TargetInfo:
+			self.targets[-1] = self.targets[-1].make_lambda()
+		return Unsolved
+	def run(self, stmts, env, counted=True):
+		'''作为BASE帧依次求值stmts，返回其中返回的值，没有时返回None
+		(evaluate stmts in order as a BASE frame, return the value returned in them, or None if there is none)'''
+		frames, stack, targets = self.frames, self.stack, self.targets
+		base, stack_base, target_depth = len(frames), len(stack), len(targets)
+		base_stack, base_targets = stack_base, target_depth
+		index, kind, site = 0, BASE, None
+		ops, consts, pc = NEXT, (), 0
+		while True:
+			try:
+				while True:
+					op = ops[pc]
+					arg = ops[pc + 1]
+					pc += 2
+					if op == END:
+						# 进入下一条语句(go to the next statement)
+						if index >= len(stmts):
+							if kind == BASE:
+								return None
+							if kind == CALL_FRAME:
+								stack.append(obj.fobject_nothing)
+							stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth = frames.pop()
+							continue
+						stmt = stmts[index]
+						index += 1
+						if counted:
+							tick(stmt.line_no)
+						if type(stmt) is not Statement:
+							ops, consts, pc = NEXT, (), 0
+							stmt.eval(env)
+							continue
+						code = stmt.code
+						ops, consts, pc = code.ops, code.consts, 0
+					elif op == CONST:
+						stack.append(consts[arg])
+					elif op == BINARY:
+						right = stack.pop()
+						left = stack[-1]
+						if left is Unsolved or right is Unsolved:
+							stack[-1] = Unsolved
+							continue
+						node = consts[arg]
+						cache = node.cache
+						if cache[0] is type(left) and cache[1] is type(right):
+							stack[-1] = cache[2](left, right, cache[3])
+						else:
+							stack[-1] = node.apply(left, right)
+					elif op == LOAD_NAME:
+						name, line_no, info, target = consts[arg]
+						value = env.get_name(name)
+						if value is obj.Undefined:
+							value = self.undefined(line_no, info) if target is None else target.make_lambda()
+						stack.append(value)
+					elif op == LOAD_LOCAL:
+						name, line_no, info, target = consts[arg]
+						value = env.user_data._dict.get(name)
+						if value is None:
+							value = env.get_name(name)
+							if value is obj.Undefined:
+								value = self.undefined(line_no, info) if target is None else target.make_lambda()
+						stack.append(value)
+					elif op == LOAD_VARIABLE:
+						# 与env.get相同地沿环境链查找，键在编译时算好(looked up along the environment chain as env.get does, the key is worked out at compile time)
+						key, position, line_no, info, target = consts[arg]
+						scope = env
+						while True:
+							table = scope.user_data
+							if 0 <= position < len(table._list):
+								value = table._list[position]
+								break
+							value = table._dict.get(key, table.always)
+							if value is not None:
+								break
+							if scope.parent is None:
+								value = self.undefined(line_no, info) if target is None else target.make_lambda()
+								break
+							scope = scope.parent
+						stack.append(value)
+					elif op == TARGET_BEGIN:
+						targets.append(consts[arg])
+					elif op == TARGET_END:
+						target = targets.pop()
+						if stack[-1] is Unsolved and type(target) is not TargetInfo:
+							stack[-1] = target
+					elif op == STORE_NAME:
+						value = stack.pop()
+						if value is not Unsolved:
+							env.set_name(consts[arg], value)
+					elif op == RETURN:
+						value = stack.pop()
+						if value is Unsolved:
+							pc = len(ops) - 2
+							continue
+						# 与下面由Python代码引发的返回相同(the same as a return raised by python code below)
+						while kind != CALL_FRAME:
+							if kind == BASE:
+								del stack[base_stack:]
+								del targets[base_targets:]
+								return value
+							del stack[stack_base:]
+							del targets[target_depth:]
+							stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth = frames.pop()
+						del stack[stack_base:]
+						del targets[target_depth:]
+						stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth = frames.pop()
+						stack.append(value)
+					elif op == POP:
+						stack.pop()
+					elif op == CALL or op == CALL_BLOCK:
+						node = consts[arg]
+						callable = stack.pop()
+						if op == CALL:
+							args = stack.pop()
+							if args is Unsolved or callable is Unsolved:
+								stack.append(Unsolved)
+								continue
+							if type(callable) is not obj.Fun or not self.inline:
+								stack.append(node.apply(env, args, callable))
+								continue
+							call_env = obj.Environment(callable._init(callable.make_args(args)), parent=env)
+							call_kind = CALL_FRAME
+						else:
+							if callable is Unsolved:
+								continue
+							if type(callable) is not obj.Fun or not self.inline:
+								node.apply(env, callable)
+								continue
+							call_env = obj.Environment(callable._init(), parent=env, temporary=True)
+							call_kind = BLOCK_FRAME
+						if len(frames) > MAX_CALL_DEPTH:
+							raise RuntimeException(node.line_no, '调用层数过多')
+						frames.append((stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth))
+						stmts, index, env, kind, counted, site = callable.body, 0, call_env, call_kind, True, node
+						ops, consts, pc = NEXT, (), 0
+						stack_base, target_depth = len(stack), len(targets)
+					elif op == LITERAL:
+						stack.append(consts[arg].make())
+					elif op == VARIABLE:
+						key = stack[-1]
+						if key is not Unsolved:
+							# 同Variable.lookup，未定义时交给self.undefined(as Variable.lookup, an undefined name goes to self.undefined)
+							node = consts[arg]
+							if not isinstance(key, (obj.Number, obj.String)):
+								raise RuntimeException(node.right.line_no, '{} 不是整数或字符串'.format(node.right._code()))
+							value = env.get(node.line_no, key)
+							if value == obj.Undefined:
+								value = self.undefined(node.right.line_no, '未定义变量: @{}'.format(node.right._code()))
+							stack[-1] = value
+					elif op == SUBSCRIPT:
+						key = stack.pop()
+						collection = stack[-1]
+						if collection is Unsolved or key is Unsolved:
+							stack[-1] = Unsolved
+						else:
+							stack[-1] = consts[arg].apply(collection, key)
+					elif op == UNARY:
+						value = stack[-1]
+						if value is not Unsolved:
+							stack[-1] = consts[arg].apply(value)
+					elif op == BUILD_TABLE:
+						stack.append(obj.Table())
+					elif op == LIST_ITEM:
+						value = stack.pop()
+						if value is not Unsolved:
+							stack[-1]._list.append(value)
+					elif op == DICT_ITEM:
+						value = stack.pop()
+						key = stack.pop()
+						if key is not Unsolved and value is not Unsolved:
+							stack[-1]._dict[key._id()] = value
+					elif op == ALWAYS_ITEM:
+						value = stack.pop()
+						if value is not Unsolved:
+							stack[-1].always = value
+					elif op == MAKE_FUN:
+						stack.append(obj.Fun(Body(consts[arg])))
+					elif op == BUILD_FUN:
+						stack.append(Body())
+					elif op == FUN_STMT:
+						stack[-1].append(consts[arg])
+					elif op == FINISH_FUN:
+						stack[-1] = obj.Fun(stack[-1])
+					elif op == STORE_ITEM:
+						value = stack.pop()
+						key = stack.pop()
+						collection = stack.pop()
+						if collection is Unsolved or key is Unsolved or value is Unsolved:
+							continue
+						try:
+							collection._setitem(key, value)
+						except AttributeError:
+							left = consts[arg]
+							raise RuntimeException(left.collection.line_no, '{}不是容器'.format(left.collection._code()))
+					elif op == INDEX:
+						value = obj.Number._py2fun(env.sys_get(Index))
+						if value == obj.Undefined:
+							raise RuntimeException(consts[arg].line_no, '不可在循环外使用index')
+						stack.append(value)
+					elif op == RAISE:
+						raise RuntimeException(*consts[arg])
+					else:
+						node = consts[arg]
+						right = stack.pop()
+						if op == UNFOLD:
+							if right is not Unsolved:
+								node.apply(env, right, stack[-1])
+							continue
+						left = stack[-1]
+						if left is Unsolved or right is Unsolved:
+							stack[-1] = Unsolved
+						elif op == MAP or op == FILTER or op == RELOAD:
+							stack[-1] = node.apply(left, right)
+						else:
+							stack[-1] = node.apply(env, left, right)
+			except ReturnMessage as ret:
+				# 由Python代码引发的返回(a return raised by python code)
+				value = ret.value
+				while kind != CALL_FRAME:
+					if kind == BASE:
+						del frames[base:]
+						del stack[base_stack:]
+						del targets[base_targets:]
+						raise
+					del stack[stack_base:]
+					del targets[target_depth:]
+					stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth = frames.pop()
+				del stack[stack_base:]
+				del targets[target_depth:]
+				stmts, index, env, kind, counted, site, ops, consts, pc, stack_base, target_depth = frames.pop()
+				stack.append(value)
+			except BaseException:
+				del frames[base:]
+				del stack[base_stack:]
+				del targets[base_targets:]
+				raise
+
+def get_machine():
+	context = get_context()
+	if context.machine is None:
+		context.machine = Machine()
+	return context.machine
+
+def dis(code, scope=0):
+	'''反汇编(disassemble)，code可以是Program，Statement或Code'''
+	if isinstance(code, Program):
+		return '\n\n'.join(dis(stmt, scope) for stmt in code.stmts)
+	if isinstance(code, Statement):
+		header = '{}# line {}: {}'.format('    ' * scope, code.line_no, ' '.join(code._code().split()))
+		return header + '\n' + dis(code.code, scope)
+	lines = []
+	nested = []
+	for offset in range(0, len(code.ops), 2):
+		op, arg = code.ops[offset], code.ops[offset + 1]
+		name = opnames[op]
+		if name in ('POP', 'TARGET_END', 'END', 'RETURN', 'BUILD_TABLE', 'LIST_ITEM', 'DICT_ITEM', 'ALWAYS_ITEM', 'BUILD_FUN', 'FINISH_FUN'):
+			detail = ''
+		else:
+			detail = describe(name, code.consts[arg], nested)
+		lines.append('{}{:>4} {:>4} {:<14}{}'.format('    ' * scope, code.lines[offset // 2], offset, name, detail))
+	for stmt in nested:
+		lines.append('')
+		lines.append(dis(stmt, scope + 1))
+	return '\n'.join(lines)
+
+def describe(name, const, nested):
+	if name == 'MAKE_FUN':
+		nested.extend(const)
+		return '({} statements)'.format(len(const))
+	if name == 'FUN_STMT':
+		nested.append(const)
+		return '(line {})'.format(const.line_no)
+	if name in ('LOAD_NAME', 'LOAD_LOCAL'):
+		return '({})'.format(const[0])
+	if name == 'LOAD_VARIABLE':
+		key = const[0]
+		return '(@{})'.format('"{}"'.format(key) if isinstance(key, str) else key)
+	if name == 'STORE_NAME':
+		return '({})'.format(const)
+	if name == 'CONST':
+		return '({})'.format(const._code())
+	if name == 'LITERAL':
+		return '({})'.format(' '.join(const._code().split()))
+	if name == 'BINARY':
+		return '({})'.format(const.opt)
+	if name == 'UNARY':
+		return '({})'.format(const.opt)
+	if name == 'TARGET_BEGIN':
+		return '({})'.format(' '.join(const.node._code().split()))
+	if name == 'RAISE':
+		return '({})'.format(const[1])
+	return ''
@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from fun.interpreter import repl_online
+from fun.aio import run_async
+from fun.output import QueueSink
+
+LOOP = 'loop = {<- 1;} << []; [..loop] -> print;'
+SUM = 'sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 20000] >> sum -> print;'
+
+def test_run_async_does_not_block_the_loop():
+	async def main():
+		ticks = 0
+		async def ticker():
+			nonlocal ticks
+			while True:
+				await asyncio.sleep(0.001)
+				ticks += 1
+		task = asyncio.create_task(ticker())
+		output = await run_async(SUM)
+		task.cancel()
+		return output, ticks
+	output, ticks = asyncio.run(main())
+	assert output == repl_online(SUM)
+	assert ticks > 10
+
+def test_run_async_cancel():
+	async def main():
+		with pytest.raises(asyncio.TimeoutError):
+			await asyncio.wait_for(run_async(LOOP), 0.1)
+	asyncio.run(main())
+
+def test_short_programs_do_not_wait_for_long_ones():
+	async def main():
+		finished = []
+		async def run(name, code):
+			await run_async(code, slice_steps=100)
+			finished.append(name)
+		await asyncio.gather(run('long', SUM), run('short', '1 + 2 -> print;'))
+		return finished
+	assert asyncio.run(main()) == ['short', 'long']
+
+def test_queue_sink():
+	async def main():
+		queue = asyncio.Queue()
+		await run_async('1 -> print; 2 -> print;', sink=QueueSink(queue, flush_lines=1))
+		return [await queue.get() for _ in range(3)]
+	assert asyncio.run(main()) == ['1\n', '2\n', None]
@@ -0,0 +1,39 @@
+import time
+import pytest
+from fun.interpreter import engines, repl_online
+from fun.utils import Context, STEP_LIMIT_INFO, TIMEOUT_INFO
+
+# 第二行是死循环，两个生成器都在这一行，所以报告的行号是确定的
+# (the second line loops forever, both generators are on it, so the reported line is certain)
+LOOP = '"start" -> print;\nloop = {<- 1;} << []; [..loop] -> print;'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_step_limit(engine):
+	output = repl_online(LOOP, engine, cache=None, max_steps=1000, timeout=None)
+	assert output == '"start"\nline: 2, error: {}'.format(STEP_LIMIT_INFO)
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_timeout(engine):
+	start = time.monotonic()
+	output = repl_online(LOOP, engine, cache=None, max_steps=None, timeout=0.05)
+	assert output == '"start"\nline: 2, error: {}'.format(TIMEOUT_INFO)
+	assert time.monotonic() - start < 1
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_default_deadline(engine):
+	start = time.monotonic()
+	output = repl_online('g = {<- 1;} << []; [..g] -> print;', engine, cache=None)
+	assert output == 'line: 1, error: {}'.format(TIMEOUT_INFO)
+	assert time.monotonic() - start < 3
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_long_loops_are_not_capped(engine):
+	code = 's = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 5000] >> s -> print;'
+	assert repl_online(code, engine, cache=None) == str(sum(range(5001)))
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_budget_is_per_run(engine):
+	code = 's = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 100] >> s -> print;'
+	context = Context()
+	for _ in range(3):
+		assert repl_online(code, engine, context=context, cache=None, max_steps=500) == '5050'
@@ -0,0 +1,62 @@
+import pytest
+from fun.cache import ProgramCache
+from fun.interpreter import engines, load, repl_online
+
+def builder(built):
+	def build(code):
+		built.append(code)
+		return load(code, 'tree')
+	return build
+
+def test_hits_and_misses():
+	cache, built = ProgramCache(), []
+	first = cache.get('a;', 'tree', builder(built))
+	assert cache.get('a;', 'tree', builder(built)) is first
+	cache.get('a;', 'vm', builder(built))
+	assert built == ['a;', 'a;']
+	assert cache.stats()['hits'] == 1
+	assert cache.stats()['misses'] == 2
+	assert cache.stats()['entries'] == 2
+
+def test_evicts_least_recently_used():
+	cache, built = ProgramCache(max_entries=2), []
+	cache.get('a;', 'tree', builder(built))
+	cache.get('b;', 'tree', builder(built))
+	cache.get('a;', 'tree', builder(built))
+	cache.get('c;', 'tree', builder(built))
+	assert cache.stats()['entries'] == 2
+	# b最久没有用到，被移出(b was used least recently and is evicted)
+	cache.get('b;', 'tree', builder(built))
+	assert built == ['a;', 'b;', 'c;', 'b;']
+	cache.get('c;', 'tree', builder(built))
+	assert built == ['a;', 'b;', 'c;', 'b;']
+
+def test_evicts_by_bytes():
+	cache = ProgramCache(max_bytes=100)
+	cache.put('a', 'A', 60)
+	cache.put('b', 'B', 60)
+	assert list(cache.entries) == ['b']
+	assert cache.stats()['bytes'] == 60
+	# 比上限还大的程序不缓存(a program larger than the limit is not cached)
+	cache.put('c', 'C', 101)
+	assert list(cache.entries) == ['b']
+	cache.clear()
+	assert cache.stats()['entries'] == 0
+	assert cache.stats()['bytes'] == 0
+
+def test_build_errors_are_not_cached():
+	cache = ProgramCache()
+	def build(code):
+		raise ValueError(code)
+	with pytest.raises(ValueError):
+		cache.get('a;', 'tree', build)
+	assert cache.stats()['entries'] == 0
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_repl_online_reuses_programs(engine):
+	cache = ProgramCache()
+	code = 'x = @0; [1, 2] -> print;'
+	assert repl_online(code, engine, cache=cache) == repl_online(code, engine, cache=cache) == '1 2'
+	assert cache.stats()['hits'] == 1
+	assert cache.stats()['misses'] == 1
+	assert cache.stats()['bytes'] > 0
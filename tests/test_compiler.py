@@ -0,0 +1,25 @@
+import pytest
+import fun.compiler as compiler
+from fun.interpreter import load, repl_online
+
+@pytest.fixture
+def literal_variables(monkeypatch):
+	'''记下按字面量键编译的变量(record the variables compiled by literal keys)'''
+	compiled = []
+	compile_literal_variable = compiler.compile_literal_variable
+	def recorded(node, *args):
+		compiled.append(node._code())
+		return compile_literal_variable(node, *args)
+	monkeypatch.setattr(compiler, 'compile_literal_variable', recorded)
+	return compiled
+
+def test_literal_keys_after_optimizing(literal_variables):
+	# 优化后@0与@"k"的键是Constant节点(after optimizing the keys of @0 and @"k" are Constant nodes)
+	load('f = {<- @0 * 2 + @"k";}; g = @1; [3, "k": 1] -> f -> print;', 'closure')
+	assert sorted(literal_variables) == ['@"k"', '@0', '@1']
+
+def test_literal_keys(literal_variables):
+	code = 'f = {<- @0 * 2 + @"k";}; g = @1; [3, "k": 1] -> f -> print; [5, 6] -> g -> print; @0 -> print;'
+	assert repl_online(code, 'closure', cache=None) == '7\n6\nline: 1, error: 未定义变量: @0'
+	assert repl_online(code, 'closure', cache=None) == repl_online(code, 'tree', cache=None)
+	assert literal_variables
@@ -0,0 +1,77 @@
+import sys
+import threading
+import pytest
+from fun.interpreter import engines, repl_online
+from fun.cache import ProgramCache
+from fun.utils import Active, InterpreterScope, StackEvent
+
+def in_threads(*targets):
+	'''在各自的线程中同时运行targets，返回它们的结果(run targets at once in threads of their own and return their results)'''
+	results = [None] * len(targets)
+	errors = []
+	def main(index, target):
+		try:
+			results[index] = target()
+		except BaseException as e:
+			errors.append(e)
+	threads = [threading.Thread(target=main, args=item) for item in enumerate(targets)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	if errors:
+		raise errors[0]
+	return results
+
+def test_scopes_per_thread():
+	barrier = threading.Barrier(2)
+	def enter(name):
+		def target():
+			with InterpreterScope(StackEvent('auto_lambda', name)):
+				# 两个线程都进入了同名的事件(both threads have entered an event of the same name)
+				barrier.wait()
+				seen = InterpreterScope.get_node_with('auto_lambda').info
+				barrier.wait()
+			return seen, InterpreterScope.get_node_with('auto_lambda')
+		return target
+	assert in_threads(enter('a'), enter('b')) == [('a', None), ('b', None)]
+
+def test_active_per_thread():
+	barrier = threading.Barrier(2)
+	shared = object()
+	def active():
+		with Active('call_generator', shared):
+			barrier.wait()
+			barrier.wait()
+		return Active.has('call_generator', shared)
+	def inactive():
+		barrier.wait()
+		# 另一个线程中正在调用不影响这个线程(a call in progress in the other thread does not affect this one)
+		has = Active.has('call_generator', shared)
+		barrier.wait()
+		return has
+	assert in_threads(active, inactive) == [False, False]
+
+# 自动lambda要找到自己线程中的目标，生成器的递归检查只看自己线程中的调用
+# (auto lambdas must find the targets in their own thread, the recursion check of generators only sees the calls in its own thread)
+PROGRAMS = [
+	'f = x * y + z; ["x": 2, "y": 3, "z": 4] -> f -> print; g = {<- a + b;}; ["a": 1, "b": 2] -> g -> print;',
+	'g = {[1] -> g -> print; <- 1;} << []; [..g] -> print;',
+	'gen = {<- @0 * 2;} << [1]; sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 300] | @0 % 3 == 0 => {<- [@0] -> gen;} >> sum -> print;',
+]
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_programs_in_threads(engine):
+	# 频繁切换线程，让各个程序交错执行(switch threads often so the programs are interleaved)
+	interval = sys.getswitchinterval()
+	sys.setswitchinterval(1e-6)
+	try:
+		cache = ProgramCache()
+		expected = [repl_online(code, engine, cache=None, timeout=None) for code in PROGRAMS]
+		def run(code):
+			return lambda: [repl_online(code, engine, cache=cache, timeout=None) for _ in range(20)]
+		results = in_threads(*(run(code) for code in PROGRAMS * 2))
+	finally:
+		sys.setswitchinterval(interval)
+	assert results == [[output] * 20 for output in expected * 2]
+	assert expected[:2] == ['10\n3', 'line: 1, error: 生成器不可以递归调用']
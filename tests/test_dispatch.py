@@ -0,0 +1,64 @@
+import pytest
+from fun import lexer, parser
+from fun.exception import RuntimeException
+from fun.interpreter import engines, make_env, repl_online
+import fun.ast as ast
+import fun.fobject as obj
+
+def operands(code):
+	'''code中二元运算的两个操作数节点(the operand nodes of the binary operation in code)'''
+	node = parser.program(lexer.Tokens.tokenize(code, start_line=1)).stmts[0].right
+	return node.left, node.right
+
+def test_resolve_keeps_entries_by_type():
+	validator = ast.binary_operator_validator['+']
+	nodes = operands('a = x + y;')
+	number, string = obj.Number._py2fun(1), obj.String._py2fun('b')
+	entry = validator.resolve(1, nodes, (number, string))
+	assert entry == (obj.Number, obj.String, obj.Number._add, (obj.FinalValue, obj.String))
+	assert ast.dispatch_table[('_add', obj.Number, obj.String)] is entry
+	# 同样的类型得到同一项(the same types get the same entry)
+	assert validator.resolve(1, nodes, (obj.Number._py2fun(2), obj.String._py2fun('c'))) is entry
+
+def test_resolve_without_a_rule_raises_as_match():
+	validator = ast.binary_operator_validator['-']
+	nodes = operands('a = x - y;')
+	values = (obj.String._py2fun('a'), obj.Number._py2fun(1))
+	with pytest.raises(RuntimeException) as matched:
+		validator.match(3, nodes, values)
+	for _ in range(2):
+		with pytest.raises(RuntimeException) as resolved:
+			validator.resolve(3, nodes, values)
+		assert (resolved.value.line_no, resolved.value.info) == (matched.value.line_no, matched.value.info)
+	assert ast.dispatch_table[('_sub', obj.String, obj.Number)] is False
+
+def test_inline_cache_follows_the_operand_types():
+	env = make_env([])
+	program = parser.program(lexer.Tokens.tokenize('f = {<- @0 + @1;};', start_line=1))
+	node = program.stmts[0].right.body[0].right
+	assert node.cache == ast.empty_cache
+	with env.context:
+		assert node.apply(obj.Number._py2fun(1), obj.Number._py2fun(2)).py_val == 3
+		assert node.cache[:2] == (obj.Number, obj.Number)
+		assert node.apply(obj.String._py2fun('a'), obj.String._py2fun('b')).py_val == 'ab'
+		assert node.cache[:2] == (obj.String, obj.String)
+		with pytest.raises(RuntimeException):
+			node.apply(obj.Bool._py2fun(True), obj.Number._py2fun(1))
+		# 出错时缓存不变(the cache is kept on an error)
+		assert node.cache[:2] == (obj.String, obj.String)
+
+@pytest.mark.parametrize('engine', list(engines))
+@pytest.mark.parametrize('code, expected', [
+	# 同一节点上操作数的类型变化(the operand types change at the same node)
+	(
+		'f = {<- @0 + @1;}; [[1, 2] -> f, ["a", "b"] -> f, [1, "b"] -> f, [1.5, 2] -> f] -> print; [yes, 1] -> f;',
+		'3 "ab" "1b" 3.5\nline: 1, error: 不可对 (Bool: @0, Number: @1) 使用 加法 操作符',
+	),
+	('f = {<- -@0;}; [1 -> f, 2.5 -> f] -> print; "a" -> f;', '-1 -2.5\nline: 1, error: @0 无法进行 取负 操作'),
+	(
+		'g = {<- range << [1, 3] => @0;}; t = ["x", "y", "z", "w"]; [..[t] -> g] -> print; [..{<- @0 * 2;} -> g] -> print;',
+		'"y" "z" "w"\n2 4 6',
+	),
+])
+def test_outputs(engine, code, expected):
+	assert repl_online(code, engine, cache=None) == expected
@@ -0,0 +1,28 @@
+import pytest
+from fun.interpreter import engines, repl_online
+
+def chain(terms):
+	return ' + '.join(['x'] * terms)
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_deep_expression(engine):
+	assert repl_online('x = 1; {} -> print;'.format(chain(900)), engine, cache=None) == '900'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_deep_auto_lambda(engine):
+	assert repl_online('f = {}; ["x": 2] -> f -> print;'.format(chain(900)), engine, cache=None) == '1800'
+
+@pytest.mark.parametrize('engine', ['closure', 'vm'])
+def test_long_chain_does_not_recurse(engine):
+	assert repl_online('x = 1; {} -> print;'.format(chain(5000)), engine, cache=None) == '5000'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_undefined_leaves(engine):
+	code = 'f = @0; g = y; h = @0 * y; [7, "y": 3] -> f -> print; ["y": 3] -> g -> print; [7, "y": 3] -> h -> print; z -> print;'
+	assert repl_online(code, engine, cache=None) == '7\n3\n21\nline: 1, error: 未定义变量: z'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_funs_called_from_pipelines(engine):
+	# 管道中调用的函数又经由管道调用函数，返回值要回到各自的调用者(funs called in a pipeline call funs through pipelines again, each return goes back to its own caller)
+	code = 'f = {<- @0 * 2;}; g = {n = @0; <- [..range << [0, n] => f];}; [..range << [0, 3] => g] -> print; [3] -> g -> print;'
+	assert repl_online(code, engine, cache=None) == '0 0 2 0 2 4 0 2 4 6\n0 2 4 6'
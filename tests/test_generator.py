@@ -0,0 +1,92 @@
+import pytest
+from fun.exception import ReturnMessage, RuntimeException, StopMessage
+from fun.fobject import Environment, Exhausted
+from fun.interpreter import engines, load, make_env, repl_online
+
+def define(code):
+	'''运行code，返回它的环境(run code and return its env)'''
+	env = make_env([])
+	with env.context:
+		load(code).eval(env)
+	return env
+
+def pull(env, name, count):
+	'''从生成器name依次取count次值(take count values from the generator name one after another)'''
+	generator = env.user_data._dict[name]
+	values = []
+	with env.context:
+		for _ in range(count):
+			value = generator._next(1, Environment(generator._init(), parent=env))
+			values.append(value if value is Exhausted else value.py_val)
+	return values
+
+def test_range_ends_with_exhausted():
+	env = define('g = range << [0, 2];')
+	assert pull(env, 'g', 5) == [0, 1, 2, Exhausted, Exhausted]
+	assert env.user_data._dict['g'].eof
+
+def test_body_without_return_is_exhausted():
+	env = define('g = {x = 1;} << [];')
+	assert pull(env, 'g', 2) == [Exhausted, Exhausted]
+	assert env.user_data._dict['g'].eof
+
+def test_stop_does_not_end_the_generator():
+	env = define('g = {n = n + 1; n == 2 -> stop; <- n;} << ["n": 0];')
+	# stop只结束这一次，不设置eof(a stop only ends this call, eof is not set)
+	assert pull(env, 'g', 4) == [1, Exhausted, 3, 4]
+	assert not env.user_data._dict['g'].eof
+
+def test_called_as_a_fun_raises():
+	env = define('g = range << [0, 0];')
+	generator = env.user_data._dict['g']
+	with env.context:
+		with pytest.raises(ReturnMessage) as ret:
+			generator._call(1, Environment(generator._init(), parent=env))
+		assert ret.value.value.py_val == 0
+		with pytest.raises(StopMessage):
+			generator._call(1, Environment(generator._init(), parent=env))
+
+@pytest.mark.parametrize('engine', list(engines))
+@pytest.mark.parametrize('code, expected', [
+	('g = {n = n + 1; n > 2 -> stop; <- n;} << ["n": 0]; [..g] -> print;', '1 2'),
+	('g = range << [1, 3]; [[] -> g, [] -> g, [] -> g] -> print; [..g] -> print;', '1 2 3\n'),
+	('(range << [1, 3] <?= @0 > 3) -> print; (range << [1, 3] <?= @0 > 2) -> print;', 'nothing\nyes'),
+	('sum = {s = s + @0; <- s;} << ["s": 0]; range << [1, 4] >> sum -> print;', '10'),
+])
+def test_outputs(engine, code, expected):
+	assert repl_online(code, engine, cache=None) == expected
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_resumes_after_the_yielding_statement(engine):
+	# 前面的语句不再重复执行，执行到末尾后从头开始(earlier statements are not run again, after the end it starts over)
+	code = 'g = {"a" -> print; <- 1; "b" -> print; <- 2;} << []; [[] -> g, [] -> g, [] -> g] -> print;'
+	assert repl_online(code, engine, cache=None) == '"a"\n"b"\n"a"\n1 2 1'
+
+def test_frame_is_suspended_between_values():
+	env = define('g = {x = 1; <- x; x = 2; <- x;} << [];')
+	generator = env.user_data._dict['g']
+	assert pull(env, 'g', 1) == [1]
+	frame = generator.frame
+	assert frame.gi_frame is not None
+	assert generator.start_step == 2
+	assert pull(env, 'g', 2) == [2, 1]
+	# 同一个帧一直用下去(the same frame is used throughout)
+	assert generator.frame is frame
+	assert generator.start_step == 2
+
+def test_frame_restarts_after_an_error():
+	env = define('v = yes; g = {<- 1; <- v + 1;} << [];')
+	generator = env.user_data._dict['g']
+	assert pull(env, 'g', 1) == [1]
+	with pytest.raises(RuntimeException):
+		pull(env, 'g', 1)
+	assert generator.frame.gi_frame is None
+	with env.context:
+		load('v = 5;').eval(env)
+	# 新的帧从出错的语句开始，而不是从头开始(the new frame starts from the statement that failed, not from the start)
+	assert pull(env, 'g', 2) == [6, 1]
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_copies_start_from_the_beginning(engine):
+	code = 'g = {n = n + 1; <- n;} << ["n": 0]; [[] -> g, [] -> g] -> print; k = g << ["n": 10]; [[] -> k, [] -> g] -> print;'
+	assert repl_online(code, engine, cache=None) == '1 2\n11 3'
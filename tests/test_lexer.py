@@ -0,0 +1,57 @@
+import io
+import re
+import itertools
+import pytest
+from fun.exception import LexerException
+from fun.lexer import Tokens, _string_end
+
+def names(tokens):
+	found = [tokens.current] + list(tokens._tokens)
+	return [(token.name, token.value, token.line_no) for token in found]
+
+def lex_file(code, chunk_size):
+	return names(Tokens.tokenize_file(io.StringIO(code), chunk_size=chunk_size))
+
+CODE = '''g = {<- @0;} << [];
+x <=> y; (g <?= @0 >= 2.5) -> print;
+s = "a\\"b\\\\c"; t = 'it\\'s'; u = "two
+lines" + 'x';
+[..g => @0 * 2 | @0 != 3] >> f -> print; yes and no; index;
+'''
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5, 7, 16, 64])
+def test_chunks(chunk_size):
+	# 块很小时<?=、<=>与字符串都会跨块(with small chunks <?=, <=> and the strings span chunks)
+	assert lex_file(CODE, chunk_size) == names(Tokens.tokenize(CODE))
+
+def test_tokens():
+	tokens = names(Tokens.tokenize(CODE))
+	assert ('SWAP', '<=>', 1) in tokens
+	assert ('DETECT', '<?=', 1) in tokens
+	assert ('OPERATOR', '>=', 1) in tokens
+	assert ('STRING', 'a"b\\c', 2) in tokens
+	assert ('STRING', "it's", 2) in tokens
+	# 字符串中的换行也计入行号(line breaks inside strings are counted too)
+	assert ('STRING', 'two\nlines', 3) in tokens
+	assert ('STRING', 'x', 3) in tokens
+	assert ('YES', None, 4) in tokens
+	assert tokens[-1] == ('EOF', None, 4)
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64])
+def test_errors(chunk_size):
+	for code, line_no in (('x = 1;\ny = $;', 1), ('"a\nb" $', 1), ('x = "never closed;', 0)):
+		with pytest.raises(LexerException) as error:
+			lex_file(code, chunk_size)
+		assert error.value.line_no == line_no
+
+# 改写之前用来分析字符串的正则(the regex strings were lexed with before the rewrite)
+BASELINE = re.compile(r'''(?P<STRING>("(\\"|[^"])*")|('(\\'|[^'])*'))''')
+
+def test_string_end_agrees_with_the_regex():
+	# 所有由这些字符组成的短代码(all short code made of these chars)
+	for length in range(8):
+		for rest in itertools.product('"\'\\a', repeat=length):
+			for quote in '"\'':
+				code = quote + ''.join(rest)
+				matches = BASELINE.match(code)
+				assert _string_end(code, 0) == (matches.end() if matches is not None else None), code
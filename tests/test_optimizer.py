@@ -0,0 +1,67 @@
+import pytest
+from fun import lexer, parser
+from fun.interpreter import engines, repl_online
+import fun.optimizer as optimizer
+import fun.ast as ast
+
+def optimized(code):
+	'''化简后每条语句的右侧(the right side of every statement after it is simplified)'''
+	program = optimizer.optimize(parser.program(lexer.Tokens.tokenize(code, start_line=1)))
+	return [stmt.right for stmt in program.stmts]
+
+def test_folds_literals():
+	nodes = optimized('a = (1 + 2) * 3; b = "ab" + "cd"; c = 2 > 1; d = -(4 - 6);')
+	assert [node.type for node in nodes] == ['Constant'] * 4
+	assert [node.val._str() for node in nodes] == ['9', 'abcd', 'yes', '2']
+	# 保留原来的代码(the original code is kept)
+	assert nodes[0]._code() == '(1 + 2) * 3'
+
+@pytest.mark.parametrize('code', [
+	'a = "a" * {};'.format(optimizer.MAX_FOLDED_LENGTH + 1),
+	'a = {} * "a";'.format(optimizer.MAX_FOLDED_LENGTH + 1),
+	'a = "{}" + "a";'.format('a' * optimizer.MAX_FOLDED_LENGTH),
+	'a = 2 ^ {};'.format(optimizer.MAX_FOLDED_EXPONENT + 1),
+])
+def test_too_large_is_not_folded(code):
+	assert optimized(code)[0].type == 'BinaryOperator'
+
+def test_limits_are_inclusive():
+	code = 'a = "a" * {}; b = 2 ^ {};'.format(optimizer.MAX_FOLDED_LENGTH, optimizer.MAX_FOLDED_EXPONENT)
+	assert [node.type for node in optimized(code)] == ['Constant', 'Constant']
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_unfolded_values_are_computed_at_runtime(engine):
+	assert repl_online('[2 ^ 100, "ab" * 3000 == "ab" * 3000] -> print;', engine, cache=None) == '{} yes'.format(2 ** 100)
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_errors_are_left_to_runtime(engine):
+	assert optimized('a = yes + 1;')[0].type == 'BinaryOperator'
+	assert repl_online('x = 1;\ny = yes + 1;', engine, cache=None) == 'line: 2, error: 不可对 (Bool: yes, Number: 1) 使用 加法 操作符'
+
+def test_parenthesized_node_keeps_its_code():
+	node = optimized('a = (x + 1) * 2;')[0]
+	inner = node.left
+	assert inner.type == 'BinaryOperator'
+	assert type(inner).__name__ == 'BinaryOperator'
+	assert isinstance(inner, ast.BinaryOperator)
+	assert inner._code() == '(x + 1)'
+	assert node._code() == '(x + 1) * 2'
+	# 复制品同样带括号(copies are parenthesized as well)
+	assert node._copy()._code() == '(x + 1) * 2'
+	assert type(inner._copy()) is type(inner)
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_error_shows_parentheses(engine):
+	output = repl_online('x = "a"; y = (x + "a") * yes;', engine, cache=None)
+	assert output == 'line: 1, error: 不可对 (String: (x + "a"), Bool: yes) 使用 乘法 操作符'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_folded_table_is_copied(engine):
+	node = optimized('t = [1, 2, "k": 3];')[0]
+	assert node.type == 'Constant' and node.mutable
+	# 每次求值得到新的表，修改不影响下一次(every evaluation makes a new table, changes do not carry over)
+	code = 'f = {t = [1, 2]; t[0] = t[0] + 1; <- t[0];}; [] -> f -> print; [] -> f -> print;'
+	assert repl_online(code, engine, cache=None) == '2\n2'
+
+def test_table_with_variables_is_not_folded():
+	assert optimized('t = [1, x];')[0].type == 'TableStatementNode'
@@ -0,0 +1,47 @@
+import io
+import queue
+import pytest
+from fun.interpreter import engines, repl_online
+from fun.output import OUTPUT_LIMIT_INFO, CallbackSink, FileSink, ListSink, QueueSink
+
+def test_flush_lines():
+	chunks = []
+	sink = CallbackSink(chunks.append, flush_lines=2)
+	for line in ('a', 'b', 'c'):
+		sink.append(line)
+	assert chunks == ['a\nb\n']
+	sink.finish()
+	assert chunks == ['a\nb\n', 'c\n']
+
+def test_flush_bytes():
+	chunks = []
+	# 每行连同换行占4字节(each line takes 4 bytes with its line break)
+	sink = CallbackSink(chunks.append, flush_bytes=8)
+	for line in ('one', 'two', 'six'):
+		sink.append(line)
+	assert chunks == ['one\ntwo\n']
+	sink.finish()
+	assert chunks == ['one\ntwo\n', 'six\n']
+
+def test_file_sink_flushes_at_the_end():
+	file = io.StringIO()
+	repl_online('1 -> print; 2 -> print;', sink=FileSink(file), cache=None)
+	assert file.getvalue() == '1\n2\n'
+
+def test_queue_sink_ends_with_none():
+	items = queue.Queue()
+	repl_online('1 -> print; 2 -> print;', sink=QueueSink(items, flush_lines=1), cache=None)
+	assert [items.get_nowait() for _ in range(3)] == ['1\n', '2\n', None]
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_max_bytes(engine):
+	lines = []
+	# 每行占2字节，第三行超出，错误信息不受限制地写出(every line takes 2 bytes, the third is beyond the limit, the error message is written regardless)
+	repl_online('1 -> print;\n2 -> print;\n3 -> print;\n4 -> print;', engine, sink=ListSink(lines, max_bytes=4), cache=None)
+	assert lines == ['1', '2', 'line: 3, error: {}'.format(OUTPUT_LIMIT_INFO)]
+
+def test_max_bytes_counts_flushed_output():
+	chunks = []
+	sink = CallbackSink(chunks.append, flush_lines=1, max_bytes=6)
+	repl_online('"ab" -> print; "cd" -> print;', sink=sink, cache=None)
+	assert chunks == ['"ab"\n', 'line: 1, error: {}\n'.format(OUTPUT_LIMIT_INFO)]
@@ -0,0 +1,51 @@
+import itertools
+import pytest
+from fun.interpreter import engines, repl_online
+from fun.profiler import Profiler
+
+CODE = 'f = {x = @0;\n<- x * 2;};\n[..range << [0, 4] => f] -> print;\ng = {<- @0;} << [];\n[1] -> g;\n[2] -> g;'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_counts(engine):
+	profiler = Profiler()
+	assert repl_online(CODE, engine, cache=None, profiler=profiler) == '0 2 4 6 8'
+	report = profiler.report()
+	# 第1行与第4行除了声明各一次，还有函数体与生成器每步中的求值(lines 1 and 4 are evaluated once for the declarations and again in the body and in every generator step)
+	assert {item['line_no']: item['count'] for item in report['lines']} == {1: 6, 2: 5, 3: 1, 4: 3, 5: 1, 6: 1}
+	assert sorted((item['line_no'], item['label'], item['count']) for item in report['funs']) == [
+		(1, '<program>', 1),
+		(1, '{x = @0; <- x * 2;}', 5),
+		(4, '{<- @0;}', 2),
+	]
+	for item in report['lines'] + report['funs']:
+		assert item['cumulative'] >= item['self'] >= 0
+
+class Statement:
+	'''求值时只经由profiler求值内层语句(evaluating it only evaluates the inner statement through profiler)'''
+	def __init__(self, line_no, profiler, inner=None):
+		self.line_no = line_no
+		self.profiler = profiler
+		self.inner = inner
+	def eval(self, env):
+		if self.inner is not None:
+			self.profiler.statement(self.inner, self.profiler.fun([self.inner], 'inner'), env)
+
+def test_self_and_cumulative_time():
+	# 每读一次时钟前进1秒(the clock moves on 1 second every time it is read)
+	profiler = Profiler(clock=itertools.count().__next__)
+	inner = Statement(1, profiler)
+	outer = Statement(1, profiler, inner)
+	profiler.statement(outer, profiler.fun([outer], 'outer'), None)
+	# 同一行嵌套求值时累计用时只计最外层(nested on one line, only the outermost evaluation adds to the cumulative time)
+	line = profiler.lines[1]
+	assert (line.count, line.cumulative, line.self_time) == (2, 3, 3)
+	assert (profiler.funs[outer].cumulative, profiler.funs[outer].self_time) == (3, 2)
+	assert (profiler.funs[inner].cumulative, profiler.funs[inner].self_time) == (1, 1)
+
+def test_format():
+	profiler = Profiler()
+	repl_online(CODE, cache=None, profiler=profiler)
+	rows = profiler.format(limit=2).split('\n')
+	assert rows[1] == 'lines'
+	assert rows[4] == 'funs'
+	assert len(rows) == 7
@@ -0,0 +1,48 @@
+import pytest
+from fun import lexer, parser, resolver
+from fun.interpreter import engines, repl_online
+
+def resolved(code):
+	return resolver.resolve(parser.program(lexer.Tokens.tokenize(code, start_line=1)))
+
+def marks(node):
+	'''语句中各标识符是否为local，按代码中的顺序，不进入函数体(whether every identifier of a statement is local, in the order of the code, fun bodies are skipped)'''
+	found, nodes = [], [node]
+	while nodes:
+		node = nodes.pop()
+		if node.type == 'Identifier':
+			found.append((node.id, node.local))
+		elif node.type != 'FunStatementNode':
+			nodes += reversed(node.chilren)
+	return found
+
+def test_marks_names_assigned_before():
+	program = resolved('x = 1; y = x + y; x = x; t = [1]; t[0] = t;')
+	assert [marks(stmt) for stmt in program.stmts] == [
+		[('x', False)],
+		[('y', False), ('x', True), ('y', False)],
+		[('x', True), ('x', True)],
+		[('t', False)],
+		[('t', True), ('t', True)],
+	]
+
+def test_fun_bodies_are_marked_on_their_own():
+	program = resolved('x = 1; f = {z = x; x = 2; <- x + z;};')
+	body = program.stmts[1].right.body
+	# 外层已赋值的x在函数体中仍动态查找(x assigned outside is still looked up dynamically in the body)
+	assert [marks(stmt) for stmt in body] == [
+		[('z', False), ('x', False)],
+		[('x', False)],
+		[('x', True), ('z', True)],
+	]
+
+@pytest.mark.parametrize('engine', list(engines))
+@pytest.mark.parametrize('code, expected', [
+	# 被调用者看得到调用者的名字(the callee sees the names of its caller)
+	('g = {<- a;}; f = {a = 5; <- [] -> g;}; [] -> f -> print;', '5'),
+	('a = 1; f = {a = 2; <- a;}; [] -> f -> print; a -> print;', '2\n1'),
+	('a = 1; f = {b = a; a = 3; <- [a, b];}; [[] -> f] -> print;', '[\n    3,\n    1\n]'),
+	('n = 0; g = {n = n + 1; <- n;} << []; [[] -> g, [] -> g, [] -> g] -> print; n -> print;', '1 2 3\n0'),
+])
+def test_outputs(engine, code, expected):
+	assert repl_online(code, engine, cache=None) == expected
@@ -0,0 +1,44 @@
+import gc
+import pytest
+from fun.interpreter import engines, repl_online
+from fun.scheduler import Scheduler, SlicedRun
+
+LOOP = 'loop = {<- 1;} << []; [..loop] -> print;'
+SUM = 'sum = {acc = acc + @0; <- acc;} << ["acc": 0]; range << [0, 20000] >> sum -> print;'
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_scheduler_output(engine):
+	scheduler = Scheduler(100, engine)
+	runs = [scheduler.submit(code) for code in (SUM, '1 + 2 -> print;')]
+	scheduler.run()
+	assert [run.output for run in runs] == [repl_online(SUM, engine), '3']
+	assert runs[0].slices > runs[1].slices == 1
+
+def test_context_manager_cancels():
+	with SlicedRun(LOOP) as run:
+		assert not run.resume()
+	assert run.cancelled and run.done
+	assert not run.program.thread.is_alive()
+
+def test_dropped_run_ends_its_thread():
+	run = SlicedRun(LOOP)
+	run.resume()
+	thread = run.program.thread
+	del run
+	gc.collect()
+	thread.join(1)
+	assert not thread.is_alive()
+
+def test_many_programs():
+	scheduler = Scheduler(50)
+	codes = ['sum = {{acc = acc + @0; <- acc;}} << ["acc": 0]; range << [0, {}] >> sum -> print;'.format(n) for n in range(199, -1, -1)]
+	runs = [scheduler.submit(code) for code in codes]
+	scheduler.run()
+	assert [run.output for run in runs] == [str(n * (n + 1) // 2) for n in range(199, -1, -1)]
+	# 程序交错运行，后提交的短程序先结束(the programs are interleaved, the short ones submitted later end first)
+	assert runs.index(scheduler.finished[0]) > 150
+	assert runs.index(scheduler.finished[-1]) < 50
+	assert runs[0].slices > 10
+	for run in runs:
+		run.program.thread.join(1)
+		assert not run.program.thread.is_alive()
@@ -0,0 +1,36 @@
+import os
+import signal
+import threading
+import pytest
+from fun.service import ExecutionService, WorkerCrashed, MEMORY_INFO
+from fun.utils import TIMEOUT_INFO
+
+@pytest.fixture(scope='module')
+def service():
+	with ExecutionService(1, timeout=0.5, memory_limit=64 * 1024 * 1024) as service:
+		yield service
+
+def test_output(service):
+	assert service.run('1 -> print; 2 -> print;') == '1\n2'
+
+def test_timeout_keeps_output(service):
+	output = service.run('"start" -> print;\ng = {<- 1;} << []; [..g] -> print;')
+	assert output == '"start"\nline: 2, error: {}'.format(TIMEOUT_INFO)
+
+def test_memory_limit_keeps_output(service):
+	output = service.run('"start" -> print;\ns = "a" * 10000000000;', timeout=5)
+	assert output == '"start"\nline: 2, error: {}'.format(MEMORY_INFO)
+	assert service.run('"next" -> print;') == '"next"'
+
+def test_killed_after_grace(service):
+	# 大数的乘方不计步，只能由父进程杀掉(a power of a big number counts no steps, only the parent can kill it)
+	output = service.run('"start" -> print;\nx = 7 ^ 100000000;', timeout=0.1)
+	assert output == '"start"\nline: 0, error: {}'.format(TIMEOUT_INFO)
+	assert service.run('"next" -> print;') == '"next"'
+
+def test_unexpected_death(service):
+	pid = service.workers[0].process.pid
+	threading.Timer(0.2, os.kill, (pid, signal.SIGKILL)).start()
+	with pytest.raises(WorkerCrashed):
+		service.run('g = {<- 1;} << []; [..g] -> print;', timeout=5)
+	assert service.run('"next" -> print;') == '"next"'
@@ -0,0 +1,91 @@
+import pytest
+import fun.fobject as obj
+from fun.interpreter import engines, repl_online
+
+def number(value):
+	return obj.Number._py2fun(value)
+
+def string(value):
+	return obj.String._py2fun(value)
+
+def table(*items, **fields):
+	new = obj.Table()
+	new._list.extend(number(item) if isinstance(item, int) else item for item in items)
+	new._dict.update({string(key)._id(): number(value) for key, value in fields.items()})
+	return new
+
+def contents(t):
+	'''列表部分与字典部分的Python值，嵌套的表递归展开(the python values of the list and dict parts, nested tables expanded)'''
+	def value(item):
+		return contents(item) if isinstance(item, obj.Table) else item.py_val
+	return [value(item) for item in t._list], {key: value(item) for key, item in t._dict.items()}
+
+def test_copy_then_change_the_copy():
+	original = table(1, 2, k=3)
+	copy = original._copy()
+	copy._setitem(number(0), number(9))
+	copy._setitem(string('k'), number(8))
+	copy._setitem(string('new'), number(7))
+	assert contents(original) == ([1, 2], {'k': 3})
+	assert contents(copy) == ([9, 2], {'k': 8, 'new': 7})
+
+def test_copy_then_change_the_original():
+	original = table(1, 2, k=3)
+	copy = original._copy()
+	original._setitem(number(1), number(9))
+	original._owned_dict()['k'] = number(8)
+	original._owned_list().append(number(4))
+	assert contents(copy) == ([1, 2], {'k': 3})
+	assert contents(original) == ([1, 9, 4], {'k': 8})
+
+def test_storage_is_copied_once():
+	original = table(1, k=2)
+	copy = original._copy()
+	assert copy._list is original._list and copy._dict is original._dict
+	owned = copy._owned_list()
+	assert owned is not original._list
+	assert copy._owned_list() is owned
+	# 原来的表仍标为共享，改动时多复制一次，不影响结果(the original is still marked shared and copies once more when changed, which does not affect the result)
+	original._setitem(number(0), number(5))
+	assert contents(copy) == ([1], {'k': 2})
+
+def test_copies_of_copies():
+	first = table(1, 2, k=3)
+	second = first._copy()
+	third = second._copy()
+	second._setitem(number(0), number(20))
+	third._setitem(string('k'), number(30))
+	assert contents(first) == ([1, 2], {'k': 3})
+	assert contents(second) == ([20, 2], {'k': 3})
+	assert contents(third) == ([1, 2], {'k': 30})
+
+def test_nested_tables():
+	inner = table(1, 2)
+	original = table(inner, 3)
+	copy = original._copy()
+	# 复制是浅的：换掉复制品中的内层表不影响原来的表，复制内层表后改动也不影响(copies are shallow: replacing the inner table in the copy leaves the original alone, and so does changing a copy of the inner table)
+	inner_copy = copy._list[0]._copy()
+	inner_copy._setitem(number(0), number(9))
+	copy._setitem(number(0), inner_copy)
+	assert contents(original) == ([([1, 2], {}), 3], {})
+	assert contents(copy) == ([([9, 2], {}), 3], {})
+	assert original._list[0] is inner
+
+def test_reload():
+	original = table(1, 2, k=3)
+	args = table(7, j=1)
+	reloaded = original._reload(args)
+	reloaded._setitem(number(1), number(0))
+	reloaded._setitem(string('k'), number(0))
+	args._setitem(number(0), number(8))
+	assert contents(original) == ([1, 2], {'k': 3})
+	assert contents(args) == ([8], {'j': 1})
+	assert contents(reloaded) == ([7, 0], {'k': 0, 'j': 1})
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_reload_in_programs(engine):
+	# 与共享存储之前的输出相同(the same output as before storage was shared)
+	assert repl_online('a = [1, 2, "k": 3]; b = a << [7]; b[1] = 0; b["k"] = 0; [a] -> print; [b] -> print;', engine, cache=None) == \
+		'[\n    1,\n    2,\n    k: 3\n]\n[\n    7,\n    0,\n    k: 0\n]'
+	assert repl_online('a = [1, 2, "k": 3]; b = [7, "j": 1] << a; a[0] = 0; a["k"] = 0; [b] -> print;', engine, cache=None) == \
+		'[\n    1,\n    2,\n    j: 1,\n    k: 3\n]'
@@ -0,0 +1,80 @@
+import pytest
+from fun.exception import RuntimeException
+from fun.interpreter import engines, repl_online
+from fun.utils import Active, Context, InterpreterScope, ParserScope, Scope, StackEvent, recursion_forbidden
+
+@pytest.fixture
+def context():
+	with Context() as context:
+		yield context
+
+def test_scopes_by_event_name(context):
+	with InterpreterScope(StackEvent('auto_lambda', 'outer')):
+		with InterpreterScope(StackEvent('call_fun', 'f')):
+			with InterpreterScope(StackEvent('auto_lambda', 'inner')):
+				assert InterpreterScope.get_node_with('auto_lambda').info == 'inner'
+				assert InterpreterScope.get_node_with('call_fun').info == 'f'
+			# 别的事件不会挡住同名事件中外层的一个(other events do not hide the outer one of the same name)
+			assert InterpreterScope.get_node_with('auto_lambda').info == 'outer'
+		assert InterpreterScope.get_node_with('call_fun') is None
+	assert InterpreterScope.get_node_with('auto_lambda') is None
+	assert InterpreterScope.get_node_with('never_used') is None
+
+def test_scope_classes_are_apart(context):
+	with ParserScope(StackEvent('auto_lambda', 'parser')):
+		assert InterpreterScope.get_node_with('auto_lambda') is None
+
+def test_clear(context):
+	# 出错后未退出的作用域由clear清掉(scopes left behind by an error are removed by clear)
+	InterpreterScope(StackEvent('auto_lambda', 'interpreter')).__enter__()
+	ParserScope(StackEvent('auto_lambda', 'parser')).__enter__()
+	InterpreterScope.clear()
+	assert InterpreterScope.get_node_with('auto_lambda') is None
+	assert ParserScope.get_node_with('auto_lambda').info == 'parser'
+	Scope.clear_all()
+	assert ParserScope.get_node_with('auto_lambda') is None
+
+def test_active_by_identity(context):
+	first, second = [1], [1]
+	with Active('table_code', first):
+		assert Active.has('table_code', first)
+		# 相等的另一个对象不算在内(another object that is equal does not count)
+		assert not Active.has('table_code', second)
+		assert not Active.has('call_generator', first)
+	assert not Active.has('table_code', first)
+	assert context.active == set()
+
+def test_active_is_removed_on_errors(context):
+	item = object()
+	with pytest.raises(ValueError):
+		with Active('call_generator', item):
+			raise ValueError()
+	assert not Active.has('call_generator', item)
+
+class Walker:
+	'''next调用depth次自身(next calls itself depth times)'''
+	def __init__(self, other=None):
+		self.other = other
+	@recursion_forbidden('call_generator', '生成器不可以递归调用')
+	def next(self, line_no, env):
+		if env > 0:
+			(self.other or self).next(line_no, env - 1)
+		return env
+
+def test_recursion_forbidden(context):
+	with pytest.raises(RuntimeException) as error:
+		Walker().next(7, 2)
+	assert (error.value.line_no, error.value.info) == (7, '生成器不可以递归调用')
+	assert context.active == set()
+	# 调用另一个对象不算递归(calling another object is not recursion)
+	assert Walker(Walker()).next(7, 1) == 1
+	assert Walker().next(7, 0) == 0
+
+@pytest.mark.parametrize('engine', list(engines))
+@pytest.mark.parametrize('code, expected', [
+	('t = [1, 2]; t[1] = t; [t] -> print;', '[\n    1,\n    [...]\n]'),
+	('g = {<- [] -> g;} << []; [] -> g;', 'line: 1, error: 生成器不可以递归调用'),
+	('g = {<- 1;} << []; h = {<- [] -> g;} << []; [[] -> h, [] -> h] -> print;', '1 1'),
+])
+def test_outputs(engine, code, expected):
+	assert repl_online(code, engine, cache=None) == expected
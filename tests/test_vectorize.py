@@ -0,0 +1,96 @@
+import pytest
+from fun.interpreter import engines, repl_online
+
+pytest.importorskip('numpy')
+import fun.vectorize as vectorize
+
+COUNT = 'count = {n = n + 1; <- n;} << ["n": 0];'
+SUM = 'sum = {acc = acc + @0; <- acc;} << ["acc": 0];'
+MAX = 'max = {@0 <= m -> stop; m = @0; <- m;} << ["m": -1];'
+MIN = 'min = {@0 >= m -> stop; m = @0; <- m;} << ["m": 1000000];'
+
+@pytest.fixture
+def chunks(monkeypatch):
+	'''记下每一块是否向量化求值成功(record whether every chunk was evaluated vectorized)'''
+	results = []
+	evaluate = vectorize.Plan.evaluate
+	def recorded(plan, values):
+		try:
+			fates = evaluate(plan, values)
+		except vectorize.Fallback:
+			results.append(False)
+			raise
+		results.append(True)
+		return fates
+	monkeypatch.setattr(vectorize.Plan, 'evaluate', recorded)
+	return results
+
+def both(code, engine, **options):
+	'''逐个求值与向量化求值的输出，两者必须相同(the output evaluated one by one and vectorized, they must be the same)'''
+	scalar = repl_online(code, engine, cache=None, timeout=None, **options)
+	assert repl_online(code, engine, cache=None, timeout=None, vectorized=True, **options) == scalar
+	return scalar
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_filters(engine, chunks):
+	output = both('[..range << [0, 3000] | @0 % 3 == 0 => @0 - 1 | @0 % 5 > 0 => @0 % 2 == 0] -> print;', engine)
+	assert output == ' '.join('yes' if m % 2 == 0 else 'no' for m in (n - 1 for n in range(0, 3001, 3)) if m % 5 > 0)
+	assert chunks == [True, True, True]
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_mixed_int_and_float(engine, chunks):
+	output = both(SUM + 'range << [0, 3000] => @0 / 4 + 0.5 | @0 > 3.25 >> sum -> print;', engine)
+	assert output == str(sum(n / 4 + 0.5 for n in range(3001) if n / 4 + 0.5 > 3.25))
+	assert all(chunks)
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_falls_back_past_safe_int(engine, chunks):
+	# 2047 ^ 6已超过SAFE_INT，第二块起交回解释器，结果是Python的整数(2047 ^ 6 is beyond SAFE_INT, the interpreter takes over from the second chunk and the result is a python int)
+	output = both(SUM + 'range << [0, 3000] => @0 ^ 6 >> sum -> print;', engine)
+	assert output == str(sum(n ** 6 for n in range(3001)))
+	assert chunks == [True, False]
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_falls_back_past_exact_int(engine, chunks):
+	# 与浮点数相加的整数在第三块超过EXACT_INT(the ints added to floats go beyond EXACT_INT in the third chunk)
+	output = both(SUM + 'range << [0, 4000] => @0 * 3000000000000 + 0.5 >> sum -> print;', engine)
+	assert chunks == [True, True, False]
+	assert float(output) > 0
+
+@pytest.mark.parametrize('engine', list(engines))
+@pytest.mark.parametrize('code, expected', [
+	(COUNT + 'range << [0, 3000] | @0 % 7 == 3 >> count -> print;', '429'),
+	(SUM + 'range << [0, 3000] => @0 * @0 | @0 % 2 == 0 >> sum -> print;', str(sum(n * n for n in range(0, 3001, 2)))),
+	(MAX + 'range << [0, 3000] => (@0 * 7) % 1001 >> max -> print;', '994'),
+	(MIN + 'range << [0, 3000] => (@0 * 7) % 1001 + 3 | @0 > 10 >> min -> print;', '17'),
+])
+def test_reducers(engine, code, expected, chunks):
+	assert both(code, engine) == expected
+	assert chunks and all(chunks)
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_stops_early(engine, chunks):
+	output = both('range << [0, 1000000] => @0 * 3 | @0 % 7 == 1 <?= {<- @0 > 5000;} -> print; "end" -> print;', engine)
+	assert output == 'yes\n"end"'
+	# 只求了用到的几块(only the chunks needed are evaluated)
+	assert len(chunks) == 2
+
+@pytest.mark.parametrize('engine', list(engines))
+def test_same_steps(engine):
+	output = both('[..range << [0, 3000] | @0 % 3 == 0 => @0 + 1] -> print;', engine, max_steps=2000)
+	assert output.startswith('line: 1, error: ')
+
+@pytest.mark.parametrize('engine', list(engines))
+@pytest.mark.parametrize('code, expected', [
+	('g = range << [0, 10] => @0 * 2; (g <?= @0 > 4) -> print; h = g => @0 + 1; [..h] -> print;', 'yes\n9 11 13 15 17 19 21'),
+	('f = {<- @0;}; g = range << [0, 10] => @0 * 2; (g <?= @0 > 4) -> print; [..g => f] -> print;', 'yes\n8 10 12 14 16 18 20'),
+	('g = range << [0, 3000] | @0 % 7 == 0; (g <?= @0 > 1500) -> print; h = g => @0 + 1; [..h] -> print;', None),
+])
+def test_copy_partly_consumed(engine, code, expected):
+	# 复制用过一部分的管道，复制品从下一个值开始，不丢掉这一块中剩下的值
+	# (a copy of a partly consumed pipeline starts from the next value, the rest of the chunk is not dropped)
+	output = both(code, engine)
+	if expected is not None:
+		assert output == expected
+	else:
+		assert output == 'yes\n' + ' '.join(str(n + 1) for n in range(1509, 3001) if n % 7 == 0)
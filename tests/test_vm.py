@@ -0,0 +1,43 @@
+import fun.vm as vm
+from fun.interpreter import load, repl_online
+
+def ops(code):
+	'''一个程序的各条语句(包括其中的函数体)用到的指令名(the names of the instructions used by the statements of a program, fun bodies included)'''
+	return [line.split()[2] for line in vm.dis(load(code, 'vm')).split('\n') if line.strip() and not line.strip().startswith('#')]
+
+def test_dis():
+	assert vm.dis(load('x = 1; f = {<- @0 * x + @"k";};', 'vm')) == '\n'.join([
+		'# line 1: x = 1',
+		'   1    0 CONST         (1)',
+		'   1    2 STORE_NAME    (x)',
+		'   1    4 END           ',
+		'',
+		'# line 1: f = { <- @0 * x + @"k"; }',
+		'   1    0 TARGET_BEGIN  ({ <- @0 * x + @"k"; })',
+		'   1    2 MAKE_FUN      (1 statements)',
+		'   1    4 TARGET_END    ',
+		'   1    6 STORE_NAME    (f)',
+		'   1    8 END           ',
+		'',
+		'    # line 1: <- @0 * x + @"k"',
+		'       1    0 TARGET_BEGIN  (@0 * x + @"k")',
+		'       1    2 LOAD_VARIABLE (@0)',
+		'       1    4 LOAD_NAME     (x)',
+		'       1    6 BINARY        (*)',
+		'       1    8 LOAD_VARIABLE (@"k")',
+		'       1   10 BINARY        (+)',
+		'       1   12 TARGET_END    ',
+		'       1   14 RETURN        ',
+		'       1   16 END           ',
+	])
+
+def test_literal_keys_after_optimizing():
+	# 优化后@0与@"k"的键是Constant节点，仍按字面量键直接查找(after optimizing the keys of @0 and @"k" are Constant nodes and are still looked up directly)
+	assert ops('f = {<- @0 * 2 + @"k";}; g = @1;').count('LOAD_VARIABLE') == 3
+	assert 'VARIABLE' not in ops('f = {<- @0 * 2 + @"k";}; g = @1;')
+	code = 'f = {<- @0 * 2 + @"k";}; g = @1; [3, "k": 1] -> f -> print; [5, 6] -> g -> print; @0 -> print;'
+	assert repl_online(code, 'vm', cache=None) == '7\n6\nline: 1, error: 未定义变量: @0'
+
+def test_computed_keys():
+	assert 'VARIABLE' in ops('f = {<- @(@0 + 1);};')
+	assert repl_online('f = {<- @(@0 + 1);}; [1, 5, 7] -> f -> print;', 'vm', cache=None) == '7'